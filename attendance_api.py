@@ -0,0 +1,309 @@
+"""
+Local HTTP/JSON API over the attendance reports, for other systems (mess billing, warden
+notifications) that need the numbers without the dashboard:
+
+    python attendance_api.py --data-dir /path/to/daily/csvs --port 8765
+
+    GET /api/files                                  dated daily files (name, date, sha1) and
+                                                    quarantined files with the reason
+    GET /api/daily?date=2025-07-07[&table=...]      analyze_attendance tables of one day
+                                                    (also ?file=07-July-2025.csv)
+    GET /api/reduction-days[?block=&floor=&room=&start=&end=]
+    GET /api/monthly?month=Jul-2025[&block=&floor=] daily Present / Not Present counts and totals
+
+Location filters are repeatable (?block=HA&block=HB); dates are YYYY-MM-DD. Every response
+carries an ETag derived from the content hashes of the files it was computed from, so clients
+polling with If-None-Match get a 304 without any work. Responses are cached per query and file
+version, and a background watcher keeps the store current, so no request re-parses a CSV.
+Requests are handled concurrently by a small pool of worker threads.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+logger = logging.getLogger('attendance_api')
+
+# --- Constants for the API Server ---
+API_HOST = '127.0.0.1'
+API_PORT = 8765
+# Worker threads answering requests (the reports release the GIL in pandas / pyarrow)
+API_WORKERS = 4
+# Serialized responses kept per query and file version
+API_CACHE_ENTRIES = 256
+API_CACHE_BYTES = 64 * 1024 * 1024
+
+
+class APIError(Exception):
+    """
+    A request that cannot be answered; carries the HTTP status sent to the client.
+    """
+
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def frame_records(df) -> list:
+    """
+    Returns a DataFrame as JSON-ready records (dates as ISO strings, missing values as null).
+    """
+    return json.loads(df.to_json(orient='records', date_format='iso', force_ascii=False))
+
+
+def _single(query: dict, name: str, required: bool = False):
+    values = query.get(name) or []
+    if not values:
+        if required:
+            raise APIError(HTTPStatus.BAD_REQUEST, f"Missing query parameter '{name}'.")
+        return None
+    return values[-1]
+
+
+def _date(query: dict, name: str):
+    value = _single(query, name)
+    if value is None:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise APIError(HTTPStatus.BAD_REQUEST, f"'{name}' must be a date as YYYY-MM-DD, not {value!r}.")
+
+
+# --- Query Service (no HTTP; one per data directory) ---
+class AttendanceAPI:
+    """
+    Answers the API's queries from an AttendanceStore. Every answer is a (etag, JSON bytes) pair;
+    the ETag is known before the report is computed, so unchanged answers cost a dictionary lookup.
+    """
+
+    def __init__(self, data_dir: str = '.', watch: bool = True):
+        from attendance_cache import ResultCache
+        from attendance_reports import get_attendance_store, warm_store_views
+        from attendance_watch import watch_directory
+
+        self.store = get_attendance_store(data_dir)
+        store = self.store
+        self.watcher = watch_directory(
+            store, warm=lambda csv_files, changed: warm_store_views(csv_files, changed, store)) if watch else None
+        self.cache = ResultCache(max_entries=API_CACHE_ENTRIES, max_bytes=API_CACHE_BYTES)
+        self.routes = {
+            '/api/files': self.files,
+            '/api/daily': self.daily,
+            '/api/reduction-days': self.reduction_days,
+            '/api/monthly': self.monthly,
+        }
+
+    def csv_files(self) -> list:
+        if self.watcher is not None:
+            return self.watcher.csv_files()
+        self.store.refresh()
+        return sorted(f for f in os.listdir(self.store.data_dir) if f.endswith('.csv'))
+
+    def date_index(self, csv_files: list):
+        from attendance_reports import build_file_date_index
+
+        return build_file_date_index(tuple(csv_files))
+
+    def handle(self, path: str, query: dict, if_none_match: str = None) -> tuple:
+        """
+        Returns (status, etag, body) for a GET request; body is None for 304 Not Modified.
+        """
+        path = path.rstrip('/') or '/'
+        route = self.routes.get(path)
+        if route is None:
+            raise APIError(HTTPStatus.NOT_FOUND, f"Unknown endpoint {path!r}; see {', '.join(self.routes)}.")
+        version, compute = route(query)
+        key = (path, tuple(sorted((name, tuple(values)) for name, values in query.items())), version)
+        etag = '"' + hashlib.sha1(repr(key).encode('utf-8')).hexdigest() + '"'
+        if if_none_match and etag in (tag.strip() for tag in if_none_match.split(',')):
+            return HTTPStatus.NOT_MODIFIED, etag, None
+
+        def render():
+            # Computed under the store lock, so an ingest never changes the views mid-report
+            with self.store.lock:
+                payload = compute()
+            return json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+
+        return HTTPStatus.OK, etag, self.cache.get_or_compute(key, render)
+
+    # --- Endpoints: each returns (version of its inputs, function computing the payload) ---
+    def files(self, query: dict) -> tuple:
+        from attendance_reports import files_digest
+
+        csv_files = self.csv_files()
+        index = self.date_index(csv_files)
+        entries = self.store.manifest['files']
+
+        def compute():
+            return {'files': [{'file': name, 'date': index.dates[name].date().isoformat(),
+                               'sha1': (entries.get(name) or {}).get('sha1')} for name in index.files],
+                    'undated': list(index.unparsed),
+                    'quarantined': self.store.quarantined(csv_files)}
+        return files_digest(csv_files, self.store), compute
+
+    def daily(self, query: dict) -> tuple:
+        from attendance_reports import cached_daily_analysis
+
+        csv_files = self.csv_files()
+        file_name = _single(query, 'file')
+        if file_name is None:
+            day = _date(query, 'date')
+            if day is None:
+                raise APIError(HTTPStatus.BAD_REQUEST, "Pass ?date=YYYY-MM-DD or ?file=<daily CSV name>.")
+            index = self.date_index(csv_files)
+            matches = [name for name in index.files if index.dates[name].date() == day]
+            if not matches:
+                raise APIError(HTTPStatus.NOT_FOUND, f"No daily file for {day.isoformat()}.")
+            file_name = matches[-1]
+        elif file_name not in csv_files:
+            raise APIError(HTTPStatus.NOT_FOUND, f"No daily file named {file_name!r}.")
+        reason = self.store.quarantined([file_name]).get(file_name)
+        if reason:
+            raise APIError(HTTPStatus.UNPROCESSABLE_ENTITY, f"{file_name} is quarantined: {reason}")
+        entry = self.store.manifest['files'].get(file_name) or {}
+        tables = query.get('table')
+
+        def compute():
+            analysis_results = cached_daily_analysis(file_name, self.store)
+            if not analysis_results:
+                raise APIError(HTTPStatus.UNPROCESSABLE_ENTITY,
+                               f"{file_name} lacks the columns needed for the daily analysis.")
+            unknown = sorted(set(tables or []) - set(analysis_results))
+            if unknown:
+                raise APIError(HTTPStatus.BAD_REQUEST, f"Unknown table(s) {unknown}; available: {list(analysis_results)}.")
+            return {'file': file_name, 'date': entry.get('date'),
+                    'tables': {name: frame_records(df) for name, df in analysis_results.items()
+                               if not tables or name in tables}}
+        return (file_name, entry.get('sha1'), entry.get('mtime_ns')), compute
+
+    def reduction_days(self, query: dict) -> tuple:
+        from attendance_config import FLOOR_ORDER
+        from attendance_reports import calculate_reduction_days, files_digest
+
+        csv_files = self.csv_files()
+        blocks, floors, rooms = query.get('block'), query.get('floor'), query.get('room')
+        start_date, end_date = _date(query, 'start'), _date(query, 'end')
+
+        def compute():
+            report = calculate_reduction_days(csv_files, FLOOR_ORDER, blocks, floors, rooms, store=self.store,
+                                              start_date=start_date, end_date=end_date)
+            return {'start': start_date, 'end': end_date, 'students': frame_records(report)}
+        return files_digest(csv_files, self.store), compute
+
+    def monthly(self, query: dict) -> tuple:
+        from attendance_reports import DailyRollup, active_filter, files_digest, monthly_attendance_counts
+
+        month = _single(query, 'month', required=True)
+        month_files = self.date_index(self.csv_files()).months.get(month)
+        if month_files is None:
+            raise APIError(HTTPStatus.NOT_FOUND, f"No daily files for {month!r} (expected e.g. 'Jul-2025').")
+        month_files = list(month_files)
+        blocks, floors = query.get('block'), query.get('floor')
+
+        def compute():
+            counts = monthly_attendance_counts(month_files, self.store, blocks, floors)
+            totals = self.store.view(DailyRollup).monthly_counts(month_files, active_filter(blocks), active_filter(floors))
+            return {'month': month,
+                    'days': frame_records(counts.assign(Date_Sort=counts['Date_Sort'].dt.strftime('%Y-%m-%d'))
+                                          .rename(columns={'Date_Sort': 'Date'})),
+                    'totals': frame_records(totals)}
+        return files_digest(month_files, self.store), compute
+
+
+# --- HTTP Layer ---
+class APIRequestHandler(BaseHTTPRequestHandler):
+    server_version = 'AttendanceAPI/1.0'
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        try:
+            status, etag, body = self.server.api.handle(url.path, parse_qs(url.query),
+                                                        self.headers.get('If-None-Match'))
+        except APIError as e:
+            status, etag, body = e.status, None, json.dumps({'error': str(e)}).encode('utf-8')
+        except Exception as e:
+            logger.exception("Request %s failed", self.path)
+            status, etag = HTTPStatus.INTERNAL_SERVER_ERROR, None
+            body = json.dumps({'error': str(e) or type(e).__name__}).encode('utf-8')
+
+        self.send_response(status)
+        if etag:
+            self.send_header('ETag', etag)
+            # Clients may keep the answer but must revalidate it (cheap: 304 while the files are unchanged)
+            self.send_header('Cache-Control', 'no-cache')
+        if body is not None:
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body is not None:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.info("%s - %s", self.address_string(), format % args)
+
+
+class APIServer(HTTPServer):
+    """
+    HTTPServer whose requests are handled by a fixed pool of worker threads.
+    """
+    daemon_threads = True
+
+    def __init__(self, address: tuple, api: AttendanceAPI, workers: int = API_WORKERS):
+        super().__init__(address, APIRequestHandler)
+        self.api = api
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='attendance-api')
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._process_request_worker, request, client_address)
+
+    def _process_request_worker(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=True)
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Serve the attendance reports as a local JSON API.")
+    parser.add_argument('--data-dir', default='.', help="Directory with the daily CSV files (default: current)")
+    parser.add_argument('--host', default=API_HOST, help=f"Address to listen on (default: {API_HOST})")
+    parser.add_argument('--port', type=int, default=API_PORT, help=f"Port to listen on (default: {API_PORT})")
+    parser.add_argument('--workers', type=int, default=API_WORKERS,
+                        help=f"Worker threads answering requests (default: {API_WORKERS})")
+    parser.add_argument('--no-watch', action='store_true',
+                        help="Do not watch the directory; it is then scanned on every request")
+    parser.add_argument('-q', '--quiet', action='store_true', help="Only log errors")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.ERROR if args.quiet else logging.INFO, format='%(message)s')
+    api = AttendanceAPI(args.data_dir, watch=not args.no_watch)
+    server = APIServer((args.host, args.port), api, workers=args.workers)
+    logger.info("Serving the attendance API for %s on http://%s:%d/api/", os.path.abspath(args.data_dir),
+                *server.server_address[:2])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if api.watcher is not None:
+            api.watcher.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,235 @@
+"""
+Headless batch generation of the attendance reports, e.g. for nightly jobs:
+
+    python attendance_batch.py --data-dir /path/to/daily/csvs --output-dir reports
+
+Writes one Daily_Analysis_<date>.xlsx per dated daily CSV (the same workbook as the dashboard's
+daily download) and Reduction_Days_Report.xlsx. Neither Streamlit nor matplotlib is imported,
+and the report modules (pandas, pyarrow) only once the arguments are parsed, so --help and
+argument errors return immediately. Outputs whose source files and settings have not changed
+since the last run are skipped.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+from datetime import date
+
+import attendance_perf
+from attendance_config import FLOOR_ORDER, LATE_PUNCH_TIME_STR
+
+logger = logging.getLogger('attendance_batch')
+
+# --- Constants for Batch Output ---
+# Records the fingerprint every output was generated from (kept in the output directory)
+BATCH_MANIFEST_NAME = '.batch_manifest.json'
+DAILY_DIR_NAME = 'daily'
+REDUCTION_REPORT_NAME = 'Reduction_Days_Report.xlsx'
+
+
+def daily_report_name(file_name: str) -> str:
+    """
+    Returns the output name of a daily report (same as the dashboard's download file name).
+    """
+    return f"Daily_Analysis_{file_name.replace('.csv', '')}.xlsx"
+
+
+def fingerprint(*parts) -> str:
+    """
+    Returns a digest of the report settings plus the given parts (e.g. source file SHA-1s);
+    an output is up to date when it exists and was generated from the same fingerprint.
+    """
+    from attendance_io import SCHEMA_VERSION
+
+    settings = [SCHEMA_VERSION, LATE_PUNCH_TIME_STR, list(FLOOR_ORDER)]
+    return hashlib.sha1(json.dumps(settings + list(parts), default=str).encode('utf-8')).hexdigest()
+
+
+# --- Batch Manifest (output name -> fingerprint) ---
+def load_batch_manifest(output_dir: str) -> dict:
+    try:
+        with open(os.path.join(output_dir, BATCH_MANIFEST_NAME), 'r', encoding='utf-8') as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_batch_manifest(output_dir: str, manifest: dict):
+    path = os.path.join(output_dir, BATCH_MANIFEST_NAME)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as fh:
+        json.dump(manifest, fh, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def is_up_to_date(manifest: dict, output_dir: str, output_name: str, digest: str) -> bool:
+    return manifest.get(output_name) == digest and os.path.exists(os.path.join(output_dir, output_name))
+
+
+# --- Worker for One Daily Report (module level so it can run in a process pool) ---
+def write_daily_report(job: tuple):
+    """
+    Analyzes one daily CSV and writes its Excel report. job = (csv path, output path, long_form).
+    Returns None on success or an error message; the file is replaced atomically.
+    """
+    from attendance_reports import analyze_attendance_file, generate_excel_file
+
+    csv_path, output_path, long_form = job
+    try:
+        analysis_results = analyze_attendance_file(csv_path, long_form)
+        if not analysis_results:
+            return 'missing required columns for daily analysis'
+        tmp_path = output_path + '.tmp'
+        generate_excel_file(analysis_results, output=tmp_path)
+        os.replace(tmp_path, output_path)
+    except Exception as e:
+        return str(e) or type(e).__name__
+    return None
+
+
+def run_daily_reports(store, date_index, output_dir: str, manifest: dict, force: bool = False,
+                      workers: int = None, long_form: bool = False) -> dict:
+    """
+    Writes the daily reports that are missing or stale (all of them with force=True), in parallel.
+    With long_form the per-room sheets list one student per row instead of joined names.
+    Returns counts of 'written', 'skipped' and 'failed' reports.
+    """
+    from attendance_io import load_daily_files
+
+    daily_dir = os.path.join(output_dir, DAILY_DIR_NAME)
+    os.makedirs(daily_dir, exist_ok=True)
+
+    jobs, digests = [], {}
+    skipped = 0
+    for file_name in date_index.files:
+        entry = store.manifest['files'].get(file_name)
+        if entry is None or 'error' in entry:
+            # Quarantined (see AttendanceStore.quarantined); reported once after the ingest
+            continue
+        output_name = os.path.join(DAILY_DIR_NAME, daily_report_name(file_name))
+        digest = fingerprint(entry['sha1'], *(['long-form'] if long_form else []))
+        if not force and is_up_to_date(manifest, output_dir, output_name, digest):
+            skipped += 1
+            continue
+        digests[output_name] = digest
+        jobs.append((os.path.join(store.data_dir, file_name), os.path.join(output_dir, output_name), long_form))
+
+    # xlsxwriter is pure Python, so the reports are written in worker processes
+    written = failed = 0
+    for (csv_path, output_path, _), error in load_daily_files(jobs, reducer=write_daily_report, workers=workers,
+                                                           executor='process'):
+        output_name = os.path.relpath(output_path, output_dir)
+        if error is None:
+            manifest[output_name] = digests[output_name]
+            written += 1
+        else:
+            manifest.pop(output_name, None)
+            logger.error("Could not generate the daily report for %s: %s", os.path.basename(csv_path), error)
+            failed += 1
+    return {'written': written, 'skipped': skipped, 'failed': failed}
+
+
+def run_reduction_report(store, csv_files: list, output_dir: str, manifest: dict, force: bool = False,
+                         selected_blocks: list = None, selected_floors: list = None,
+                         selected_rooms: list = None, start_date: date = None, end_date: date = None) -> bool:
+    """
+    Writes the Reduction Days report unless it is up to date. Returns True if it was (re)written.
+    """
+    from attendance_reports import calculate_reduction_days, generate_excel_file
+    from attendance_views import REDUCTION_REQUIRED_COLS
+
+    contributing = store.ordered(store.files(csv_files, REDUCTION_REQUIRED_COLS))
+    digest = fingerprint([(name, store.manifest['files'][name]['sha1']) for name in contributing],
+                         selected_blocks, selected_floors, selected_rooms, start_date, end_date)
+    if not force and is_up_to_date(manifest, output_dir, REDUCTION_REPORT_NAME, digest):
+        return False
+
+    cumulative_df = calculate_reduction_days(csv_files, FLOOR_ORDER, selected_blocks, selected_floors,
+                                             selected_rooms, store=store, start_date=start_date, end_date=end_date)
+    output_path = os.path.join(output_dir, REDUCTION_REPORT_NAME)
+    generate_excel_file({'Reduction Days': cumulative_df}, output=output_path + '.tmp')
+    os.replace(output_path + '.tmp', output_path)
+    manifest[REDUCTION_REPORT_NAME] = digest
+    return True
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate all attendance reports without the dashboard.")
+    parser.add_argument('--data-dir', default='.', help="Directory with the daily CSV files (default: current)")
+    parser.add_argument('--output-dir', default='reports', help="Directory for the Excel reports (default: reports)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Parallel workers for ingest and daily reports (default: ATTENDANCE_LOAD_WORKERS or CPU count)")
+    parser.add_argument('--force', action='store_true', help="Regenerate every report, even if up to date")
+    parser.add_argument('--no-daily', action='store_true', help="Skip the daily reports")
+    parser.add_argument('--long-form-rooms', action='store_true',
+                        help="List one student per row in the daily per-room sheets instead of joined names (faster)")
+    parser.add_argument('--no-reduction', action='store_true', help="Skip the Reduction Days report")
+    parser.add_argument('--block', action='append', help="Limit the Reduction Days report to a Block (repeatable)")
+    parser.add_argument('--floor', action='append', help="Limit the Reduction Days report to a Floor (repeatable)")
+    parser.add_argument('--room', action='append', help="Limit the Reduction Days report to a Room No. (repeatable)")
+    parser.add_argument('--start', type=date.fromisoformat,
+                        help="Only count absences from this date (YYYY-MM-DD) in the Reduction Days report")
+    parser.add_argument('--end', type=date.fromisoformat,
+                        help="Only count absences up to this date (YYYY-MM-DD) in the Reduction Days report")
+    parser.add_argument('--trace', help="Record stage timings and write them to this Chrome trace (JSON) file")
+    parser.add_argument('-q', '--quiet', action='store_true', help="Only report errors")
+    args = parser.parse_args(argv)
+
+    # Stages are recorded into a recorder of this run only
+    recorder = attendance_perf.Recorder() if args.trace else None
+    with attendance_perf.recording(recorder):
+        return run_batch(args)
+
+
+def run_batch(args: argparse.Namespace) -> int:
+    """
+    Ingests the data directory and writes the reports selected by the parsed command line `args`.
+    Returns the exit code.
+    """
+    from attendance_io import default_workers
+    from attendance_reports import build_file_date_index, get_attendance_store
+
+    logging.basicConfig(level=logging.ERROR if args.quiet else logging.INFO, format='%(message)s')
+    workers = args.workers or default_workers()
+
+    csv_files = sorted(f for f in os.listdir(args.data_dir) if f.endswith('.csv'))
+    if not csv_files:
+        logger.error("No CSV files found in %s.", os.path.abspath(args.data_dir))
+        return 1
+
+    store = get_attendance_store(args.data_dir)
+    store.workers = workers
+    changed = store.refresh()
+    logger.info("Ingested %d new or changed file(s) of %d.", len(changed), len(csv_files))
+    for file_name, reason in store.quarantined(csv_files).items():
+        logger.warning("Skipping quarantined file %s: %s", file_name, reason)
+
+    date_index = build_file_date_index(tuple(csv_files))
+    for file_name in date_index.unparsed:
+        logger.warning("Skipping daily report for %s: unrecognised date in file name.", file_name)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    manifest = load_batch_manifest(args.output_dir)
+    failed = 0
+    try:
+        if not args.no_daily:
+            counts = run_daily_reports(store, date_index, args.output_dir, manifest, args.force, workers,
+                                       args.long_form_rooms)
+            failed += counts['failed']
+            logger.info("Daily reports: %(written)d written, %(skipped)d up to date, %(failed)d failed.", counts)
+        if not args.no_reduction:
+            written = run_reduction_report(store, csv_files, args.output_dir, manifest, args.force,
+                                           args.block, args.floor, args.room, args.start, args.end)
+            logger.info("Reduction Days report: %s.", 'written' if written else 'up to date')
+    finally:
+        save_batch_manifest(args.output_dir, manifest)
+        if args.trace:
+            # Daily reports written in worker processes are not part of the trace
+            attendance_perf.export_trace(args.trace)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
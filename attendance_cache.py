@@ -0,0 +1,244 @@
+import hashlib
+import logging
+import os
+import pickle
+import sys
+import threading
+from collections import OrderedDict
+
+from attendance_perf import annotate
+
+# --- Constants for the Result Cache ---
+# Set to 1 to keep cached results on disk (in the store directory) so they survive restarts
+CACHE_PERSIST_ENV = 'ATTENDANCE_CACHE_PERSIST'
+RESULT_CACHE_DIR_NAME = 'results'
+# Bumped when the layout of cached values changes; older files on disk are then ignored
+RESULT_CACHE_VERSION = 1
+# In-memory bounds (least recently used entries are evicted first)
+RESULT_CACHE_ENTRIES = 64
+RESULT_CACHE_BYTES = 512 * 1024 * 1024
+# Bound of the on-disk copies (oldest used files are deleted first)
+RESULT_CACHE_DISK_BYTES = 2 * 1024 * 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+def persist_enabled() -> bool:
+    return os.environ.get(CACHE_PERSIST_ENV, '0') not in ('', '0')
+
+
+def estimate_nbytes(value) -> int:
+    """
+    Returns the approximate memory held by a cached value: DataFrames / Series (deep), bytes,
+    buffers and containers of them.
+    """
+    if hasattr(value, 'memory_usage'):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum()) if hasattr(usage, 'sum') else int(usage)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if hasattr(value, 'getbuffer'):
+        return value.getbuffer().nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_nbytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_nbytes(v) for v in value)
+    return sys.getsizeof(value)
+
+
+# --- Bounded LRU Cache of Derived Results (optionally persisted) ---
+class ResultCache:
+    """
+    Least-recently-used cache of values derived from files, bounded by entry count and by
+    estimated memory. Keys are tuples that should include the source's version (see
+    file_version), so a changed file is never served a stale result.
+
+    With a cache_dir every value is also pickled to disk; a value evicted from memory or lost
+    with the process is then loaded from there instead of being recomputed. Cached values are
+    shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, max_entries: int = RESULT_CACHE_ENTRIES, max_bytes: int = RESULT_CACHE_BYTES,
+                 cache_dir: str = None, max_disk_bytes: int = RESULT_CACHE_DISK_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()   # key -> (value, nbytes), least recently used first
+        self._digests = {}              # path -> (mtime_ns, size, sha1)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        """
+        Returns the hit/miss counters and the current size of the cache.
+        """
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self.nbytes,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._digests.clear()
+            self.nbytes = 0
+
+    # --- Source Versions ---
+    def file_version(self, path: str, known: dict = None) -> tuple:
+        """
+        Returns (absolute path, mtime_ns, SHA-1) of a file. The digest is reused while the file's
+        mtime and size are unchanged: from `known` (a store manifest entry) or from an earlier call.
+        """
+        from attendance_store import file_digest
+
+        stat_result = os.stat(path)
+        path = os.path.abspath(path)
+        fingerprint = (stat_result.st_mtime_ns, stat_result.st_size)
+        if known and (known.get('mtime_ns'), known.get('size')) == fingerprint and known.get('sha1'):
+            return path, stat_result.st_mtime_ns, known['sha1']
+        with self._lock:
+            remembered = self._digests.get(path)
+        if remembered is not None and remembered[:2] == fingerprint:
+            return path, stat_result.st_mtime_ns, remembered[2]
+        sha1 = file_digest(path)
+        with self._lock:
+            self._digests[path] = (*fingerprint, sha1)
+        return path, stat_result.st_mtime_ns, sha1
+
+    # --- Lookups ---
+    def get(self, key: tuple, default=None):
+        """
+        Returns the cached value for key (from memory, else from disk), or default.
+        """
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached[0]
+        loaded = self._load(key)
+        with self._lock:
+            if loaded is None:
+                self.misses += 1
+                return default
+            self.disk_hits += 1
+        value = loaded[0]
+        self._remember(key, value, estimate_nbytes(value))
+        return value
+
+    def put(self, key: tuple, value, nbytes: int = None):
+        """
+        Caches value under key (and writes it to disk when persistence is on).
+        """
+        self._remember(key, value, estimate_nbytes(value) if nbytes is None else nbytes)
+        self._save(key, value)
+
+    def get_or_compute(self, key: tuple, compute):
+        """
+        Returns the cached value for key, calling compute() and caching its result on a miss.
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def _remember(self, key: tuple, value, nbytes: int):
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.nbytes -= previous[1]
+            if nbytes > self.max_bytes:
+                # Larger than the whole budget: only kept on disk (if at all)
+                return
+            self._entries[key] = (value, nbytes)
+            self.nbytes += nbytes
+            while len(self._entries) > self.max_entries or self.nbytes > self.max_bytes:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self.nbytes -= evicted_bytes
+                self.evictions += 1
+
+    # --- Disk Persistence ---
+    def _disk_path(self, key: tuple) -> str:
+        name = hashlib.sha1(repr((RESULT_CACHE_VERSION, key)).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, name + '.pkl')
+
+    def _load(self, key: tuple):
+        """
+        Returns (value,) from the on-disk copy of key, or None.
+        """
+        if self.cache_dir is None:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, 'rb') as fh:
+                stored_key, value = pickle.load(fh)
+            os.utime(path)   # recently used, so pruned last
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning("Ignoring unreadable cached result %s (%s).", path, e)
+            return None
+        if stored_key != key:
+            return None
+        annotate(nbytes=os.path.getsize(path))
+        return (value,)
+
+    def _save(self, key: tuple, value):
+        if self.cache_dir is None:
+            return
+        path = self._disk_path(key)
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, 'wb') as fh:
+                pickle.dump((key, value), fh, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            # The cache is an optimization; keep serving from memory
+            logger.warning("Could not persist cached result to %s (%s).", self.cache_dir, e)
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+        self._prune_disk()
+
+    def _prune_disk(self):
+        """
+        Deletes the least recently used on-disk copies beyond max_disk_bytes.
+        """
+        files = []
+        with os.scandir(self.cache_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith('.pkl'):
+                    try:
+                        stat_result = entry.stat()
+                    except OSError:
+                        continue
+                    files.append((stat_result.st_mtime_ns, stat_result.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
@@ -0,0 +1,8 @@
+# --- Constants for Configuration (shared by the dashboard and the attendance store) ---
+LATE_PUNCH_TIME_STR = '20:45:00'
+FLOOR_ORDER = [
+    'FirstFloor', 'SecondFloor', 'ThirdFloor', 'FourthFloor',
+    'FifthFloor', 'SixthFloor', 'SeventhFloor', 'EighthFloor'
+]
+# Added multiple formats to handle various file name date styles
+DATE_FORMATS = ['%d-%B-%Y', '%d-%b-%Y', '%d-%B%Y', '%d-%b%Y']
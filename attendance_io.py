@@ -0,0 +1,304 @@
+import functools
+import importlib.util
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from attendance_config import FLOOR_ORDER
+from attendance_perf import annotate, bind, is_enabled, profiled
+
+# --- Constants for Loading Daily Files ---
+# Overrides the default worker count (number of CPU cores) for parallel loads
+LOAD_WORKERS_ENV = 'ATTENDANCE_LOAD_WORKERS'
+# The pyarrow CSV engine parses multi-threaded and releases the GIL; fall back to pandas' C engine
+CSV_ENGINE = 'pyarrow' if importlib.util.find_spec('pyarrow') is not None else 'c'
+
+
+# --- Helper Function for Reading One Daily CSV ---
+@profiled('read_csv')
+def read_daily_csv(path: str) -> pd.DataFrame:
+    """
+    Reads one daily CSV with every column as text so values (e.g. Room No.) are kept
+    exactly as exported, independent of what pandas would infer for that particular day.
+    """
+    df = None
+    if CSV_ENGINE == 'pyarrow':
+        try:
+            df = pd.read_csv(path, dtype=str, engine='pyarrow')
+        except Exception:
+            # The pyarrow parser is stricter (e.g. ragged rows); let the C engine decide
+            pass
+    if df is None:
+        df = pd.read_csv(path, dtype=str)
+    if is_enabled():
+        annotate(rows=len(df), nbytes=os.path.getsize(path))
+    return df
+
+
+# --- Declared Schema for Attendance Frames ---
+# Bumped whenever apply_schema changes the in-memory representation
+SCHEMA_VERSION = 1
+TEXT_COLS = ['Student Name', 'Room No.', 'Punch Records']
+# Status categories; unexpected values are appended so nothing is lost
+STATUS_CATEGORIES = ['Present', 'Not Present']
+# Last Punch is held as seconds since midnight; missing or malformed punches become -1
+MISSING_PUNCH = -1
+
+
+def _categorical(series: pd.Series, known: list = None, ordered: bool = False) -> pd.Series:
+    """
+    Converts a column to a Categorical whose categories are `known` followed by any other values (sorted).
+    """
+    values = series.astype('string')
+    known = list(known or [])
+    categories = known + sorted(set(values.dropna().unique()) - set(known))
+    return pd.Series(pd.Categorical(values, categories=categories, ordered=ordered),
+                     index=series.index, name=series.name)
+
+
+def compact_employee_codes(series: pd.Series) -> pd.Series:
+    """
+    Converts Employee Codes to the smallest integer dtype that holds them (nullable if any are missing).
+    Columns with non-numeric codes keep numeric codes as ints and the rest as text (object dtype).
+    """
+    if pd.api.types.is_integer_dtype(series.dtype):
+        numeric = series
+    else:
+        numeric = pd.to_numeric(series, errors='coerce')
+        unparsed = numeric.isna() & series.notna()
+        if unparsed.any() or (numeric.dropna() % 1 != 0).any():
+            mixed = series.astype(object).where(unparsed, numeric.astype('Int64').astype(object))
+            return mixed.where(series.notna(), None)
+    has_na = bool(numeric.isna().any())
+    fits_int32 = numeric.dropna().empty or (
+        numeric.min() >= np.iinfo(np.int32).min and numeric.max() <= np.iinfo(np.int32).max)
+    if has_na:
+        return numeric.astype('Int32' if fits_int32 else 'Int64')
+    return numeric.astype(np.int32 if fits_int32 else np.int64)
+
+
+def punch_seconds(series: pd.Series) -> np.ndarray:
+    """
+    Returns HH:MM:SS punch times as int32 seconds since midnight (MISSING_PUNCH when absent/invalid).
+    Integer input is assumed to be converted already.
+    """
+    if pd.api.types.is_integer_dtype(series.dtype):
+        return series.to_numpy(dtype=np.int32)
+    parsed = pd.to_datetime(series, format='%H:%M:%S', errors='coerce')
+    seconds = parsed.dt.hour * 3600 + parsed.dt.minute * 60 + parsed.dt.second
+    return seconds.fillna(MISSING_PUNCH).to_numpy(dtype=np.int32)
+
+
+def time_to_seconds(time_str: str) -> int:
+    """
+    Converts an 'HH:MM:SS' string (e.g. LATE_PUNCH_TIME_STR) to seconds since midnight.
+    """
+    hours, minutes, seconds = (int(part) for part in time_str.split(':'))
+    return hours * 3600 + minutes * 60 + seconds
+
+
+@functools.lru_cache(maxsize=1)
+def _clock_text() -> np.ndarray:
+    """
+    Returns the 'HH:MM:SS' text of every second of the day, indexed by seconds since midnight.
+    """
+    return np.array([f'{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}' for s in range(86400)], dtype=object)
+
+
+def format_punch_seconds(values) -> pd.Series:
+    """
+    Formats seconds since midnight back to 'HH:MM:SS' text (missing punches become <NA>)
+    by looking every value up in a table of the day's 86,400 times.
+    """
+    index = getattr(values, 'index', None)
+    values = np.asarray(values)
+    valid = values >= 0
+    text = np.full(len(values), None, dtype=object)
+    text[valid] = _clock_text()[values[valid] % 86400]
+    return pd.Series(pd.array(text, dtype='string'), index=index)
+
+
+def apply_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Applies the declared compact schema to an attendance frame (idempotent; absent columns are skipped):
+    int Employee Code, categorical Block / Floor (FLOOR_ORDER first, ordered) / Status,
+    text names and rooms, and Last Punch as int32 seconds since midnight.
+    """
+    df = df.copy()
+    if 'Employee Code' in df.columns:
+        df['Employee Code'] = compact_employee_codes(df['Employee Code'])
+    for col in TEXT_COLS:
+        if col in df.columns:
+            df[col] = df[col].astype('string')
+    if 'Block' in df.columns:
+        df['Block'] = _categorical(df['Block'])
+    if 'Floor' in df.columns:
+        df['Floor'] = _categorical(df['Floor'], FLOOR_ORDER, ordered=True)
+    if 'Status' in df.columns:
+        df['Status'] = _categorical(df['Status'], STATUS_CATEGORIES)
+    if 'Last Punch' in df.columns:
+        df['Last Punch'] = punch_seconds(df['Last Punch'])
+    return df
+
+
+# --- Parsed Punch Records (flat int32 values + offsets) ---
+class PunchRecords:
+    """
+    All punches of a column of 'Punch Records' strings in CSR layout: the punches of row i are
+    values[offsets[i]:offsets[i + 1]] (int32 seconds since midnight, in the order exported).
+    """
+
+    def __init__(self, values: np.ndarray, offsets: np.ndarray):
+        self.values = values
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def counts(self) -> np.ndarray:
+        """
+        Returns the number of punches per row.
+        """
+        return np.diff(self.offsets)
+
+    def row_ids(self) -> np.ndarray:
+        """
+        Returns the row index of every punch in `values`.
+        """
+        return np.repeat(np.arange(len(self)), self.counts())
+
+    def _reduce(self, ufunc) -> np.ndarray:
+        result = np.full(len(self), MISSING_PUNCH, dtype=np.int32)
+        nonempty = self.counts() > 0
+        if nonempty.any():
+            result[nonempty] = ufunc.reduceat(self.values, self.offsets[:-1][nonempty])
+        return result
+
+    def first(self) -> np.ndarray:
+        """
+        Returns each row's earliest punch (MISSING_PUNCH for rows without punches).
+        """
+        return self._reduce(np.minimum)
+
+    def last(self) -> np.ndarray:
+        """
+        Returns each row's latest punch (MISSING_PUNCH for rows without punches).
+        """
+        return self._reduce(np.maximum)
+
+    def count_after(self, seconds: int) -> np.ndarray:
+        """
+        Returns the number of punches per row later than `seconds` since midnight.
+        """
+        return np.bincount(self.row_ids(), weights=self.values > seconds, minlength=len(self)).astype(np.int32)
+
+
+def parse_punch_records(series: pd.Series) -> PunchRecords:
+    """
+    Parses a column of comma-separated punch lists (e.g. '19:54:33,19:42:54,') without per-row
+    Python: the rows are joined into one byte buffer, every 'H:MM:SS'/'HH:MM:SS' token is found
+    from its colon pattern with NumPy and assigned to its row by the row start offsets. A token
+    must not be fused to other digits ('123:45:56' and '12:34:567' are not punches).
+    """
+    text = series.astype('string').fillna('')
+    n_rows = len(text)
+    lengths = text.str.len().to_numpy(dtype=np.int64)
+    # One byte per character ('replace' keeps non-ASCII characters single-byte) and one separator per row
+    buf = np.frombuffer('\n'.join(text.tolist()).encode('ascii', 'replace'), dtype=np.uint8)
+    row_starts = np.concatenate([[0], np.cumsum(lengths + 1)[:-1]]) if n_rows else np.zeros(0, np.int64)
+
+    colon = buf == ord(':')
+    is_digit = (buf >= ord('0')) & (buf <= ord('9'))
+    digit = buf.astype(np.int32) - ord('0')
+    # c is the first colon of a token when buf[c] and buf[c + 3] are both colons
+    c = np.flatnonzero(colon[1:-5] & colon[4:-2]) + 1 if len(buf) >= 7 else np.zeros(0, np.int64)
+    valid = is_digit[c - 1] & is_digit[c + 1] & is_digit[c + 2] & is_digit[c + 4] & is_digit[c + 5]
+    two_digit_hour = (c >= 2) & is_digit[np.maximum(c - 2, 0)]
+    hours = digit[c - 1] + np.where(two_digit_hour, digit[np.maximum(c - 2, 0)] * 10, 0)
+    # Tokens start and end at a boundary: no digit before the hour or after the seconds
+    before = np.where(two_digit_hour, c - 3, c - 2)
+    valid &= (before < 0) | ~is_digit[np.maximum(before, 0)]
+    valid &= (c + 6 >= len(buf)) | ~is_digit[np.minimum(c + 6, len(buf) - 1)]
+    minutes = digit[c + 1] * 10 + digit[c + 2]
+    seconds = digit[c + 4] * 10 + digit[c + 5]
+    valid &= (hours < 24) & (minutes < 60) & (seconds < 60)
+    c = c[valid]
+
+    values = (hours[valid] * 3600 + minutes[valid] * 60 + seconds[valid]).astype(np.int32)
+    rows = np.searchsorted(row_starts, c, side='right') - 1
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=n_rows))]).astype(np.int64)
+    return PunchRecords(values, offsets)
+
+
+def parquet_safe(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns a frame Parquet can store: mixed int/text Employee Codes are written as text
+    (compact_employee_codes restores them on load).
+    """
+    if 'Employee Code' in df.columns and df['Employee Code'].dtype == object:
+        df = df.assign(**{'Employee Code': df['Employee Code'].astype('string')})
+    return df
+
+
+def read_attendance_csv(path: str) -> pd.DataFrame:
+    """
+    Reads one daily CSV and applies the declared compact schema.
+    """
+    return apply_schema(read_daily_csv(path))
+
+
+# --- Streaming Reader for Very Large Daily Files ---
+# Rows per chunk when a daily CSV is streamed instead of loaded whole
+STREAM_CHUNK_ROWS = 250_000
+
+
+def iter_attendance_csv(path: str, chunk_rows: int = STREAM_CHUNK_ROWS):
+    """
+    Yields one daily CSV as chunks of at most chunk_rows rows with the declared compact schema
+    applied, so memory stays bounded by the chunk size. Like read_daily_csv every column is read
+    as text; the row index continues across chunks.
+    """
+    with pd.read_csv(path, dtype=str, chunksize=chunk_rows) as reader:
+        for chunk in reader:
+            yield apply_schema(chunk)
+
+
+# --- Helper Function for the Worker Count ---
+def default_workers() -> int:
+    """
+    Returns the worker count from ATTENDANCE_LOAD_WORKERS, or the number of CPU cores.
+    """
+    try:
+        return max(1, int(os.environ[LOAD_WORKERS_ENV]))
+    except (KeyError, ValueError):
+        return os.cpu_count() or 1
+
+
+# --- Parallel Multi-File Loader ---
+def load_daily_files(items: list, reducer=read_daily_csv, workers: int = None,
+                     executor: str = 'auto', order_key=None) -> list:
+    """
+    Applies `reducer` to every item (typically a CSV path) concurrently and returns
+    [(item, result), ...] sorted by `order_key(item)` (input order when None), so the
+    result order never depends on which worker finished first.
+
+    `executor` is 'thread', 'process' or 'auto' (threads with the GIL-releasing pyarrow
+    engine, processes otherwise). `reducer` must be a module-level function for processes.
+    Exceptions raised by the reducer propagate to the caller.
+    """
+    items = sorted(items, key=order_key) if order_key is not None else list(items)
+    workers = min(workers or default_workers(), len(items))
+    if workers <= 1:
+        return [(item, reducer(item)) for item in items]
+
+    if executor == 'auto':
+        executor = 'thread' if CSV_ENGINE == 'pyarrow' else 'process'
+    pool_cls = ThreadPoolExecutor if executor == 'thread' else ProcessPoolExecutor
+    with pool_cls(max_workers=workers) as pool:
+        # map() yields in submission order regardless of completion order
+        chunksize = 1 if executor == 'thread' else max(1, len(items) // (workers * 4))
+        task = bind(reducer) if executor == 'thread' else reducer
+        results = list(pool.map(task, items, chunksize=chunksize))
+    return list(zip(items, results))
@@ -0,0 +1,201 @@
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    # Only for annotations: importing pandas here would make this module (imported by every other one) slow
+    import pandas as pd
+
+# --- Constants for Stage Instrumentation ---
+# Set to 1 to record stage timings by default (the dashboard can still toggle it per session)
+PROFILE_ENV = 'ATTENDANCE_PROFILE'
+
+
+class Recorder:
+    """
+    Collects the stages of one run (a dashboard rerun, a batch run). Thread-safe; each thread
+    keeps its own stack of open stages.
+    """
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self._records = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def open_stages(self) -> list:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def add(self, record: dict):
+        with self._lock:
+            self._records.append(record)
+
+    def records(self) -> list:
+        with self._lock:
+            return sorted(self._records, key=lambda record: record['start'])
+
+
+# The recorder of the current run: per thread / asyncio task, so concurrent dashboard sessions
+# never see (or reset) each other's stages. None (the default) disables recording.
+_recorder = contextvars.ContextVar('attendance_perf_recorder', default=None)
+
+
+def default_enabled() -> bool:
+    """
+    Whether recording was requested through ATTENDANCE_PROFILE.
+    """
+    return os.environ.get(PROFILE_ENV, '') not in ('', '0')
+
+
+def is_enabled() -> bool:
+    return _recorder.get() is not None
+
+
+@contextlib.contextmanager
+def recording(recorder: Recorder = None):
+    """
+    Installs `recorder` for the current thread / task while the block runs (recording is off
+    inside the block when it is None) and yields it.
+    """
+    token = _recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _recorder.reset(token)
+
+
+def bind(fn):
+    """
+    Wraps `fn` to record into the caller's recorder when it runs in another thread (worker
+    threads do not inherit the caller's context). Returns `fn` itself while recording is off.
+    """
+    recorder = _recorder.get()
+    if recorder is None:
+        return fn
+
+    @functools.wraps(fn)
+    def bound(*args, **kwargs):
+        with recording(recorder):
+            return fn(*args, **kwargs)
+    return bound
+
+
+@contextlib.contextmanager
+def _recorded_stage(recorder: Recorder, name: str, rows: int = None, nbytes: int = None):
+    stack = recorder.open_stages()
+    record = {'stage': name, 'start': time.perf_counter() - recorder.origin, 'seconds': 0.0,
+              'rows': rows, 'bytes': nbytes, 'depth': len(stack), 'thread': threading.get_ident()}
+    stack.append(record)
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record['seconds'] = time.perf_counter() - start
+        stack.pop()
+        recorder.add(record)
+
+
+def stage(name: str, rows: int = None, nbytes: int = None):
+    """
+    Context manager timing one stage (wall time, plus rows processed / bytes read or written when known).
+    Stages opened inside it are recorded as nested. Does nothing while recording is disabled.
+    """
+    recorder = _recorder.get()
+    if recorder is None:
+        return contextlib.nullcontext()
+    return _recorded_stage(recorder, name, rows, nbytes)
+
+
+def profiled(name: str = None):
+    """
+    Decorator recording every call of a function as a stage (named after the function by default).
+    """
+    def decorator(fn):
+        stage_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            recorder = _recorder.get()
+            if recorder is None:
+                return fn(*args, **kwargs)
+            with _recorded_stage(recorder, stage_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def annotate(rows: int = None, nbytes: int = None):
+    """
+    Adds rows processed / bytes read or written to the innermost open stage of the calling thread.
+    """
+    recorder = _recorder.get()
+    if recorder is None:
+        return
+    stack = recorder.open_stages()
+    if not stack:
+        return
+    record = stack[-1]
+    if rows is not None:
+        record['rows'] = (record['rows'] or 0) + int(rows)
+    if nbytes is not None:
+        record['bytes'] = (record['bytes'] or 0) + int(nbytes)
+
+
+def records() -> list:
+    """
+    Returns the finished stages of the current recorder in start order ([] while recording is off).
+    """
+    recorder = _recorder.get()
+    return recorder.records() if recorder is not None else []
+
+
+def summary() -> 'pd.DataFrame':
+    """
+    Returns the recorded stages aggregated per stage name: calls, total/max wall time, rows, bytes.
+    """
+    # Imported here so that importing this module (done by every other one) stays cheap
+    import pandas as pd
+
+    columns = ['Stage', 'Calls', 'Total ms', 'Max ms', 'Rows', 'Bytes']
+    recorded = records()
+    if not recorded:
+        return pd.DataFrame(columns=columns)
+    df = pd.DataFrame(recorded)
+    df['ms'] = df['seconds'] * 1000
+    grouped = df.groupby('stage', sort=False).agg(
+        Calls=('ms', 'size'), **{'Total ms': ('ms', 'sum'), 'Max ms': ('ms', 'max')},
+        Rows=('rows', lambda values: values.dropna().sum()), Bytes=('bytes', lambda values: values.dropna().sum()))
+    grouped = grouped.reset_index().rename(columns={'stage': 'Stage'})
+    grouped[['Total ms', 'Max ms']] = grouped[['Total ms', 'Max ms']].round(1)
+    grouped[['Rows', 'Bytes']] = grouped[['Rows', 'Bytes']].astype('int64')
+    return grouped[columns]
+
+
+def trace_json() -> str:
+    """
+    Returns the recorded stages in the Chrome trace event format (open in chrome://tracing or Perfetto).
+    """
+    pid = os.getpid()
+    events = []
+    for record in records():
+        args = {key: record[key] for key in ('rows', 'bytes') if record[key] is not None}
+        events.append({'name': record['stage'], 'ph': 'X', 'pid': pid, 'tid': record['thread'],
+                       'ts': round(record['start'] * 1e6, 1), 'dur': round(record['seconds'] * 1e6, 1),
+                       'args': args})
+    return json.dumps({'traceEvents': events, 'displayTimeUnit': 'ms'}, indent=1)
+
+
+def export_trace(path: str):
+    """
+    Writes the recorded stages as a Chrome trace file.
+    """
+    with open(path, 'w', encoding='utf-8') as fh:
+        fh.write(trace_json())
@@ -0,0 +1,1052 @@
+import calendar
+import functools
+import hashlib
+import io
+import logging
+import os
+import re
+import tempfile
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from attendance_cache import RESULT_CACHE_DIR_NAME, ResultCache, persist_enabled
+from attendance_config import DATE_FORMATS, FLOOR_ORDER, LATE_PUNCH_TIME_STR
+from attendance_io import (
+    SCHEMA_VERSION, STREAM_CHUNK_ROWS, format_punch_seconds, iter_attendance_csv, parse_punch_records,
+    read_attendance_csv, time_to_seconds
+)
+from attendance_perf import annotate, profiled
+from attendance_store import AttendanceStore, open_store
+from attendance_views import (
+    LOCATION_COLS, REDUCTION_DETAIL_COLS, REDUCTION_REQUIRED_COLS, WEEKDAY_NAMES, AbsenceBitmap, DailyRollup,
+    LocationIndex, ReductionTally,
+    absence_streaks, day_transitions, group_day_sums, late_punch_mask, latest_student_details,
+    location_memberships, location_options, select_locations, weekday_profile
+)
+
+# Report logic shared by the Streamlit dashboard (reduction.py) and the batch CLI (attendance_batch.py).
+# Nothing here imports Streamlit or matplotlib; problems are reported through this logger.
+logger = logging.getLogger(__name__)
+
+
+# Fast path for the usual 'DD-Month-YYYY' / 'DD-MonthYYYY' file names
+FILE_DATE_PATTERN = re.compile(r'^(\d{1,2})-([A-Za-z]+)-?(\d{4})\.csv$')
+# Lower-case full and abbreviated month names -> month number (e.g. 'july' and 'jul' -> 7)
+MONTH_LOOKUP = {
+    **{name.lower(): num for num, name in enumerate(calendar.month_name) if name},
+    **{name.lower(): num for num, name in enumerate(calendar.month_abbr) if name},
+}
+
+# --- Helper Function for Parsing a File Name Date ---
+@functools.lru_cache(maxsize=None)
+def parse_file_date(file_name: str):
+    """
+    Returns the date encoded in a daily CSV file name (e.g. '20-Jul-2025.csv'), or None if it cannot be parsed.
+    Uses the precompiled pattern and month lookup first and only falls back to trying DATE_FORMATS
+    for unusual names. Cached, so every file name is parsed once per process.
+    """
+    match = FILE_DATE_PATTERN.match(file_name)
+    if match:
+        day, month_name, year = match.groups()
+        month = MONTH_LOOKUP.get(month_name.lower())
+        if month:
+            try:
+                return datetime(int(year), month, int(day))
+            except ValueError:
+                return None
+
+    date_part = file_name.replace('.csv', '')
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(date_part, fmt)
+        except ValueError:
+            continue
+    return None
+
+# --- Date Index of the Daily Files (shared by all views) ---
+class FileDateIndex:
+    """
+    Maps each daily CSV file to its date (parsed once) and exposes the sorted month/year/day
+    views used by the sidebar selectors and the monthly graph. Files whose names cannot be
+    parsed are listed in `unparsed`.
+    """
+
+    def __init__(self, csv_files: list):
+        self.dates = {}
+        self.unparsed = []
+        for file_name in csv_files:
+            date_obj = parse_file_date(file_name)
+            if date_obj is None:
+                self.unparsed.append(file_name)
+            else:
+                self.dates[file_name] = date_obj
+
+        # Files in ascending date order (file name breaks ties)
+        self.files = sorted(self.dates, key=lambda f: (self.dates[f], f))
+        # 'Jul-2025' -> files of that month in ascending date order
+        self.months = {}
+        # '2025' -> 'Jul' -> [(date, 'DD (Weekday)', file name)] in descending date order
+        self.daily_selection = {}
+        for file_name in self.files:
+            date_obj = self.dates[file_name]
+            self.months.setdefault(date_obj.strftime('%b-%Y'), []).append(file_name)
+            self.daily_selection.setdefault(date_obj.strftime('%Y'), {}).setdefault(
+                date_obj.strftime('%b'), []).insert(0, (date_obj, date_obj.strftime('%d (%a)'), file_name))
+
+        # Month-Year keys, latest first
+        self.month_options = sorted(
+            self.months, key=lambda key: self.dates[self.months[key][0]].replace(day=1), reverse=True)
+
+    def years(self) -> list:
+        """
+        Returns the years that have files, latest first.
+        """
+        return sorted(self.daily_selection, reverse=True)
+
+    def months_in_year(self, year: str) -> list:
+        """
+        Returns the abbreviated month names that have files in a year, in calendar order.
+        """
+        return sorted(self.daily_selection.get(year, {}), key=lambda month: MONTH_LOOKUP[month.lower()])
+
+    def days_in_month(self, year: str, month: str) -> list:
+        """
+        Returns [(date, 'DD (Weekday)', file name)] for a year/month, latest day first.
+        """
+        return self.daily_selection.get(year, {}).get(month, [])
+
+
+@functools.lru_cache(maxsize=8)
+def build_file_date_index(csv_files: tuple) -> FileDateIndex:
+    """
+    Returns the (cached) FileDateIndex for a tuple of file names.
+    """
+    return FileDateIndex(csv_files)
+
+# --- Helper Function for the Attendance Store ---
+# Derived views kept up to date by every store refresh
+STORE_VIEWS = (ReductionTally, DailyRollup, LocationIndex, AbsenceBitmap)
+
+def get_attendance_store(data_dir: str = '.') -> AttendanceStore:
+    """
+    Returns the persistent columnar store backing the multi-day reports for a data directory,
+    with its derived views registered so they are updated incrementally on every refresh.
+    """
+    store = open_store(data_dir, date_parser=parse_file_date)
+    for view_cls in STORE_VIEWS:
+        store.view(view_cls)
+    return store
+
+def warm_store_views(csv_files: list, changed: list = None, store: AttendanceStore = None):
+    """
+    Pre-builds what the next dashboard rerun reads after files arrive: the file date index,
+    the registered views and the cached all-files Reduction Days report. Used as the
+    directory watcher's warm callback.
+    """
+    store = store or get_attendance_store()
+    build_file_date_index(tuple(csv_files))
+    # Under the store lock, like every other view read: another watcher or rerun may ingest meanwhile
+    with store.lock:
+        for view_cls in STORE_VIEWS:
+            store.view(view_cls)
+        store.view(ReductionTally).report()
+
+def files_digest(csv_files: list, store: AttendanceStore = None) -> str:
+    """
+    Returns a digest of the stored content (SHA-1 per file) of the given files: it changes
+    whenever one of them is added, modified or removed, so it can key caches of derived results.
+    """
+    store = store or get_attendance_store()
+    entries = store.manifest['files']
+    content = [(file_name, (entries.get(file_name) or {}).get('sha1')) for file_name in sorted(csv_files)]
+    return hashlib.sha1(repr(content).encode('utf-8')).hexdigest()
+
+# --- Helper Function for Multi-Select Location Filters ---
+def active_filter(selected: list):
+    """
+    Returns the selected values of a location multiselect, or None when it is empty or ['All'].
+    """
+    if selected and selected != ['All']:
+        return list(selected)
+    return None
+
+# --- Helper Functions for Sorting ---
+def room_sort_keys(data_df: pd.DataFrame, floor_order: list) -> pd.DataFrame:
+    """
+    Returns the sort keys of the rows' locations: Block (text), Floor (Categorical with floor_order
+    first and any other floors after it), Room Number (numeric where Room No. is a number) and Room Text.
+    """
+    floors = data_df['Floor'].astype('string')
+    extra_floors = sorted(set(floors.dropna()) - set(floor_order))
+    rooms = data_df['Room No.'].astype('string')
+    return pd.DataFrame({
+        'Block': data_df['Block'].astype('string'),
+        'Floor': pd.Categorical(floors, categories=list(floor_order) + extra_floors, ordered=True),
+        'Room Number': pd.to_numeric(rooms, errors='coerce'),
+        'Room Text': rooms,
+    }, index=data_df.index)
+
+
+def sort_by_room_details(data_df: pd.DataFrame, floor_order: list) -> pd.DataFrame:
+    """
+    Helper function to sort DataFrame by Block, Floor (custom order), and Room No.
+    Floors missing from floor_order are kept and sorted after it; Room No. (held as text)
+    sorts numerically where it is a number.
+    """
+    if not data_df.empty and all(col in data_df.columns for col in ['Block', 'Floor', 'Room No.']):
+        sort_keys = room_sort_keys(data_df, floor_order)
+        data_df = data_df.assign(Block=sort_keys['Block'], Floor=sort_keys['Floor'])
+        data_df = data_df.loc[sort_keys.sort_values(by=list(sort_keys.columns), kind='stable').index]
+    return data_df
+
+# --- Helper Function for Grouping Files by Month (Used for Monthly Graph) ---
+def group_files_by_month(csv_files: list) -> dict:
+    """
+    Groups a list of CSV file names into a dictionary where the key is 'Month-Year' (e.g., 'Jul-2025')
+    and the value is a list of file names belonging to that month, sorted by date.
+    """
+    index = build_file_date_index(tuple(csv_files))
+    return {month: list(files) for month, files in index.months.items()}
+
+# --- Building Blocks of the Daily Analysis (shared by the in-memory and streaming versions) ---
+DAILY_REQUIRED_COLS = {'Status', 'Student Name', 'Room No.'}
+LATE_PUNCH_COLS = ['Student Name', 'Room No.', 'Last Punch']
+ROOM_COLS = ['Block', 'Floor', 'Room No.']
+# Status -> (per-room table, column prefix)
+PER_ROOM_TABLES = {'Present': ('Present Students per Room', 'Present'),
+                   'Not Present': ('Absent Students per Room', 'Absent')}
+
+
+def _daily_summary(total: int, present: int, absent: int) -> pd.DataFrame:
+    return pd.DataFrame({
+        'Metric': ['Total Students', 'Present', 'Absent'],
+        'Count': [total, present, absent]
+    })
+
+
+def _late_punch_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns Student Name, Room No. and Last Punch (as stored) of the present students who punched late.
+    """
+    # Compared as seconds since midnight; missing or malformed punches are never late
+    return df[late_punch_mask(df, LATE_PUNCH_TIME_STR)][LATE_PUNCH_COLS].copy()
+
+
+def _format_late_punches(late_punches_df: pd.DataFrame) -> pd.DataFrame:
+    if pd.api.types.is_integer_dtype(late_punches_df['Last Punch'].dtype):
+        late_punches_df['Last Punch'] = format_punch_seconds(late_punches_df['Last Punch'])
+    return late_punches_df
+
+
+def _students_per_room(df: pd.DataFrame, long_form: bool = False) -> dict:
+    """
+    Returns the 'Present Students per Room' and 'Absent Students per Room' tables: per room the
+    count and the sorted names joined with ', ' (or, with long_form, one row per student in
+    room and name order, skipping the string joining).
+
+    Single pass: the distinct rooms are put in Block / Floor / Room No. order once, the listed
+    students are sorted once by Status, room and name (integer keys), room boundaries are found
+    where the keys change, the names of every room are joined at once (Arrow list join) and the
+    two tables are split with one groupby on Status.
+    """
+    # Imported here: only the daily per-room tables use Arrow, other importers don't pay for it
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    listed = df['Status'].isin(list(PER_ROOM_TABLES)).to_numpy(dtype=bool)
+    codes, uniques = zip(*(pd.factorize(df[col]) for col in ROOM_COLS))
+    # Rooms with a missing Block / Floor / Room No. are left out, as groupby would
+    rows = np.flatnonzero(listed & np.all([c >= 0 for c in codes], axis=0))
+
+    # One integer key per room; the distinct rooms are ranked in room order
+    n_floors, n_rooms = len(uniques[1]), len(uniques[2])
+    room_key = (codes[0][rows].astype(np.int64) * n_floors + codes[1][rows]) * n_rooms + codes[2][rows]
+    room_keys, room_of_row = np.unique(room_key, return_inverse=True)
+    rooms = pd.DataFrame({
+        'Block': uniques[0].take(room_keys // (n_floors * n_rooms)),
+        'Floor': uniques[1].take(room_keys // n_rooms % n_floors),
+        'Room No.': uniques[2].take(room_keys % n_rooms),
+    })
+    sort_keys = room_sort_keys(rooms, FLOOR_ORDER)
+    room_order = sort_keys.sort_values(by=list(sort_keys.columns), kind='stable').index.to_numpy()
+    rooms = pd.DataFrame({'Block': sort_keys['Block'], 'Floor': sort_keys['Floor'],
+                          'Room No.': sort_keys['Room Text']}).iloc[room_order].reset_index(drop=True)
+    room_rank = np.empty(len(room_order), dtype=np.int64)
+    room_rank[room_order] = np.arange(len(room_order))
+    room_of_row = room_rank[room_of_row]
+
+    # One global sort of the students: Status, room, name
+    is_absent = (df['Status'] == 'Not Present').to_numpy(dtype=bool)[rows]
+    names = pa.chunked_array(pa.array(df['Student Name'].astype('string').array)).take(pa.array(rows))
+    order = np.lexsort((pc.rank(names, tiebreaker='min').to_numpy(), room_of_row, is_absent))
+    names, room_of_row, is_absent = names.take(pa.array(order)), room_of_row[order], is_absent[order]
+
+    if long_form:
+        groups = rooms.iloc[room_of_row].reset_index(drop=True)
+        groups['Student Name'] = pd.array(names, dtype='string')
+        group_absent = is_absent
+    else:
+        changes = (room_of_row[1:] != room_of_row[:-1]) | (is_absent[1:] != is_absent[:-1])
+        starts = np.flatnonzero(np.concatenate([[True], changes])) if len(order) else np.zeros(0, np.int64)
+        bounds = np.append(starts, len(order))
+        # Missing names are counted but not listed
+        named = pc.is_valid(names).to_numpy(zero_copy_only=False)
+        name_offsets = np.concatenate([[0], np.cumsum(named)])[bounds].astype(np.int32)
+        name_lists = pa.ListArray.from_arrays(pa.array(name_offsets), pc.drop_null(names).combine_chunks())
+        groups = rooms.iloc[room_of_row[starts]].reset_index(drop=True)
+        groups['Count'] = np.diff(bounds).astype(np.int64)
+        separator = pa.scalar(', ', type=name_lists.type.value_type)
+        groups['Names'] = pd.array(pc.binary_join(name_lists, separator), dtype='string')
+        group_absent = is_absent[starts]
+
+    tables = {status: table.reset_index(drop=True)
+              for status, table in groups.groupby(np.where(group_absent, 'Not Present', 'Present'), sort=False)}
+    output_dfs = {}
+    for status, (table_name, prefix) in PER_ROOM_TABLES.items():
+        table = tables.get(status, groups.iloc[:0])
+        if not long_form:
+            table = table.rename(columns={'Count': f'{prefix}_Count', 'Names': f'{prefix}_Names'})
+        output_dfs[table_name] = table
+    return output_dfs
+
+
+# --- Daily Present / Not Present Counts of One Month (Monthly Graph) ---
+@profiled()
+def monthly_attendance_counts(csv_files_in_month: list, store: AttendanceStore = None,
+                              selected_blocks: list = None, selected_floors: list = None) -> pd.DataFrame:
+    """
+    Returns Day ('DD'), Present, Not Present and Date_Sort per dated day of the month, in date
+    order, from the store's daily rollup table (no raw rows are read), optionally restricted to
+    the selected Block(s) and Floor(s).
+    """
+    store = store or get_attendance_store()
+    store.refresh(csv_files_in_month)
+    date_index = build_file_date_index(tuple(csv_files_in_month))
+    daily_counts = store.view(DailyRollup).daily_counts(
+        csv_files_in_month, active_filter(selected_blocks), active_filter(selected_floors))
+    dates = daily_counts['Source File'].map(date_index.dates)
+    undated = dates.isna()
+    for file_name in daily_counts.loc[undated, 'Source File']:
+        logger.warning("Could not parse date from filename: %s. Skipping.", file_name)
+    attendance_df = pd.DataFrame({
+        'Day': pd.to_datetime(dates[~undated]).dt.strftime('%d'),
+        'Present': daily_counts.loc[~undated, 'Present'],
+        'Not Present': daily_counts.loc[~undated, 'Not Present'],
+        'Date_Sort': dates[~undated],
+    }, columns=['Day', 'Present', 'Not Present', 'Date_Sort'])
+    annotate(rows=len(attendance_df))
+    return attendance_df.sort_values(by='Date_Sort', kind='stable').reset_index(drop=True)
+
+# --- Core Function for Daily Analysis (Restored) ---
+@profiled()
+def analyze_attendance(df: pd.DataFrame, long_form: bool = False) -> dict:
+    """
+    Performs a detailed analysis of the attendance DataFrame for a single day.
+    With long_form the per-room tables list one student per row instead of joined names
+    (cheaper, e.g. for Excel output).
+    """
+    annotate(rows=len(df))
+    if not DAILY_REQUIRED_COLS.issubset(df.columns):
+        logger.error("Missing required columns for daily analysis: 'Status', 'Student Name', 'Room No.'.")
+        return {} 
+
+    output_dfs = {}
+    status_counts = df['Status'].value_counts()
+    output_dfs['Daily Summary'] = _daily_summary(
+        len(df), status_counts.get('Present', 0), status_counts.get('Not Present', 0))
+
+    if 'Last Punch' in df.columns:
+        output_dfs['Late Biometric Punches'] = _format_late_punches(_late_punch_rows(df))
+    else:
+        output_dfs['Late Biometric Punches'] = pd.DataFrame(columns=LATE_PUNCH_COLS)
+
+    absent_students_df = df[df['Status'] == 'Not Present'].copy()
+    output_dfs['Students to Notify'] = absent_students_df[['Student Name', 'Room No.']].sort_values(by='Student Name')
+
+    if 'Punch Records' in df.columns:
+        output_dfs['Punch Summary'] = analyze_punches(df)
+
+    if set(ROOM_COLS).issubset(df.columns):
+        output_dfs.update(_students_per_room(df, long_form))
+
+    return output_dfs
+
+
+# --- Streaming Daily Analysis (daily files too large to load at once) ---
+# Daily files at least this large are analyzed chunk by chunk (see analyze_attendance_file)
+STREAM_ANALYSIS_BYTES = 256 * 1024 * 1024
+
+@profiled()
+def analyze_attendance_stream(path: str, chunk_rows: int = STREAM_CHUNK_ROWS, long_form: bool = False) -> dict:
+    """
+    Same result as analyze_attendance(read_attendance_csv(path), long_form), computed from chunks of at most
+    chunk_rows rows: the summary counts are accumulated, and of every chunk only the rows and
+    columns that appear in an output (late punches, absentees, punch summary rows, and the
+    location/name/status of each student for the per-room tables) are kept, so memory is bounded
+    by the chunk size plus the size of the report itself.
+    """
+    total = present = absent = 0
+    late, notify, punches, rooms = [], [], [], []
+    columns = None
+    for chunk in iter_attendance_csv(path, chunk_rows):
+        annotate(rows=len(chunk))
+        if columns is None:
+            columns = set(chunk.columns)
+            if not DAILY_REQUIRED_COLS.issubset(columns):
+                logger.error("Missing required columns for daily analysis: 'Status', 'Student Name', 'Room No.'.")
+                return {}
+        is_absent = (chunk['Status'] == 'Not Present').fillna(False).to_numpy(dtype=bool)
+        total += len(chunk)
+        present += int((chunk['Status'] == 'Present').sum())
+        absent += int(is_absent.sum())
+        if 'Last Punch' in columns:
+            late.append(_late_punch_rows(chunk))
+        notify.append(chunk.loc[is_absent, ['Student Name', 'Room No.']])
+        if 'Punch Records' in columns:
+            punches.append(_punch_rows(chunk))
+        if set(ROOM_COLS).issubset(columns):
+            listed = chunk['Status'].isin(['Present', 'Not Present']).to_numpy(dtype=bool)
+            rooms.append(chunk.loc[listed, ROOM_COLS + ['Student Name', 'Status']])
+    if columns is None:
+        # No chunk at all (no data rows): the file is small, so it is analyzed whole
+        return analyze_attendance(read_attendance_csv(path), long_form)
+
+    output_dfs = {'Daily Summary': _daily_summary(total, present, absent)}
+    if 'Last Punch' in columns:
+        output_dfs['Late Biometric Punches'] = _format_late_punches(pd.concat(late))
+    else:
+        output_dfs['Late Biometric Punches'] = pd.DataFrame(columns=LATE_PUNCH_COLS)
+    output_dfs['Students to Notify'] = pd.concat(notify).sort_values(by='Student Name')
+    if 'Punch Records' in columns:
+        output_dfs['Punch Summary'] = _sorted_punch_summary(pd.concat(punches))
+    if rooms:
+        output_dfs.update(_students_per_room(pd.concat(rooms), long_form))
+    return output_dfs
+
+
+def analyze_attendance_file(path: str, long_form: bool = False) -> dict:
+    """
+    Analyzes one daily CSV: loaded whole, or streamed when it is at least STREAM_ANALYSIS_BYTES.
+    """
+    if os.path.getsize(path) >= STREAM_ANALYSIS_BYTES:
+        return analyze_attendance_stream(path, long_form=long_form)
+    return analyze_attendance(read_attendance_csv(path), long_form)
+
+# --- Cached Daily Analysis (keyed by file version) ---
+_DAILY_CACHES = {}
+
+def get_daily_cache(store: AttendanceStore = None) -> ResultCache:
+    """
+    Returns the process-wide cache of daily analysis results and workbooks for a store, kept on
+    disk in the store directory when ATTENDANCE_CACHE_PERSIST is set.
+    """
+    store = store or get_attendance_store()
+    cache = _DAILY_CACHES.get(store.store_dir)
+    if cache is None:
+        cache_dir = os.path.join(store.store_dir, RESULT_CACHE_DIR_NAME) if persist_enabled() else None
+        cache = _DAILY_CACHES.setdefault(store.store_dir, ResultCache(cache_dir=cache_dir))
+    return cache
+
+def _daily_cache_key(kind: str, file_name: str, store: AttendanceStore, long_form: bool) -> tuple:
+    """
+    Returns the cache key of a daily result: the file's path, mtime and SHA-1 plus the settings
+    the result depends on.
+    """
+    path = os.path.join(store.data_dir, file_name)
+    version = get_daily_cache(store).file_version(path, store.manifest['files'].get(file_name))
+    return (kind, *version, long_form, SCHEMA_VERSION, LATE_PUNCH_TIME_STR, tuple(FLOOR_ORDER))
+
+@profiled()
+def cached_daily_analysis(file_name: str, store: AttendanceStore = None, long_form: bool = False) -> dict:
+    """
+    analyze_attendance_file for a daily CSV of the store's directory, served from the daily
+    cache while the file is unchanged. The returned DataFrames are shared; do not modify them.
+    Quarantined files (see AttendanceStore.quarantined) give {} without being read.
+    """
+    store = store or get_attendance_store()
+    if store.quarantined([file_name]):
+        return {}
+    key = _daily_cache_key('daily-analysis', file_name, store, long_form)
+    return get_daily_cache(store).get_or_compute(
+        key, lambda: analyze_attendance_file(os.path.join(store.data_dir, file_name), long_form))
+
+@profiled()
+def cached_daily_excel(file_name: str, store: AttendanceStore = None, long_form: bool = False):
+    """
+    Returns the daily report workbook of a daily CSV as bytes (None without analysis results),
+    served from the daily cache while the file is unchanged.
+    """
+    store = store or get_attendance_store()
+
+    def build():
+        analysis_results = cached_daily_analysis(file_name, store, long_form)
+        excel_buffer = generate_excel_file(analysis_results) if analysis_results else None
+        return excel_buffer.getvalue() if excel_buffer else None
+
+    return get_daily_cache(store).get_or_compute(_daily_cache_key('daily-excel', file_name, store, long_form), build)
+
+# --- Core Function for Daily Punch Analytics (Punch Records column) ---
+PUNCH_SUMMARY_COLS = ['Student Name', 'Room No.', 'First Punch', 'Last Punch', 'Punch Count', 'After Curfew']
+
+def _punch_rows(df: pd.DataFrame, curfew_time: str = LATE_PUNCH_TIME_STR) -> pd.DataFrame:
+    """
+    Returns the unsorted punch summary rows (punches as seconds) of the students with at least one punch.
+    """
+    records = parse_punch_records(df['Punch Records'])
+    punch_summary = pd.DataFrame({
+        'Student Name': df['Student Name'].array,
+        'Room No.': df['Room No.'].array,
+        'First Punch': records.first(),
+        'Last Punch': records.last(),
+        'Punch Count': records.counts(),
+        'After Curfew': records.count_after(time_to_seconds(curfew_time)),
+    }, index=df.index)
+    return punch_summary[punch_summary['Punch Count'] > 0]
+
+
+def _sorted_punch_summary(punch_summary: pd.DataFrame) -> pd.DataFrame:
+    punch_summary = punch_summary.copy()
+    punch_summary['First Punch'] = format_punch_seconds(punch_summary['First Punch'])
+    punch_summary['Last Punch'] = format_punch_seconds(punch_summary['Last Punch'])
+    return punch_summary.sort_values(by='Student Name').reset_index(drop=True)
+
+
+def analyze_punches(df: pd.DataFrame, curfew_time: str = LATE_PUNCH_TIME_STR) -> pd.DataFrame:
+    """
+    Summarizes the parsed Punch Records of a single day for every student with at least one punch:
+    first and last punch, number of punches and number of punches after the curfew time.
+    """
+    if not {'Student Name', 'Room No.', 'Punch Records'}.issubset(df.columns):
+        return pd.DataFrame(columns=PUNCH_SUMMARY_COLS)
+    return _sorted_punch_summary(_punch_rows(df, curfew_time))
+
+# --- Core Function for Monthly After-Curfew Punch Analytics ---
+@profiled()
+def analyze_curfew_punches(csv_files: list, store: AttendanceStore = None,
+                           selected_blocks: list = None, selected_floors: list = None,
+                           bin_minutes: int = 15, curfew_time: str = LATE_PUNCH_TIME_STR) -> dict:
+    """
+    Parses the Punch Records of all given days at once and returns:
+    - 'After-Curfew Punch Histogram': punches later than curfew_time per bin_minutes time bin
+    - 'After-Curfew Punches per Student': total after-curfew punches and days with one, per student
+    """
+    required_cols = ['Employee Code', 'Student Name', 'Punch Records']
+    store = store or get_attendance_store()
+    store.refresh(csv_files)
+    frames = [store.file_frame(file_name) for file_name in store.files(csv_files, required_cols)]
+    frames = [df for df in frames if not df.empty]
+    histogram = pd.DataFrame(columns=['Time Bin', 'Punches'])
+    per_student = pd.DataFrame(columns=['Student Name', 'After-Curfew Punches', 'Days With After-Curfew Punch'])
+    if not frames:
+        return {'After-Curfew Punch Histogram': histogram, 'After-Curfew Punches per Student': per_student}
+
+    month_df = pd.concat(frames, ignore_index=True)
+    if active_filter(selected_blocks) and 'Block' in month_df.columns:
+        month_df = month_df[month_df['Block'].isin(selected_blocks)]
+    if active_filter(selected_floors) and 'Floor' in month_df.columns:
+        month_df = month_df[month_df['Floor'].isin(selected_floors)]
+
+    annotate(rows=len(month_df))
+    records = parse_punch_records(month_df['Punch Records'])
+    curfew = time_to_seconds(curfew_time)
+    after_curfew = records.values[records.values > curfew]
+
+    if len(after_curfew):
+        bin_seconds = bin_minutes * 60
+        bins, counts = np.unique(after_curfew // bin_seconds * bin_seconds, return_counts=True)
+        histogram = pd.DataFrame({'Time Bin': format_punch_seconds(bins).str.slice(0, 5).to_numpy(),
+                                  'Punches': counts})
+
+        per_day = pd.DataFrame({
+            'Employee Code': month_df['Employee Code'].to_numpy(),
+            'Student Name': month_df['Student Name'].to_numpy(),
+            'After-Curfew Punches': records.count_after(curfew),
+        })
+        per_day = per_day[per_day['After-Curfew Punches'] > 0]
+        per_student = per_day.groupby('Employee Code').agg(**{
+            'Student Name': ('Student Name', 'last'),
+            'After-Curfew Punches': ('After-Curfew Punches', 'sum'),
+            'Days With After-Curfew Punch': ('After-Curfew Punches', 'size'),
+        }).sort_values(by=['After-Curfew Punches', 'Student Name'], ascending=[False, True]).reset_index(drop=True)
+
+    return {'After-Curfew Punch Histogram': histogram, 'After-Curfew Punches per Student': per_student}
+
+# --- Constants for Report Export ---
+# Rows converted and handed to xlsxwriter at a time
+EXCEL_CHUNK_ROWS = 10_000
+# Spooled exports stay in memory up to this size, then move to a temporary file
+EXPORT_SPOOL_BYTES = 32 * 1024 * 1024
+# Above this many rows the reports also offer CSV / Parquet downloads
+LARGE_EXPORT_ROWS = 50_000
+EXCEL_MAX_SHEET_NAME = 31
+
+def _excel_rows(df: pd.DataFrame, chunk_rows: int = EXCEL_CHUNK_ROWS):
+    """
+    Yields the rows of a DataFrame as lists of plain Python values (missing values as None),
+    converting one chunk of rows at a time.
+    """
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        columns = []
+        for col in chunk.columns:
+            values = chunk[col]
+            columns.append(values.astype(object).where(values.notna(), None).tolist())
+        yield from zip(*columns)
+
+# --- Helper Function for Excel Export ---
+@profiled()
+def generate_excel_file(output_dfs: dict, output=None, spool: bool = False):
+    """
+    Exports all analysis DataFrames to a single Excel file, one sheet per DataFrame.
+
+    Rows are streamed to xlsxwriter in chunks with constant_memory enabled, so only one chunk
+    of rows is held as Python values at a time. The workbook goes to `output` (a path or a
+    writable binary file) when given; otherwise to an in-memory buffer, or, with spool=True,
+    to a temporary file that moves to disk beyond EXPORT_SPOOL_BYTES. Buffers are returned
+    rewound; paths are returned as given.
+    """
+    try:
+        import xlsxwriter
+    except ImportError:
+        logger.error("Please ensure the 'xlsxwriter' library is installed for Excel export.")
+        return None
+
+    if output is None:
+        output = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_BYTES) if spool else io.BytesIO()
+
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': True, 'default_date_format': 'yyyy-mm-dd'})
+    header_format = workbook.add_format({'bold': True, 'border': 1, 'align': 'center'})
+    for sheet_name, df in output_dfs.items():
+        if df.empty:
+            df = pd.DataFrame([['No data to display.']], columns=['Info'])
+        worksheet = workbook.add_worksheet(str(sheet_name)[:EXCEL_MAX_SHEET_NAME])
+        worksheet.write_row(0, 0, [str(col) for col in df.columns], header_format)
+        for row_idx, row in enumerate(_excel_rows(df), start=1):
+            worksheet.write_row(row_idx, 0, row)
+    workbook.close()
+    annotate(rows=sum(len(df) for df in output_dfs.values()))
+
+    if hasattr(output, 'seek'):
+        annotate(nbytes=output.tell())
+        output.seek(0)
+    return output
+
+# --- Helper Functions for Large Report Downloads (CSV / Parquet) ---
+def generate_csv_file(df: pd.DataFrame, spool: bool = True):
+    """
+    Exports a DataFrame to CSV (UTF-8), written in chunks to a spooled temporary file. Returned rewound.
+    """
+    output = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_BYTES) if spool else io.BytesIO()
+    wrapper = io.TextIOWrapper(output, encoding='utf-8', newline='', write_through=True)
+    df.to_csv(wrapper, index=False, chunksize=EXCEL_CHUNK_ROWS)
+    wrapper.detach()
+    output.seek(0)
+    return output
+
+def generate_parquet_file(df: pd.DataFrame, spool: bool = True):
+    """
+    Exports a DataFrame to Parquet in a spooled temporary file. Returned rewound.
+    """
+    output = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_BYTES) if spool else io.BytesIO()
+    df.to_parquet(output, index=False)
+    output.seek(0)
+    return output
+# --- NEW: Function to collect all unique location details across all files ---
+@profiled()
+def collect_unique_location_details(csv_files: list, store: AttendanceStore = None,
+                                    selected_blocks: list = None, selected_floors: list = None) -> tuple:
+    """
+    Returns the unique Block, Floor, and Room No. options of all CSV files (Floors in FLOOR_ORDER,
+    then alphabetically). Floors are narrowed to the selected Blocks and Rooms to the selected
+    Blocks and Floors, so the sidebar filters cascade.
+
+    Served from the store's location index when it covers exactly these files; otherwise the
+    stored data of the files is scanned.
+    """
+    store = store or get_attendance_store()
+    store.refresh(csv_files)
+    blocks, floors = active_filter(selected_blocks), active_filter(selected_floors)
+
+    location_files = store.files(csv_files, LOCATION_COLS)
+    index = store.view(LocationIndex)
+    if index.covers(location_files):
+        return index.options(blocks, floors)
+
+    # Unreadable files are recorded by the store at ingest and never yielded here
+    memberships = []
+    for file_name, df in store.iter_frames(location_files):
+        annotate(rows=len(df))
+        memberships.append(location_memberships(df))
+    if not memberships:
+        return [], [], []
+    return location_options(pd.concat(memberships, ignore_index=True), blocks, floors)
+
+
+# --- Full Recompute of Reduction Days (reference for the incremental tally) ---
+@profiled()
+def recompute_reduction_days(csv_files: list, store: AttendanceStore = None, codes=None) -> pd.DataFrame:
+    """
+    Recomputes per-student Reduction Days from scratch over the stored data of the given files.
+    Files are processed in date order, so the last seen Block/Floor/Room of each student wins.
+    When `codes` is given only those Employee Codes are aggregated.
+    Returns Employee Code, Student Name, Block, Floor, Room No. and Reduction Days (> 0 only).
+    """
+    store = store or get_attendance_store()
+    store.refresh(csv_files)
+
+    # Only files with every required column contribute, in date order
+    complete_files = store.ordered(store.files(csv_files, REDUCTION_REQUIRED_COLS))
+    frames = {file_name: store.file_frame(file_name) for file_name in complete_files}
+    if codes is not None:
+        frames = {file_name: df[df['Employee Code'].isin(codes)] for file_name, df in frames.items()}
+
+    # Collect student details (including Block/Floor/Room for filtering later)
+    details_df = latest_student_details(frames).drop(columns='Source File')
+
+    all_absences = [
+        df.loc[df['Status'] == 'Not Present', ['Employee Code']].assign(Absence_Count=1)
+        for df in frames.values()
+    ]
+    all_absences = [absent_df for absent_df in all_absences if not absent_df.empty]
+
+    if not all_absences:
+        return pd.DataFrame(columns=['Employee Code'] + REDUCTION_DETAIL_COLS + ['Reduction Days'])
+
+    cumulative_absence_df = pd.concat(all_absences)
+    total_absences = cumulative_absence_df.groupby('Employee Code')['Absence_Count'].sum().reset_index()
+    
+    # --- RENAME: Column header changed to "Reduction Days" ---
+    total_absences.rename(columns={'Absence_Count': 'Reduction Days'}, inplace=True)
+
+    # Order students by code so ties within a room sort the same way as the incremental tally
+    details_df = details_df.sort_index().rename_axis('Employee Code').reset_index()
+    
+    final_df = pd.merge(details_df, total_absences, on='Employee Code', how='left')
+    
+    final_df['Reduction Days'] = final_df['Reduction Days'].fillna(0).astype(int)
+    
+    # Filter only students who have absences recorded
+    return final_df[final_df['Reduction Days'] > 0].reset_index(drop=True)
+
+
+# --- Reduction Days for a Date Range (per-student absence bitmaps) ---
+@profiled()
+def reduction_days_between(csv_files: list, start_date=None, end_date=None, store: AttendanceStore = None,
+                           codes=None) -> pd.DataFrame:
+    """
+    Returns Employee Code, details and Reduction Days counting only the absences dated between
+    start_date and end_date (inclusive datetime.date values; None = unbounded).
+
+    Answered by a popcount over the store's absence bitmaps when they and the tally cover these
+    files (details are each student's latest location overall); otherwise recomputed from the
+    stored files dated in the range. Undated files never fall in a range.
+    """
+    store = store or get_attendance_store()
+    store.refresh(csv_files)
+    complete_files = store.files(csv_files, REDUCTION_REQUIRED_COLS)
+    bitmap, tally = store.view(AbsenceBitmap), store.view(ReductionTally)
+    if bitmap.covers(complete_files) and tally.covers(complete_files):
+        return tally.report(codes, totals=bitmap.absence_days(start_date, end_date, codes))
+
+    start_iso = start_date.isoformat() if start_date else ''
+    end_iso = end_date.isoformat() if end_date else '9999-12-31'
+    in_range = []
+    for file_name in complete_files:
+        is_undated, iso_date, _ = store.sort_key(file_name)
+        if not is_undated and start_iso <= iso_date <= end_iso:
+            in_range.append(file_name)
+    return recompute_reduction_days(in_range, store, codes)
+
+
+# --- Core Function for Reduction Days Report (formerly Cumulative Absence) ---
+@profiled()
+def calculate_reduction_days(csv_files: list, floor_order: list, 
+                                 selected_blocks: list, selected_floors: list, 
+                                 selected_rooms: list, store: AttendanceStore = None,
+                                 start_date=None, end_date=None) -> pd.DataFrame:
+    """
+    Calculates the total number of days a student was absent (Reduction Days) across multiple CSV files
+    and applies location filters. Served from the store's incremental tally when it covers exactly these
+    files; otherwise falls back to a full recompute over the stored data. With start_date / end_date
+    only the absences in that date range count (see reduction_days_between).
+
+    Location filters are pushed down: the location index gives the students ever seen in the selected
+    Blocks/Floors/Rooms and only they are aggregated; the filter is then applied exactly to each
+    student's latest location.
+    """
+    store = store or get_attendance_store()
+    store.refresh(csv_files)
+    tally = store.view(ReductionTally)
+    blocks, floors, rooms = active_filter(selected_blocks), active_filter(selected_floors), active_filter(selected_rooms)
+
+    # The index covers every stored file, so its candidates are a superset for any subset of files
+    codes = store.view(LocationIndex).codes(blocks, floors, rooms) if (blocks or floors or rooms) else None
+
+    if start_date is not None or end_date is not None:
+        final_df = reduction_days_between(csv_files, start_date, end_date, store, codes)
+    elif tally.covers(store.files(csv_files, REDUCTION_REQUIRED_COLS)):
+        final_df = tally.report(codes)
+    else:
+        final_df = recompute_reduction_days(csv_files, store, codes)
+    annotate(rows=len(final_df))
+
+    if final_df.empty:
+        # Renamed column header
+        return pd.DataFrame(columns=['Student Name', 'Block', 'Floor', 'Room No.', 'Reduction Days'])
+
+    # Convert Room No. in the DataFrame to string for consistent filtering
+    final_df['Room No.'] = final_df['Room No.'].astype(str)
+
+    # Exact Block / Floor / Room No. filter on the latest location, as one combined mask
+    final_df = select_locations(final_df, blocks, floors, rooms)
+
+    # Final column selection and sorting
+    final_df = final_df[['Student Name', 'Block', 'Floor', 'Room No.', 'Reduction Days']]
+
+    final_df = sort_by_room_details(final_df, floor_order)
+    
+    return final_df.reset_index(drop=True)
+
+
+# --- Absence Streaks / Chronic Absentee Report ---
+# A weekday is a student's recurring absence day when they were absent on at least this share of
+# the recorded occurrences of that weekday, and at least CHRONIC_WEEKDAY_MIN_ABSENCES times
+CHRONIC_WEEKDAY_RATE = 0.5
+# Default minimum Longest Streak for the dashboard's chronic absentee list
+CHRONIC_STREAK_DAYS = 3
+CHRONIC_WEEKDAY_MIN_ABSENCES = 3
+STREAK_REPORT_COLS = (['Student Name', 'Block', 'Floor', 'Room No.', 'Current Streak', 'Longest Streak',
+                       'Absent Days', 'Recurring Weekdays'] + WEEKDAY_NAMES)
+
+
+def _status_matrix_sources(csv_files: list, store: AttendanceStore) -> tuple:
+    """
+    Returns (bitmap, details) for the complete files among csv_files: the store's AbsenceBitmap
+    (or one built from the files when the stored view does not cover them) and the latest
+    REDUCTION_DETAIL_COLS per Employee Code.
+    """
+    complete_files = store.files(csv_files, REDUCTION_REQUIRED_COLS)
+    bitmap, tally = store.view(AbsenceBitmap), store.view(ReductionTally)
+    if not bitmap.covers(complete_files):
+        bitmap = AbsenceBitmap.from_files(store, complete_files)
+    if tally.covers(complete_files):
+        details = tally.details[REDUCTION_DETAIL_COLS]
+    else:
+        frames = {file_name: store.file_frame(file_name) for file_name in store.ordered(complete_files)}
+        details = latest_student_details(frames)[REDUCTION_DETAIL_COLS]
+    return bitmap, details
+
+@profiled()
+def calculate_absence_streaks(csv_files: list, floor_order: list,
+                              selected_blocks: list, selected_floors: list,
+                              selected_rooms: list, store: AttendanceStore = None,
+                              start_date=None, end_date=None,
+                              min_current_streak: int = 0, min_longest_streak: int = 0,
+                              weekday_rate: float = CHRONIC_WEEKDAY_RATE,
+                              min_weekday_absences: int = CHRONIC_WEEKDAY_MIN_ABSENCES,
+                              recurring_only: bool = False) -> pd.DataFrame:
+    """
+    Returns per student (latest location) the Current Streak (consecutive absent days still running
+    at the end of the range), Longest Streak, Absent Days, the Recurring Weekdays and the absences
+    per weekday (Mon..Sun), over the dated files between start_date and end_date.
+
+    Computed for the whole roster at once from the students x days matrix of the store's absence
+    bitmaps (see absence_streaks / weekday_profile). Only students with Current Streak >=
+    min_current_streak and Longest Streak >= min_longest_streak (and at least one absence) are
+    listed; with recurring_only, only those with a recurring weekday. Location filters work as in
+    calculate_reduction_days.
+    """
+    store = store or get_attendance_store()
+    store.refresh(csv_files)
+    blocks, floors, rooms = active_filter(selected_blocks), active_filter(selected_floors), active_filter(selected_rooms)
+    codes = store.view(LocationIndex).codes(blocks, floors, rooms) if (blocks or floors or rooms) else None
+    bitmap, details = _status_matrix_sources(csv_files, store)
+
+    matrix_codes, absent, recorded, first_day = bitmap.status_matrix(start_date, end_date, codes)
+    annotate(rows=absent.size)
+    current, longest = absence_streaks(absent, recorded)
+    weekday_absences, weekday_recorded = weekday_profile(absent, recorded, first_day)
+    recurring = ((weekday_absences >= max(min_weekday_absences, 1)) &
+                 (weekday_absences >= weekday_rate * weekday_recorded))
+
+    streaks = pd.DataFrame(weekday_absences, columns=WEEKDAY_NAMES, index=matrix_codes)
+    streaks.insert(0, 'Current Streak', current)
+    streaks.insert(1, 'Longest Streak', longest)
+    streaks.insert(2, 'Absent Days', absent.sum(axis=1))
+    recurring_names = np.full(len(matrix_codes), '', dtype=object)
+    for weekday, name in enumerate(WEEKDAY_NAMES):
+        separator = np.where(recurring_names == '', '', ', ')
+        recurring_names = np.where(recurring[:, weekday], recurring_names + separator + name, recurring_names)
+    streaks.insert(3, 'Recurring Weekdays', recurring_names)
+
+    keep = (streaks['Absent Days'] > 0) & (current >= min_current_streak) & (longest >= min_longest_streak)
+    if recurring_only:
+        keep &= recurring.any(axis=1)
+    final_df = details.join(streaks[keep.to_numpy()], how='inner')
+    if final_df.empty:
+        return pd.DataFrame(columns=STREAK_REPORT_COLS)
+
+    final_df['Room No.'] = final_df['Room No.'].astype(str)
+    final_df = select_locations(final_df, blocks, floors, rooms)
+    final_df = sort_by_room_details(final_df[STREAK_REPORT_COLS], floor_order)
+    return final_df.reset_index(drop=True)
+
+# --- Day Comparison Report (day-over-day changes, room trends, roster changes) ---
+DAILY_CHANGE_COLS = ['Date', 'Listed', 'Present', 'Not Present', 'Attendance Rate (%)',
+                     'Newly Absent', 'Returned', 'Joined', 'Left']
+NEWLY_ABSENT_COLS = ['Date', 'Student Name', 'Block', 'Floor', 'Room No.']
+ROOM_TREND_COLS = ['Block', 'Floor', 'Room No.', 'Students', 'First Rate (%)', 'Last Rate (%)',
+                   'Mean Rate (%)', 'Change (pts)', 'Trend (pts/day)']
+ROSTER_CHANGE_COLS = ['Student Name', 'Block', 'Floor', 'Room No.', 'Change', 'First Seen', 'Last Seen']
+
+def _rates(present: np.ndarray, listed: np.ndarray) -> np.ndarray:
+    """
+    Returns present / listed in percent (NaN where nobody was listed).
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(listed > 0, 100.0 * present / np.maximum(listed, 1), np.nan)
+
+def _rate_trends(rates: np.ndarray, day_numbers: np.ndarray) -> tuple:
+    """
+    Returns (first, last, slope per day) of every row of a groups x days rate matrix, ignoring
+    NaN days; the slope is the least-squares line through the row's valid days (NaN below two).
+    """
+    if not rates.shape[1]:
+        missing = np.full(len(rates), np.nan)
+        return missing, missing.copy(), missing.copy()
+    valid = ~np.isnan(rates)
+    n_valid = valid.sum(axis=1)
+    first_col = valid.argmax(axis=1)
+    last_col = rates.shape[1] - 1 - valid[:, ::-1].argmax(axis=1)
+    rows = np.arange(len(rates))
+    first = np.where(n_valid > 0, rates[rows, first_col], np.nan)
+    last = np.where(n_valid > 0, rates[rows, last_col], np.nan)
+
+    x = np.broadcast_to(day_numbers.astype(np.float64), rates.shape)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_x = np.where(valid, x, 0).sum(axis=1) / n_valid
+        mean_y = np.where(valid, rates, 0).sum(axis=1) / n_valid
+        dx = np.where(valid, x - mean_x[:, None], 0)
+        dy = np.where(valid, rates - mean_y[:, None], 0)
+        slope = (dx * dy).sum(axis=1) / (dx * dx).sum(axis=1)
+    return first, last, np.where(n_valid >= 2, slope, np.nan)
+
+@profiled()
+def compare_attendance_days(csv_files: list, floor_order: list,
+                            selected_blocks: list, selected_floors: list,
+                            selected_rooms: list, store: AttendanceStore = None,
+                            start_date=None, end_date=None) -> dict:
+    """
+    Compares the dated days between start_date and end_date with each other and returns:
+      - 'Daily Changes': per day the students listed, Present, Not Present, the attendance rate and
+        how many went Present -> Not Present ('Newly Absent'), back ('Returned'), appeared ('Joined')
+        or disappeared ('Left') since the previous day with data;
+      - 'Newly Absent Students': every Present -> Not Present change with its date, latest first;
+      - 'Room Trends': per room (latest location of its students) the attendance rate on the first and
+        last day, over the whole range, and its daily trend (least squares), worst first;
+      - 'Room Daily Rates': the attendance rate of every room per day;
+      - 'Roster Changes': students listed on the last day but not the first ('New') and vice versa
+        ('Departed'), with the first and last day they were seen.
+
+    Computed from the students x days matrix of the store's absence bitmaps (see day_transitions /
+    group_day_sums), so a month costs a few matrix operations instead of one read per file. Days
+    without any file (e.g. weekends) are skipped. Location filters work as in calculate_reduction_days.
+    """
+    store = store or get_attendance_store()
+    store.refresh(csv_files)
+    blocks, floors, rooms = active_filter(selected_blocks), active_filter(selected_floors), active_filter(selected_rooms)
+    codes = store.view(LocationIndex).codes(blocks, floors, rooms) if (blocks or floors or rooms) else None
+    bitmap, details = _status_matrix_sources(csv_files, store)
+
+    matrix_codes, absent, recorded, first_day = bitmap.status_matrix(start_date, end_date, codes)
+    annotate(rows=absent.size)
+
+    # Students are placed in the room they were last listed in. The pushed-down codes include everyone
+    # ever placed in the selected locations; only those whose latest location is selected are kept,
+    # so every table (and its totals) agrees with calculate_reduction_days
+    located = details.reindex(matrix_codes)
+    located['Room No.'] = located['Room No.'].astype('string')
+    if blocks or floors or rooms:
+        selected_rows = select_locations(located.reset_index(drop=True), blocks, floors, rooms).index.to_numpy()
+        matrix_codes, located = matrix_codes[selected_rows], located.iloc[selected_rows]
+        absent, recorded = absent[selected_rows], recorded[selected_rows]
+
+    # Only days with at least one record are compared
+    day_numbers = np.flatnonzero(recorded.any(axis=0))
+    absent, recorded = absent[:, day_numbers], recorded[:, day_numbers]
+    dates = pd.DatetimeIndex([date.fromordinal(first_day + int(day)) for day in day_numbers])
+    present = recorded & ~absent
+
+    # --- Day-over-day changes ---
+    transitions = day_transitions(absent, recorded)
+    daily_changes = pd.DataFrame({
+        'Date': dates,
+        'Listed': recorded.sum(axis=0),
+        'Present': present.sum(axis=0),
+        'Not Present': absent.sum(axis=0),
+        'Attendance Rate (%)': _rates(present.sum(axis=0), recorded.sum(axis=0)).round(1),
+    }, columns=DAILY_CHANGE_COLS[:5])
+    for name, changed in transitions.items():
+        counts = pd.array(np.r_[0, changed.sum(axis=0)][:len(dates)], dtype='Int64')
+        if len(counts):
+            counts[0] = pd.NA   # the first day has no previous day to compare with
+        daily_changes[name] = counts
+
+    # Rooms count the students listed in the range
+    has_location = located[LOCATION_COLS].notna().all(axis=1).to_numpy() & recorded.any(axis=1)
+
+    # --- Present -> Not Present ---
+    flip_rows, flip_days = np.nonzero(transitions['Newly Absent'])
+    newly_absent = located.iloc[flip_rows][REDUCTION_DETAIL_COLS].reset_index(drop=True)
+    newly_absent.insert(0, 'Date', dates[flip_days + 1])
+    newly_absent = sort_by_room_details(newly_absent, floor_order)
+    newly_absent = newly_absent.sort_values('Date', ascending=False, kind='stable')[NEWLY_ABSENT_COLS]
+
+    # --- Room trends (latest location of each student) ---
+    room_keys = located.loc[has_location, LOCATION_COLS].reset_index(drop=True)
+    room_codes, room_index = pd.MultiIndex.from_frame(room_keys).factorize()
+    room_present = group_day_sums(present[has_location], room_codes, len(room_index))
+    room_listed = group_day_sums(recorded[has_location], room_codes, len(room_index))
+    room_rates = _rates(room_present, room_listed)
+    first_rate, last_rate, slope = _rate_trends(room_rates, day_numbers)
+    room_table = room_index.to_frame(index=False, name=LOCATION_COLS)
+    room_trends = room_table.assign(**{
+        'Students': np.bincount(room_codes, minlength=len(room_index)),
+        'First Rate (%)': first_rate.round(1),
+        'Last Rate (%)': last_rate.round(1),
+        'Mean Rate (%)': _rates(room_present.sum(axis=1), room_listed.sum(axis=1)).round(1),
+        'Change (pts)': (last_rate - first_rate).round(1),
+        'Trend (pts/day)': slope.round(2),
+    })
+    room_daily_rates = pd.concat(
+        [room_table, pd.DataFrame(room_rates.round(1), columns=dates.strftime('%d-%b-%Y'))], axis=1)
+    room_trends = sort_by_room_details(room_trends, floor_order)
+    room_daily_rates = room_daily_rates.loc[room_trends.index]
+    worst_first = room_trends['Trend (pts/day)'].sort_values(kind='stable', na_position='last').index
+    room_trends = room_trends.loc[worst_first, ROOM_TREND_COLS]
+
+    # --- Roster changes between the first and the last day ---
+    if recorded.shape[1]:
+        new = ~recorded[:, 0] & recorded[:, -1]
+        departed = recorded[:, 0] & ~recorded[:, -1]
+        first_seen = recorded.argmax(axis=1)
+        last_seen = recorded.shape[1] - 1 - recorded[:, ::-1].argmax(axis=1)
+    else:
+        new = departed = np.zeros(len(matrix_codes), dtype=bool)
+        first_seen = last_seen = np.zeros(len(matrix_codes), dtype=np.int64)
+    changed_rows = np.flatnonzero(new | departed)
+    roster_changes = located.iloc[changed_rows][REDUCTION_DETAIL_COLS].reset_index(drop=True)
+    roster_changes['Change'] = np.where(new[changed_rows], 'New', 'Departed')
+    roster_changes['First Seen'] = dates[first_seen[changed_rows]]
+    roster_changes['Last Seen'] = dates[last_seen[changed_rows]]
+    roster_changes = sort_by_room_details(roster_changes[ROSTER_CHANGE_COLS], floor_order)
+
+    return {
+        'Daily Changes': daily_changes.iloc[::-1].reset_index(drop=True),
+        'Newly Absent Students': newly_absent.reset_index(drop=True),
+        'Room Trends': room_trends.reset_index(drop=True),
+        'Room Daily Rates': room_daily_rates.reset_index(drop=True),
+        'Roster Changes': roster_changes.reset_index(drop=True),
+    }
@@ -0,0 +1,316 @@
+"""
+Several hostels, each exporting its daily CSVs to its own directory (a "data root"):
+
+    ATTENDANCE_DATA_ROOTS="Boys Hostel=/data/boys:Girls Hostel=/data/girls"
+
+Roots are separated by os.pathsep (':' here, ';' on Windows); a root without 'Name=' is named
+after its directory. Without the variable the current directory is the only root.
+
+Every root is a shard with its own AttendanceStore (and views). Ingest and the per-shard report
+queries run in parallel, one thread per shard, and the Reduction Days, monthly and location
+results are merged. Selecting one hostel limits a query to that shard, so the other hostels'
+files are neither listed, ingested nor read.
+"""
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from attendance_config import FLOOR_ORDER
+from attendance_io import default_workers
+from attendance_perf import bind, profiled
+from attendance_reports import (
+    DailyRollup, FileDateIndex, active_filter, analyze_curfew_punches, build_file_date_index,
+    calculate_reduction_days, collect_unique_location_details, files_digest, get_attendance_store,
+    monthly_attendance_counts, warm_store_views
+)
+from attendance_watch import watch_directory
+
+# --- Constants for Sharded (Multi-Hostel) Data ---
+DATA_ROOTS_ENV = 'ATTENDANCE_DATA_ROOTS'
+# Hostel selector entry that merges every shard
+ALL_HOSTELS = 'All Hostels'
+# Column naming the shard of every row in merged reports
+HOSTEL_COL = 'Hostel'
+
+
+def configured_data_roots(value: str = None) -> dict:
+    """
+    Returns {hostel name: directory} from ATTENDANCE_DATA_ROOTS (or `value`), in the given order;
+    the current directory alone when nothing is configured.
+    """
+    value = os.environ.get(DATA_ROOTS_ENV, '') if value is None else value
+    roots = {}
+    for item in value.split(os.pathsep):
+        name, separator, path = item.partition('=')
+        if not separator:
+            name, path = '', name
+        name, path = name.strip(), path.strip()
+        if not path:
+            continue
+        name = name or os.path.basename(os.path.abspath(path))
+        if name in roots:
+            raise ValueError(f"Hostel {name!r} is configured twice in {DATA_ROOTS_ENV}.")
+        roots[name] = path
+    return roots or {os.path.basename(os.path.abspath('.')): '.'}
+
+
+# --- One Data Root ---
+class Shard:
+    """
+    One hostel's data root: its AttendanceStore and, while the dashboard watches it, the
+    DirectoryWatcher keeping that store current.
+    """
+
+    def __init__(self, name: str, data_dir: str):
+        self.name = name
+        self.data_dir = data_dir
+        self.watcher = None
+        self._files = None
+
+    @property
+    def store(self):
+        # Opened on first use, so a hostel that is never queried is never read
+        return get_attendance_store(self.data_dir)
+
+    def refresh(self) -> list:
+        """
+        Lists the data root and ingests its new or changed files. Returns the changed file names.
+        """
+        self._files = sorted(f for f in os.listdir(self.data_dir) if f.endswith('.csv'))
+        return self.store.refresh()
+
+    def watch(self):
+        """
+        Starts (once per process) the background watcher of the data root.
+        """
+        store = self.store
+        self.watcher = watch_directory(store, warm=lambda csv_files, changed: warm_store_views(csv_files, changed, store))
+
+    def csv_files(self) -> list:
+        """
+        Returns the sorted CSV file names of the data root as of its last scan or refresh.
+        """
+        if self.watcher is not None and self.watcher.is_running():
+            return self.watcher.csv_files()
+        if self._files is None:
+            self.refresh()
+        return self._files
+
+    def date_index(self) -> FileDateIndex:
+        return build_file_date_index(tuple(self.csv_files()))
+
+
+# --- Set of Shards (all configured hostels, or the selected ones) ---
+class ShardSet:
+    """
+    The shards a query runs on. Per-shard work is fanned out with map() and the results merged;
+    with a single shard the reports are returned unchanged (no Hostel column).
+    """
+
+    def __init__(self, shards: list):
+        self.shards = list(shards)
+
+    def __len__(self) -> int:
+        return len(self.shards)
+
+    def __iter__(self):
+        return iter(self.shards)
+
+    @property
+    def names(self) -> list:
+        return [shard.name for shard in self.shards]
+
+    @property
+    def merged(self) -> bool:
+        """
+        True when results of several shards are merged (and labelled with HOSTEL_COL).
+        """
+        return len(self.shards) > 1
+
+    def select(self, hostel: str = None) -> 'ShardSet':
+        """
+        Returns the shards a query for `hostel` touches: one hostel, or all of them for None / ALL_HOSTELS.
+        """
+        if hostel is None or hostel == ALL_HOSTELS:
+            return self
+        for shard in self.shards:
+            if shard.name == hostel:
+                return ShardSet([shard])
+        raise KeyError(f"Unknown hostel {hostel!r}; configured: {', '.join(self.names)}.")
+
+    def map(self, function) -> list:
+        """
+        Returns [function(shard)] in shard order, computed in parallel threads (at most
+        ATTENDANCE_LOAD_WORKERS / CPU count). Each call holds its store's lock, so an ingest by a
+        watcher never changes a shard's views mid-query.
+        """
+        def run(shard):
+            with shard.store.lock:
+                return function(shard)
+
+        workers = min(len(self.shards), default_workers())
+        if workers <= 1:
+            return [run(shard) for shard in self.shards]
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='attendance-shard') as pool:
+            return list(pool.map(bind(run), self.shards))
+
+    # --- Ingest ---
+    @profiled('shards.refresh')
+    def refresh(self) -> dict:
+        """
+        Ingests the new or changed files of every shard in parallel. Returns {hostel: changed files}.
+        """
+        return dict(zip(self.names, self.map(Shard.refresh)))
+
+    def watch(self):
+        """
+        Starts the background watchers of the shards, in parallel (each ingests its root once first).
+        """
+        self.map(Shard.watch)
+
+    # --- Merged Views ---
+    def date_index(self) -> FileDateIndex:
+        """
+        Returns the FileDateIndex of the file names of all shards (a day exported by several
+        hostels appears once).
+        """
+        if not self.merged:
+            return self.shards[0].date_index()
+        return build_file_date_index(tuple(sorted({name for shard in self.shards for name in shard.csv_files()})))
+
+    def month_files(self, month_key: str) -> list:
+        """
+        Returns [(shard, files of the month)] for the shards with files in a 'Mon-YYYY' month.
+        """
+        pairs = [(shard, shard.date_index().months.get(month_key)) for shard in self.shards]
+        return [(shard, list(files)) for shard, files in pairs if files]
+
+    def files_digest(self, month_key: str = None) -> str:
+        """
+        Returns a digest of the stored content of all shards' files (of one month, if given),
+        for keying caches of merged results.
+        """
+        if month_key is None:
+            parts = [(shard.name, files_digest(shard.csv_files(), shard.store)) for shard in self.shards]
+        else:
+            parts = [(shard.name, files_digest(files, shard.store)) for shard, files in self.month_files(month_key)]
+        return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+    @profiled('shards.location_details')
+    def location_details(self, selected_blocks: list = None, selected_floors: list = None) -> tuple:
+        """
+        collect_unique_location_details over every shard: the union of their Block, Floor and
+        Room No. options, ordered the same way.
+        """
+        results = self.map(lambda shard: collect_unique_location_details(
+            shard.csv_files(), shard.store, selected_blocks, selected_floors))
+        if not self.merged:
+            return results[0]
+        blocks, floors, rooms = (set().union(*options) for options in zip(*results))
+        sorted_floors = [f for f in FLOOR_ORDER if f in floors] + sorted(floors - set(FLOOR_ORDER))
+        return sorted(blocks), sorted_floors, sorted(rooms)
+
+    @profiled('shards.reduction_days')
+    def reduction_days(self, floor_order: list, selected_blocks: list, selected_floors: list,
+                       selected_rooms: list, start_date=None, end_date=None) -> pd.DataFrame:
+        """
+        calculate_reduction_days per shard, concatenated in hostel order with a leading Hostel column
+        (students are counted per hostel; Employee Codes of different hostels are never combined).
+        """
+        reports = self.map(lambda shard: calculate_reduction_days(
+            shard.csv_files(), floor_order, selected_blocks, selected_floors, selected_rooms,
+            store=shard.store, start_date=start_date, end_date=end_date))
+        if not self.merged:
+            return reports[0]
+        return pd.concat([report.assign(**{HOSTEL_COL: shard.name})[[HOSTEL_COL, *report.columns]]
+                          for shard, report in zip(self.shards, reports)], ignore_index=True)
+
+    def map_month(self, month_key: str, function) -> list:
+        """
+        Returns [(shard, function(shard, files of the month))] for the shards with files in a
+        'Mon-YYYY' month, computed in parallel (the first shard answers for no files when none has any).
+        """
+        pairs = self.month_files(month_key) or [(self.shards[0], [])]
+        month_files = {shard.name: files for shard, files in pairs}
+        shards = [shard for shard, _ in pairs]
+        return list(zip(shards, ShardSet(shards).map(lambda shard: function(shard, month_files[shard.name]))))
+
+    @profiled('shards.monthly_counts')
+    def monthly_counts(self, month_key: str, selected_blocks: list = None,
+                       selected_floors: list = None) -> pd.DataFrame:
+        """
+        monthly_attendance_counts of a month summed over the shards per date
+        (Day, Present, Not Present, Date_Sort in date order).
+        """
+        results = self.map_month(month_key, lambda shard, files: monthly_attendance_counts(
+            files, shard.store, selected_blocks, selected_floors))
+        if not self.merged:
+            return results[0][1]
+        counts = pd.concat([counts for _, counts in results], ignore_index=True)
+        counts = counts.groupby('Date_Sort', sort=True)[['Present', 'Not Present']].sum().reset_index()
+        counts['Day'] = counts['Date_Sort'].dt.strftime('%d')
+        return counts[['Day', 'Present', 'Not Present', 'Date_Sort']]
+
+    @profiled('shards.monthly_totals')
+    def monthly_totals(self, month_key: str, selected_blocks: list = None,
+                       selected_floors: list = None) -> pd.DataFrame:
+        """
+        The month's count totals (DailyRollup.monthly_counts) summed over the shards.
+        """
+        blocks, floors = active_filter(selected_blocks), active_filter(selected_floors)
+        results = self.map_month(month_key, lambda shard, files: shard.store.view(DailyRollup).monthly_counts(
+            files, blocks, floors))
+        if not self.merged:
+            return results[0][1]
+        totals = pd.concat([totals for _, totals in results], ignore_index=True)
+        return totals.groupby('Month', sort=False).sum().reset_index()
+
+    @profiled('shards.curfew_punches')
+    def curfew_punches(self, month_key: str, selected_blocks: list = None, selected_floors: list = None) -> dict:
+        """
+        analyze_curfew_punches of a month per shard: histograms summed per time bin, per-student
+        rows concatenated with a Hostel column (most after-curfew punches first).
+        """
+        results = self.map_month(month_key, lambda shard, files: analyze_curfew_punches(
+            files, shard.store, selected_blocks, selected_floors))
+        if not self.merged:
+            return results[0][1]
+        histogram = pd.concat([r['After-Curfew Punch Histogram'] for _, r in results], ignore_index=True)
+        histogram = histogram.groupby('Time Bin', sort=True)['Punches'].sum().reset_index()
+        per_student = pd.concat([r['After-Curfew Punches per Student'].assign(**{HOSTEL_COL: shard.name})
+                                 for shard, r in results], ignore_index=True)
+        per_student = per_student[[HOSTEL_COL, *[c for c in per_student.columns if c != HOSTEL_COL]]]
+        per_student = per_student.sort_values(by=['After-Curfew Punches', 'Student Name'],
+                                              ascending=[False, True], kind='stable').reset_index(drop=True)
+        return {'After-Curfew Punch Histogram': histogram, 'After-Curfew Punches per Student': per_student}
+
+    def quarantine_report(self) -> pd.DataFrame:
+        """
+        The quarantined files of the shards (File, Problem; with Hostel when merged).
+        """
+        reports = []
+        for shard in self.shards:
+            quarantined = shard.store.quarantined(shard.csv_files())
+            report = shard.store.validation_report(list(quarantined), warnings=False)[['File', 'Problem']]
+            reports.append(report.assign(**{HOSTEL_COL: shard.name})[[HOSTEL_COL, 'File', 'Problem']]
+                           if self.merged else report)
+        return pd.concat(reports, ignore_index=True)
+
+
+# --- Shard Registry (one set per configuration per process) ---
+_SHARD_SETS = {}
+
+
+def get_shard_set(roots: dict = None) -> ShardSet:
+    """
+    Returns the process-wide ShardSet of the configured data roots (see configured_data_roots).
+    Nothing is listed or ingested until a shard is refreshed or watched.
+    """
+    roots = configured_data_roots() if roots is None else roots
+    key = tuple((name, os.path.abspath(path)) for name, path in roots.items())
+    shard_set = _SHARD_SETS.get(key)
+    if shard_set is None:
+        shard_set = _SHARD_SETS.setdefault(key, ShardSet([Shard(name, path) for name, path in roots.items()]))
+    return shard_set
@@ -0,0 +1,539 @@
+import hashlib
+import json
+import os
+import threading
+
+import pandas as pd
+
+from attendance_io import (
+    MISSING_PUNCH, STATUS_CATEGORIES, apply_schema, compact_employee_codes, load_daily_files,
+    parquet_safe, parse_punch_records, punch_seconds, read_daily_csv
+)
+from attendance_perf import annotate, profiled
+
+# --- Constants for the On-Disk Store ---
+STORE_DIR_NAME = '.attendance_store'
+MANIFEST_NAME = 'manifest.json'
+# Bumped when manifest entries change meaning; every file is then re-ingested
+# (2: validation results, 3: unknown Status values and punch times no longer quarantine a file)
+MANIFEST_VERSION = 3
+QUARANTINE_REPORT_NAME = 'quarantine.csv'
+PARTITIONS_DIR_NAME = 'partitions'
+VIEWS_DIR_NAME = 'views'
+UNDATED_PARTITION = 'undated'
+
+# Columns of the daily biometric export, in file order
+STORE_COLUMNS = [
+    'Employee Code', 'Student Name', 'Block', 'Floor', 'Room No.',
+    'Last Punch', 'Punch Records', 'Status'
+]
+# Bookkeeping columns added to every stored row
+SOURCE_FILE_COL = 'Source File'
+DATE_COL = 'Date'
+# Columns without which a daily file is of no use to any report; files lacking one are quarantined
+VALIDATION_REQUIRED_COLS = ['Student Name', 'Status']
+# Examples of offending values quoted per validation issue
+VALIDATION_EXAMPLES = 3
+
+
+# --- Helper Function for File Fingerprints ---
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    """
+    Returns the SHA-1 hex digest of a file's contents, read in chunks.
+    """
+    digest = hashlib.sha1()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# --- Helper Functions for Converting a Daily CSV into the Store Layout ---
+def to_store_layout(df: pd.DataFrame, file_name: str, iso_date) -> pd.DataFrame:
+    """
+    Returns the rows of one daily file with the full STORE_COLUMNS set in the declared compact schema
+    (see attendance_io.apply_schema), plus Source File and Date.
+    """
+    out = apply_schema(df.reindex(columns=STORE_COLUMNS).astype('string'))
+    out[SOURCE_FILE_COL] = file_name
+    out[DATE_COL] = pd.Timestamp(iso_date) if iso_date else pd.NaT
+    out[DATE_COL] = out[DATE_COL].astype('datetime64[ns]')
+    return out
+
+
+# --- One-Time Validation of a Daily Export ---
+def _issue(check: str, severity: str, message: str, rows: int = 0) -> dict:
+    return {'check': check, 'severity': severity, 'message': message, 'rows': int(rows)}
+
+
+def _examples(values: pd.Series) -> str:
+    return ', '.join(repr(v) for v in values.drop_duplicates().head(VALIDATION_EXAMPLES))
+
+
+def validate_daily_export(df: pd.DataFrame) -> list:
+    """
+    Checks a daily export as read (every column as text) and returns its problems as
+    {'check', 'severity', 'message', 'rows'} dicts. 'error' problems make the file unusable,
+    so it is quarantined (no rows, a missing required column, or unreadable; see ingest_file);
+    'warning' problems are reported but its rows are still used.
+
+    Checks: required columns, the Status domain, duplicate Employee Codes and parseable
+    Last Punch / Punch Records times.
+    """
+    issues = []
+    if df.empty:
+        return [_issue('rows', 'error', "The file has no rows.")]
+
+    missing = [c for c in STORE_COLUMNS if c not in df.columns]
+    required_missing = [c for c in missing if c in VALIDATION_REQUIRED_COLS]
+    if required_missing:
+        issues.append(_issue('columns', 'error', f"Missing required column(s): {', '.join(required_missing)}."))
+    optional_missing = [c for c in missing if c not in VALIDATION_REQUIRED_COLS]
+    if optional_missing:
+        issues.append(_issue('columns', 'warning', f"Missing column(s): {', '.join(optional_missing)}."))
+
+    if 'Status' in df.columns:
+        status = df['Status']
+        unknown = status[status.notna() & ~status.isin(STATUS_CATEGORIES)]
+        if not unknown.empty:
+            # Kept as extra categories (see attendance_io.STATUS_CATEGORIES); such rows count as neither
+            issues.append(_issue('status', 'warning',
+                                 f"{len(unknown)} row(s) have a Status other than "
+                                 f"{' / '.join(STATUS_CATEGORIES)} (e.g. {_examples(unknown)}).", len(unknown)))
+        blank = int(status.isna().sum())
+        if blank:
+            issues.append(_issue('status', 'warning', f"{blank} row(s) have no Status.", blank))
+
+    if 'Employee Code' in df.columns:
+        codes = df['Employee Code'].dropna()
+        duplicated = codes[codes.duplicated(keep=False)]
+        if not duplicated.empty:
+            issues.append(_issue('employee_code', 'warning',
+                                 f"{duplicated.nunique()} Employee Code(s) appear on more than one row "
+                                 f"(e.g. {_examples(duplicated)}).", len(duplicated)))
+
+    if 'Last Punch' in df.columns:
+        punches = df['Last Punch'].dropna()
+        unparsed = punches[punch_seconds(punches) == MISSING_PUNCH]
+        if not unparsed.empty:
+            issues.append(_issue('punch_times', 'warning',
+                                 f"{len(unparsed)} Last Punch value(s) are not HH:MM:SS times "
+                                 f"(e.g. {_examples(unparsed)}).", len(unparsed)))
+
+    if 'Punch Records' in df.columns:
+        records = df['Punch Records'].dropna()
+        records = records[records.str.strip() != '']
+        unparsed = records[parse_punch_records(records).counts() == 0]
+        if not unparsed.empty:
+            issues.append(_issue('punch_times', 'warning',
+                                 f"{len(unparsed)} Punch Records value(s) contain no HH:MM:SS time "
+                                 f"(e.g. {_examples(unparsed)}).", len(unparsed)))
+    return issues
+
+
+def ingest_file(item: tuple) -> dict:
+    """
+    Loader worker: fingerprints one CSV and, unless its hash matches the known one, reads it,
+    validates it (see validate_daily_export) and converts it to the store layout.
+    `item` is (path, file name, known sha1, ISO date).
+
+    Unreadable or invalid files get an 'error' and no rows; the manifest remembers it, so they
+    are quarantined without being read again until they change.
+    """
+    path, file_name, known_sha1, iso_date = item
+    result = {'sha1': file_digest(path), 'frame': None, 'columns': [], 'rows': 0, 'issues': []}
+    if result['sha1'] == known_sha1:
+        return result
+    try:
+        df = read_daily_csv(path)
+        result['columns'] = [c for c in df.columns if c in STORE_COLUMNS]
+        result['rows'] = len(df)
+        result['issues'] = validate_daily_export(df)
+        errors = [issue['message'] for issue in result['issues'] if issue['severity'] == 'error']
+        if errors:
+            result['error'] = ' '.join(errors)
+        else:
+            result['frame'] = to_store_layout(df, file_name, iso_date)
+    except Exception as e:
+        # Unreadable export
+        result['error'] = str(e) or type(e).__name__
+        result['issues'] = [_issue('read', 'error', f"Could not be read: {result['error']}")]
+    return result
+
+
+# --- Persistent Columnar Attendance Store ---
+class AttendanceStore:
+    """
+    Month-partitioned Parquet copy of the daily attendance CSVs in a directory.
+
+    Each CSV is ingested once and re-ingested only when its mtime/size change AND its
+    content hash differs. Reports read from the in-memory partitions instead of the raw files.
+    Derived views (see attendance_views.py) registered through view() receive the old and new
+    rows of every changed file, so they can be maintained incrementally.
+    """
+
+    def __init__(self, data_dir: str = '.', date_parser=None, store_dir: str = None, workers: int = None):
+        self.data_dir = data_dir
+        self.date_parser = date_parser
+        # Loader worker count for ingesting changed files (None: ATTENDANCE_LOAD_WORKERS or all cores)
+        self.workers = workers
+        self.store_dir = store_dir or os.path.join(data_dir, STORE_DIR_NAME)
+        self.partitions_dir = os.path.join(self.store_dir, PARTITIONS_DIR_NAME)
+        self.views_dir = os.path.join(self.store_dir, VIEWS_DIR_NAME)
+        self.manifest_path = os.path.join(self.store_dir, MANIFEST_NAME)
+        self.manifest = self._load_manifest()
+        # partition name -> (DataFrame, {source file: row positions})
+        self._partition_cache = {}
+        # view name -> registered derived view
+        self._views = {}
+        # Held while ingesting; a DirectoryWatcher (attendance_watch.py) may refresh from its own thread
+        self.lock = threading.RLock()
+        self.watcher = None
+
+    @property
+    def generation(self) -> int:
+        """
+        Counter bumped on every committed change to the stored rows; views persist it to detect staleness.
+        """
+        return self.manifest.get('generation', 0)
+
+    # --- Manifest handling ---
+    def _load_manifest(self) -> dict:
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as fh:
+                manifest = json.load(fh)
+            if manifest.get('version') == MANIFEST_VERSION:
+                return manifest
+            # Older layout: start empty under a new generation, so views persisted from it are rebuilt
+            return {'version': MANIFEST_VERSION, 'files': {}, 'generation': manifest.get('generation', 0) + 1}
+        except (OSError, ValueError):
+            pass
+        return {'version': MANIFEST_VERSION, 'files': {}}
+
+    def _save_manifest(self):
+        os.makedirs(self.store_dir, exist_ok=True)
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as fh:
+            json.dump(self.manifest, fh, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _partition_for(self, file_name: str):
+        """
+        Returns (partition name, ISO date or None) for a daily file name.
+        """
+        date_obj = self.date_parser(file_name) if self.date_parser else None
+        if date_obj is None:
+            return UNDATED_PARTITION, None
+        return date_obj.strftime('%Y-%m'), date_obj.strftime('%Y-%m-%d')
+
+    # --- Partition handling ---
+    def _partition_path(self, partition: str) -> str:
+        return os.path.join(self.partitions_dir, f'{partition}.parquet')
+
+    def _read_partition(self, partition: str) -> tuple:
+        if partition not in self._partition_cache:
+            path = self._partition_path(partition)
+            if os.path.exists(path):
+                frame = self._typed(pd.read_parquet(path))
+            else:
+                frame = pd.DataFrame(columns=STORE_COLUMNS + [SOURCE_FILE_COL, DATE_COL])
+            self._cache_partition(partition, frame)
+        return self._partition_cache[partition]
+
+    def _cache_partition(self, partition: str, frame: pd.DataFrame):
+        positions = frame.groupby(SOURCE_FILE_COL, sort=False).indices if not frame.empty else {}
+        self._partition_cache[partition] = (frame, positions)
+
+    @staticmethod
+    def _typed(frame: pd.DataFrame) -> pd.DataFrame:
+        """
+        Brings a partition read from Parquet to the declared schema. Partitions written by this
+        version round-trip their dtypes, so only text Employee Codes (mixed codes) need converting.
+        """
+        if not isinstance(frame['Status'].dtype, pd.CategoricalDtype):
+            # Partition written before the compact schema existed
+            return apply_schema(frame)
+        if not pd.api.types.is_integer_dtype(frame['Employee Code'].dtype):
+            frame['Employee Code'] = compact_employee_codes(frame['Employee Code'])
+        return frame
+
+    def _write_partition(self, partition: str, frame: pd.DataFrame):
+        self._partition_cache.pop(partition, None)
+        path = self._partition_path(partition)
+        if frame.empty:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        os.makedirs(self.partitions_dir, exist_ok=True)
+        tmp_path = path + '.tmp'
+        parquet_safe(frame).to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        self._cache_partition(partition, frame)
+
+    # --- Ingest ---
+    def _is_current(self, file_name: str, stat_result) -> bool:
+        entry = self.manifest['files'].get(file_name)
+        return (entry is not None
+                and entry['mtime_ns'] == stat_result.st_mtime_ns
+                and entry['size'] == stat_result.st_size)
+
+    @profiled('store.refresh')
+    def refresh(self, csv_files: list = None, force: bool = False) -> list:
+        """
+        Ingests new or changed CSV files and returns the names of files whose stored rows changed.
+        When csv_files is None the whole data directory is scanned and deleted files are dropped.
+
+        While a running watcher keeps the store current, calls without force only wait for an
+        ingest in progress to finish (no files are listed or stat'ed) and return [].
+        """
+        if not force and self.watcher is not None and self.watcher.is_running():
+            with self.lock:
+                return []
+        with self.lock:
+            return self._refresh(csv_files)
+
+    def _refresh(self, csv_files: list = None) -> list:
+        full_scan = csv_files is None
+        if full_scan:
+            csv_files = [f for f in os.listdir(self.data_dir) if f.endswith('.csv')]
+
+        pending = []   # (file name, stat result) of files whose fingerprint changed
+        for file_name in csv_files:
+            path = os.path.join(self.data_dir, file_name)
+            try:
+                stat_result = os.stat(path)
+            except OSError:
+                continue
+            if not self._is_current(file_name, stat_result):
+                pending.append((file_name, stat_result))
+
+        # Hash and parse the pending files in parallel, in date order
+        stats = dict(pending)
+        partitions = {file_name: self._partition_for(file_name) for file_name in stats}
+        items = []
+        for file_name, _ in pending:
+            entry = self.manifest['files'].get(file_name) or {}
+            items.append((os.path.join(self.data_dir, file_name), file_name,
+                          entry.get('sha1'), partitions[file_name][1]))
+        loaded = load_daily_files(items, reducer=ingest_file, workers=self.workers,
+                                  order_key=lambda item: (item[3] is None, item[3] or '', item[1]))
+        annotate(rows=sum(result['rows'] for _, result in loaded))
+
+        changed = {}   # file name -> (manifest entry, store-layout DataFrame or None)
+        touched = False
+        for (_, file_name, known_sha1, iso_date), result in loaded:
+            stat_result = stats[file_name]
+            if result['sha1'] == known_sha1:
+                # Touched but not modified: only the fingerprint needs updating
+                entry = self.manifest['files'][file_name]
+                entry['mtime_ns'] = stat_result.st_mtime_ns
+                entry['size'] = stat_result.st_size
+                touched = True
+                continue
+
+            new_entry = {
+                'mtime_ns': stat_result.st_mtime_ns,
+                'size': stat_result.st_size,
+                'sha1': result['sha1'],
+                'partition': partitions[file_name][0],
+                'date': iso_date,
+                'columns': result['columns'],
+                'rows': result['rows'],
+            }
+            if 'error' in result:
+                new_entry['error'] = result['error']
+            if result['issues']:
+                new_entry['issues'] = result['issues']
+            changed[file_name] = (new_entry, result['frame'])
+
+        removed = []
+        if full_scan:
+            present = set(csv_files)
+            removed = [f for f in self.manifest['files'] if f not in present]
+
+        if not changed and not removed:
+            if touched:
+                self._save_manifest()
+            return []
+
+        self._apply_changes(changed, removed)
+        return sorted(changed) + sorted(removed)
+
+    def _apply_changes(self, changed: dict, removed: list):
+        """
+        Rewrites every partition affected by changed/removed files, then commits the manifest.
+        """
+        files = self.manifest['files']
+        affected = {}   # partition -> set of file names whose rows are replaced
+        old_frames = {}  # rows the registered views must retract
+        for file_name in list(changed) + removed:
+            old_entry = files.get(file_name)
+            if old_entry is not None:
+                affected.setdefault(old_entry['partition'], set()).add(file_name)
+                if self._views and 'error' not in old_entry:
+                    old_frames[file_name] = self.file_frame(file_name)
+        for file_name, (entry, _) in changed.items():
+            affected.setdefault(entry['partition'], set()).add(file_name)
+
+        for partition, replaced in affected.items():
+            frame, _ = self._read_partition(partition)
+            pieces = [frame[~frame[SOURCE_FILE_COL].isin(replaced)]] if not frame.empty else []
+            for file_name in sorted(replaced):
+                if file_name not in changed:
+                    continue
+                entry, df = changed[file_name]
+                if df is None or entry['partition'] != partition:
+                    continue
+                pieces.append(df)
+            pieces = [p for p in pieces if not p.empty]
+            new_frame = pd.concat(pieces, ignore_index=True) if pieces else pd.DataFrame()
+            if not new_frame.empty:
+                # Re-apply the schema so categories are unified across the combined days
+                new_frame = self._sort_partition(apply_schema(new_frame))
+            self._write_partition(partition, new_frame)
+
+        for file_name in removed:
+            files.pop(file_name, None)
+        for file_name, (entry, _) in changed.items():
+            files[file_name] = entry
+        self.manifest['generation'] = self.generation + 1
+        self._save_manifest()
+        self._write_quarantine_report()
+
+        if self._views:
+            new_frames = {
+                file_name: self.file_frame(file_name)
+                for file_name, (entry, df) in changed.items() if df is not None
+            }
+            for view in self._views.values():
+                view.apply_delta(old_frames, new_frames)
+                view.commit(self.generation)
+
+    @staticmethod
+    def _sort_partition(frame: pd.DataFrame) -> pd.DataFrame:
+        # Keep rows grouped by day (then file name) while preserving each file's row order
+        return frame.sort_values([DATE_COL, SOURCE_FILE_COL], kind='stable').reset_index(drop=True)
+
+    # --- Derived views ---
+    def view(self, view_cls):
+        """
+        Returns the registered instance of a derived view class, loading its persisted state
+        and rebuilding it from the stored rows if that state is missing or stale.
+        """
+        view = self._views.get(view_cls.name)
+        if view is None:
+            view = view_cls(self)
+            if view.generation != self.generation:
+                view.rebuild()
+                view.commit(self.generation)
+            self._views[view_cls.name] = view
+        return view
+
+    # --- Read API ---
+    def sort_key(self, file_name: str) -> tuple:
+        """
+        Chronological ordering key of a file: dated files by date then name, undated files last.
+        """
+        entry = self.manifest['files'].get(file_name) or {}
+        iso_date = entry.get('date')
+        return (iso_date is None, iso_date or '', file_name)
+
+    def ordered(self, csv_files: list) -> list:
+        """
+        Returns the given files sorted chronologically (see sort_key).
+        """
+        return sorted(csv_files, key=self.sort_key)
+
+    def files(self, csv_files: list = None, required_cols=None) -> list:
+        """
+        Returns the ingested files (in the given order) that were readable and had all required columns.
+        """
+        entries = self.manifest['files']
+        if csv_files is None:
+            csv_files = sorted(entries)
+        required = set(required_cols or [])
+        result = []
+        for file_name in csv_files:
+            entry = entries.get(file_name)
+            if entry is None or 'error' in entry:
+                continue
+            if required.issubset(entry['columns']):
+                result.append(file_name)
+        return result
+
+    def file_frame(self, file_name: str) -> pd.DataFrame:
+        """
+        Returns the stored rows of one file, limited to the columns that file actually had.
+        """
+        entry = self.manifest['files'].get(file_name)
+        if entry is None or 'error' in entry:
+            return pd.DataFrame()
+        frame, positions = self._read_partition(entry['partition'])
+        idx = positions.get(file_name)
+        if idx is None:
+            return pd.DataFrame(columns=entry['columns'])
+        return frame.iloc[idx][entry['columns']].reset_index(drop=True)
+
+    def quarantined(self, csv_files: list = None) -> dict:
+        """
+        Returns {file name: reason} of the files (all, or the given ones) that failed validation or
+        could not be read. Answered from the manifest alone; quarantined files are not read again
+        until they change.
+        """
+        entries = self.manifest['files']
+        names = sorted(entries) if csv_files is None else csv_files
+        return {name: entries[name]['error'] for name in names if 'error' in (entries.get(name) or {})}
+
+    def validation_report(self, csv_files: list = None, warnings: bool = True) -> pd.DataFrame:
+        """
+        Returns one row per validation issue (File, Date, Severity, Check, Rows, Problem) of the
+        files (all, or the given ones) in chronological order, errors first within a file.
+        """
+        entries = self.manifest['files']
+        rows = []
+        for file_name in self.ordered(sorted(entries) if csv_files is None else csv_files):
+            entry = entries.get(file_name) or {}
+            issues = entry.get('issues') or ([_issue('read', 'error', entry['error'])] if 'error' in entry else [])
+            for issue in sorted(issues, key=lambda issue: issue['severity'] != 'error'):
+                if warnings or issue['severity'] == 'error':
+                    rows.append({'File': file_name, 'Date': entry.get('date'), 'Severity': issue['severity'],
+                                 'Check': issue['check'], 'Rows': issue['rows'], 'Problem': issue['message']})
+        return pd.DataFrame(rows, columns=['File', 'Date', 'Severity', 'Check', 'Rows', 'Problem'])
+
+    def _write_quarantine_report(self):
+        """
+        Writes the errors of the quarantined files to QUARANTINE_REPORT_NAME in the store directory
+        (removed while no file is quarantined).
+        """
+        path = os.path.join(self.store_dir, QUARANTINE_REPORT_NAME)
+        report = self.validation_report(warnings=False)
+        if report.empty:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        tmp_path = path + '.tmp'
+        report.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+    def iter_frames(self, csv_files: list):
+        """
+        Yields (file name, DataFrame) for each readable ingested file, in the given order.
+        """
+        for file_name in self.files(csv_files):
+            yield file_name, self.file_frame(file_name)
+
+
+# --- Store Registry (one store per data directory per process) ---
+_STORES = {}
+
+
+def open_store(data_dir: str = '.', date_parser=None) -> AttendanceStore:
+    """
+    Returns the process-wide AttendanceStore for a data directory, creating it on first use.
+    """
+    key = os.path.abspath(data_dir)
+    store = _STORES.get(key)
+    if store is None:
+        store = AttendanceStore(data_dir, date_parser=date_parser)
+        _STORES[key] = store
+    return store
@@ -0,0 +1,770 @@
+import collections
+import json
+import os
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from attendance_config import FLOOR_ORDER, LATE_PUNCH_TIME_STR
+from attendance_io import SCHEMA_VERSION, compact_employee_codes, parquet_safe, punch_seconds, time_to_seconds
+
+# --- Constants for the Reduction Days Tally ---
+REDUCTION_REQUIRED_COLS = ['Employee Code', 'Status', 'Student Name', 'Block', 'Floor', 'Room No.']
+REDUCTION_DETAIL_COLS = ['Student Name', 'Block', 'Floor', 'Room No.']
+
+
+# --- Helper Function for "Last Seen Location Wins" Details ---
+def latest_student_details(frames: dict) -> pd.DataFrame:
+    """
+    Returns one row per Employee Code with the Student Name/Block/Floor/Room No. (and Source File)
+    of the last distinct row seen for that code. `frames` maps file name -> DataFrame and must be
+    in chronological order. Fully vectorized: one concat plus drop_duplicates(keep='last').
+    """
+    distinct = [
+        df[REDUCTION_REQUIRED_COLS].drop_duplicates().assign(**{'Source File': file_name})
+        for file_name, df in frames.items()
+    ]
+    if not distinct:
+        return pd.DataFrame(columns=REDUCTION_DETAIL_COLS + ['Source File'])
+    combined = pd.concat(distinct, ignore_index=True)
+    combined = combined[combined['Employee Code'].notna()]
+    latest = combined.drop_duplicates(subset='Employee Code', keep='last').set_index('Employee Code')
+    # Ensure Room No. is string for consistent merge/filter
+    latest['Room No.'] = latest['Room No.'].astype(str)
+    return latest[REDUCTION_DETAIL_COLS + ['Source File']]
+
+
+def absence_counts(df: pd.DataFrame) -> pd.Series:
+    """
+    Returns the number of 'Not Present' rows per Employee Code in one day's data.
+    """
+    return df.loc[df['Status'] == 'Not Present', 'Employee Code'].value_counts(sort=False)
+
+
+def late_punch_mask(df: pd.DataFrame, late_punch_time: str = LATE_PUNCH_TIME_STR) -> pd.Series:
+    """
+    True for 'Present' rows whose Last Punch is a valid time after late_punch_time. Accepts
+    Last Punch as HH:MM:SS text or as seconds since midnight (the compact schema).
+    """
+    if 'Last Punch' not in df.columns:
+        return pd.Series(False, index=df.index)
+    late = punch_seconds(df['Last Punch']) > time_to_seconds(late_punch_time)
+    return (df['Status'] == 'Present').fillna(False) & pd.Series(late, index=df.index)
+
+
+# --- Base Class for Derived Views Maintained by the Attendance Store ---
+class StoreView:
+    """
+    A table derived from the stored attendance rows that is updated from per-file deltas
+    rather than recomputed. Subclasses set `name` and implement reset/apply_delta/_save/_load.
+    """
+    name = None
+
+    def __init__(self, store):
+        self.store = store
+        self.generation = None
+        self.reset()
+        self._load_meta()
+
+    def _path(self, suffix: str) -> str:
+        return os.path.join(self.store.views_dir, f'{self.name}{suffix}')
+
+    def signature(self) -> dict:
+        """
+        Configuration the persisted state depends on; a mismatch on load forces a rebuild.
+        """
+        return {'schema': SCHEMA_VERSION}
+
+    def _load_meta(self):
+        try:
+            with open(self._path('.json'), 'r', encoding='utf-8') as fh:
+                meta = json.load(fh)
+            if meta.get('signature', {}) != self.signature():
+                raise ValueError('view configuration changed')
+            self._load()
+            self.generation = meta.get('generation')
+        except (OSError, ValueError, KeyError):
+            self.reset()
+            self.generation = None
+
+    def commit(self, generation: int):
+        """
+        Persists the view state, stamped with the store generation it reflects.
+        """
+        os.makedirs(self.store.views_dir, exist_ok=True)
+        self._save()
+        tmp_path = self._path('.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as fh:
+            json.dump({'generation': generation, 'signature': self.signature()}, fh)
+        os.replace(tmp_path, self._path('.json'))
+        self.generation = generation
+
+    def rebuild(self):
+        """
+        Recomputes the view from every stored file.
+        """
+        self.reset()
+        self.apply_delta({}, dict(self.store.iter_frames(self.store.files())))
+
+    def _write_frame(self, suffix: str, frame: pd.DataFrame):
+        path = self._path(suffix)
+        parquet_safe(frame).to_parquet(path + '.tmp', index=False)
+        os.replace(path + '.tmp', path)
+
+    # Subclass hooks
+    def reset(self):
+        raise NotImplementedError
+
+    def apply_delta(self, old_frames: dict, new_frames: dict):
+        raise NotImplementedError
+
+    def _save(self):
+        raise NotImplementedError
+
+    def _load(self):
+        raise NotImplementedError
+
+
+# --- Incremental Reduction Days Tally ---
+class ReductionTally(StoreView):
+    """
+    Running Reduction Days total per Employee Code plus the latest Block/Floor/Room per student.
+
+    Per-file absence counts are kept so a changed or deleted day can be subtracted again;
+    a new day only adds its own counts and overrides the details of the students it contains.
+    """
+    name = 'reduction_tally'
+
+    def reset(self):
+        self.file_counts = {}  # file name -> Series(Employee Code -> absences that day)
+        self.totals = pd.Series(dtype='int64')
+        self.details = pd.DataFrame(columns=REDUCTION_DETAIL_COLS + ['Source File', 'Sort Key'])
+        self._report = None
+
+    # --- Delta maintenance ---
+    def apply_delta(self, old_frames: dict, new_frames: dict):
+        self._report = None
+        stale_codes = set()
+
+        for file_name in old_frames:
+            counts = self.file_counts.pop(file_name, None)
+            if counts is not None and not counts.empty:
+                self.totals = self.totals.sub(counts, fill_value=0)
+            from_file = (self.details['Source File'] == file_name).to_numpy(dtype=bool)
+            stale_codes.update(self.details.index[from_file])
+            self.details = self.details[~from_file]
+
+        for file_name in self.store.ordered(list(new_frames)):
+            df = new_frames[file_name]
+            if not set(REDUCTION_REQUIRED_COLS).issubset(df.columns):
+                continue
+            counts = absence_counts(df)
+            self.file_counts[file_name] = counts
+            if not counts.empty:
+                self.totals = self.totals.add(counts, fill_value=0)
+            self._merge_details(latest_student_details({file_name: df}), file_name)
+
+        # Students whose latest row came from a retracted file fall back to their previous day
+        missing = stale_codes.difference(self.details.index)
+        if missing:
+            self._recover_details(missing)
+
+        self.totals = self.totals[self.totals != 0].astype('int64')
+
+    def rebuild(self):
+        """
+        Recomputes the tally from every stored file in one vectorized pass.
+        """
+        self.reset()
+        files = self.store.ordered(self.store.files(None, REDUCTION_REQUIRED_COLS))
+        frames = {file_name: self.store.file_frame(file_name) for file_name in files}
+        self.file_counts = {file_name: absence_counts(df) for file_name, df in frames.items()}
+        counts = [c for c in self.file_counts.values() if not c.empty]
+        if counts:
+            totals = pd.concat(counts).groupby(level=0).sum()
+            self.totals = totals[totals != 0].astype('int64')
+        details = latest_student_details(frames)
+        details['Sort Key'] = details['Source File'].map(self._key)
+        self.details = details
+
+    def _key(self, file_name: str) -> str:
+        is_undated, iso_date, name = self.store.sort_key(file_name)
+        return f"{int(is_undated)}|{iso_date}|{name}"
+
+    def _merge_details(self, latest: pd.DataFrame, file_name: str):
+        sort_key = self._key(file_name)
+        latest = latest.assign(**{'Sort Key': sort_key})
+        current = self.details.reindex(latest.index)
+        newer = (current['Sort Key'].isna() | (current['Sort Key'] <= sort_key)).fillna(True)
+        latest = latest[newer.to_numpy(dtype=bool)]
+        self.details = pd.concat([self.details.drop(latest.index, errors='ignore'), latest])
+
+    def _recover_details(self, codes: set):
+        for file_name in self.store.ordered(list(self.file_counts)):
+            df = self.store.file_frame(file_name)
+            df = df[df['Employee Code'].isin(codes)]
+            if not df.empty:
+                self._merge_details(latest_student_details({file_name: df}), file_name)
+
+    # --- Queries ---
+    def covers(self, csv_files: list) -> bool:
+        """
+        True when the tally was built from exactly these (readable, complete) files.
+        """
+        return set(csv_files) == set(self.file_counts)
+
+    def _with_totals(self, details: pd.DataFrame, totals: pd.Series = None) -> pd.DataFrame:
+        details = details.sort_index().rename_axis('Employee Code')
+        totals = self.totals if totals is None else totals
+        report = details.join(totals.rename('Reduction Days'), how='inner')
+        report['Reduction Days'] = report['Reduction Days'].astype(int)
+        return report[report['Reduction Days'] > 0].rename_axis('Employee Code').reset_index()
+
+    def report(self, codes=None, totals: pd.Series = None) -> pd.DataFrame:
+        """
+        Returns Employee Code, details and Reduction Days for every student with at least one absence
+        (only the given Employee Codes, when `codes` is not None). `totals` (Employee Code -> days)
+        replaces the all-files totals, e.g. with the absences of a date range.
+        """
+        if totals is not None:
+            codes = totals.index if codes is None else totals.index.intersection(codes)
+        if codes is not None:
+            details = self.details.loc[self.details.index.intersection(codes), REDUCTION_DETAIL_COLS]
+            return self._with_totals(details, totals)
+        if self._report is None:
+            self._report = self._with_totals(self.details[REDUCTION_DETAIL_COLS])
+        return self._report.copy()
+
+    # --- Persistence ---
+    def _save(self):
+        counts = [
+            pd.DataFrame({'Source File': file_name, 'Employee Code': c.index, 'Absences': c.to_numpy()})
+            for file_name, c in self.file_counts.items()
+        ]
+        counts_df = pd.concat(counts, ignore_index=True) if counts else pd.DataFrame(
+            columns=['Source File', 'Employee Code', 'Absences'])
+        self._write_frame('_counts.parquet', counts_df.astype({'Absences': 'int64'}))
+        self._write_frame('_details.parquet', self.details.rename_axis('Employee Code').reset_index())
+        with open(self._path('_files.json') + '.tmp', 'w', encoding='utf-8') as fh:
+            json.dump(sorted(self.file_counts), fh)
+        os.replace(self._path('_files.json') + '.tmp', self._path('_files.json'))
+
+    def _load(self):
+        counts_df = pd.read_parquet(self._path('_counts.parquet'))
+        counts_df['Employee Code'] = compact_employee_codes(counts_df['Employee Code'])
+        with open(self._path('_files.json'), 'r', encoding='utf-8') as fh:
+            files = json.load(fh)
+        self.file_counts = {file_name: pd.Series(dtype='int64') for file_name in files}
+        for file_name, group in counts_df.groupby('Source File', sort=False):
+            self.file_counts[file_name] = pd.Series(
+                group['Absences'].to_numpy(), index=group['Employee Code'].to_numpy(), name='count')
+        self.totals = counts_df.groupby('Employee Code')['Absences'].sum().astype('int64')
+        details = pd.read_parquet(self._path('_details.parquet'))
+        details['Employee Code'] = compact_employee_codes(details['Employee Code'])
+        self.details = details.set_index('Employee Code')
+
+
+# --- Daily Rollup Table (Monthly Attendance Graph) ---
+ROLLUP_GROUP_COLS = ['Block', 'Floor']
+ROLLUP_COUNT_COLS = ['Present', 'Not Present', 'Late']
+
+
+class DailyRollup(StoreView):
+    """
+    Materialized per-day Present / Not Present / Late counts, broken down by Block and Floor.
+
+    One row per (file, Block, Floor); whole-day totals are the sum over a file's rows, so the
+    monthly graph can be drawn (and filtered by location) without touching the raw rows.
+    """
+    name = 'daily_rollup'
+
+    def signature(self) -> dict:
+        return {**super().signature(), 'late_punch_time': LATE_PUNCH_TIME_STR}
+
+    def reset(self):
+        self.table = pd.DataFrame(columns=['Source File', 'Date'] + ROLLUP_GROUP_COLS + ROLLUP_COUNT_COLS)
+
+    @staticmethod
+    def summarize(file_name: str, df: pd.DataFrame, iso_date) -> pd.DataFrame:
+        """
+        Returns the rollup rows of one day. Days without a Status column contribute nothing.
+        """
+        if 'Status' not in df.columns:
+            return pd.DataFrame()
+        keys = df.reindex(columns=ROLLUP_GROUP_COLS)
+        counts = pd.DataFrame({
+            'Present': (df['Status'] == 'Present').fillna(False).astype('int64'),
+            'Not Present': (df['Status'] == 'Not Present').fillna(False).astype('int64'),
+            'Late': late_punch_mask(df).astype('int64'),
+        })
+        rollup = pd.concat([keys, counts], axis=1).groupby(
+            ROLLUP_GROUP_COLS, dropna=False, sort=False).sum().reset_index()
+        rollup.insert(0, 'Date', pd.Timestamp(iso_date) if iso_date else pd.NaT)
+        rollup.insert(0, 'Source File', file_name)
+        return rollup
+
+    def apply_delta(self, old_frames: dict, new_frames: dict):
+        retracted = set(old_frames) | set(new_frames)
+        pieces = [self.table[~self.table['Source File'].isin(retracted)]]
+        for file_name, df in new_frames.items():
+            iso_date = (self.store.manifest['files'].get(file_name) or {}).get('date')
+            pieces.append(self.summarize(file_name, df, iso_date))
+        pieces = [p for p in pieces if not p.empty]
+        if pieces:
+            table = pd.concat(pieces, ignore_index=True)
+            table['Date'] = pd.to_datetime(table['Date'])
+            self.table = table.astype({col: 'int64' for col in ROLLUP_COUNT_COLS})
+        else:
+            self.reset()
+
+    # --- Queries ---
+    def _select(self, csv_files: list, blocks: list = None, floors: list = None) -> pd.DataFrame:
+        table = self.table[self.table['Source File'].isin(csv_files)]
+        if blocks:
+            table = table[table['Block'].isin(blocks)]
+        if floors:
+            table = table[table['Floor'].isin(floors)]
+        return table
+
+    def daily_counts(self, csv_files: list, blocks: list = None, floors: list = None) -> pd.DataFrame:
+        """
+        Returns Source File, Date and the count columns per day, in date order. Empty lists / None
+        for blocks or floors mean no filter; every day with a Status column is listed even when the
+        filter leaves no students.
+        """
+        days = self.table[self.table['Source File'].isin(csv_files)][['Source File', 'Date']].drop_duplicates()
+        counts = self._select(csv_files, blocks, floors).groupby('Source File')[ROLLUP_COUNT_COLS].sum()
+        daily = days.merge(counts, left_on='Source File', right_index=True, how='left')
+        daily[ROLLUP_COUNT_COLS] = daily[ROLLUP_COUNT_COLS].fillna(0).astype('int64')
+        return daily.sort_values(['Date', 'Source File'], kind='stable').reset_index(drop=True)
+
+    def monthly_counts(self, csv_files: list, blocks: list = None, floors: list = None) -> pd.DataFrame:
+        """
+        Returns the count columns summed per calendar month ('Month' as 'Mon-YYYY'), latest first.
+        """
+        table = self._select(csv_files, blocks, floors)
+        table = table[table['Date'].notna()]
+        monthly = table.groupby(table['Date'].dt.to_period('M'))[ROLLUP_COUNT_COLS].sum()
+        monthly = monthly.sort_index(ascending=False)
+        monthly.index = monthly.index.strftime('%b-%Y')
+        return monthly.rename_axis('Month').reset_index()
+
+    # --- Persistence ---
+    def _save(self):
+        self._write_frame('.parquet', self.table)
+
+    def _load(self):
+        self.table = pd.read_parquet(self._path('.parquet'))
+
+
+# --- Location Index (Block -> Floor -> Room -> Employee Codes) ---
+LOCATION_COLS = ['Block', 'Floor', 'Room No.']
+LOCATION_INDEX_COLS = LOCATION_COLS + ['Employee Code', 'Files']
+
+
+def location_memberships(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns the distinct (Block, Floor, Room No., Employee Code) combinations of one day as text
+    locations (Employee Code is missing when the file has no such column). Empty when a location
+    column is missing.
+    """
+    if not set(LOCATION_COLS).issubset(df.columns):
+        return pd.DataFrame(columns=LOCATION_INDEX_COLS[:-1])
+    pairs = df.reindex(columns=LOCATION_COLS + ['Employee Code'])
+    pairs = pairs.astype({col: 'string' for col in LOCATION_COLS})
+    return pairs.drop_duplicates().reset_index(drop=True)
+
+
+def select_locations(table: pd.DataFrame, blocks: list = None, floors: list = None,
+                     rooms: list = None) -> pd.DataFrame:
+    """
+    Returns the rows of a memberships table inside the given Blocks / Floors / Rooms (None = no filter),
+    combined into a single mask.
+    """
+    mask = pd.Series(True, index=table.index)
+    for col, selected in zip(LOCATION_COLS, (blocks, floors, rooms)):
+        if selected:
+            mask &= table[col].isin([str(value) for value in selected]).fillna(False)
+    return table[mask.to_numpy(dtype=bool)]
+
+
+def location_options(table: pd.DataFrame, blocks: list = None, floors: list = None) -> tuple:
+    """
+    Returns the (Blocks, Floors, Rooms) options of a memberships table: all Blocks (sorted),
+    the Floors of the selected Blocks (FLOOR_ORDER first, then alphabetically) and the Rooms
+    of the selected Blocks and Floors (sorted as text).
+    """
+    all_blocks = sorted(table['Block'].dropna().unique())
+    floor_values = set(select_locations(table, blocks)['Floor'].dropna().unique())
+    sorted_floors = [f for f in FLOOR_ORDER if f in floor_values] + sorted(floor_values - set(FLOOR_ORDER))
+    sorted_rooms = sorted(select_locations(table, blocks, floors)['Room No.'].dropna().unique())
+    return all_blocks, sorted_floors, sorted_rooms
+
+
+class LocationIndex(StoreView):
+    """
+    Every (Block, Floor, Room No., Employee Code) combination seen in the stored files with the
+    number of files it occurs in, i.e. Block -> Floor -> Room -> the students ever placed there.
+
+    Counts let a changed or deleted day be subtracted again. Serves the (cascading) sidebar
+    location options and the candidate students of a location filter without reading rows.
+    """
+    name = 'location_index'
+
+    def reset(self):
+        self.files = set()
+        self.table = pd.DataFrame(columns=LOCATION_INDEX_COLS)
+
+    def apply_delta(self, old_frames: dict, new_frames: dict):
+        pieces = [self.table]
+        for file_name, df in old_frames.items():
+            if file_name in self.files:
+                pieces.append(location_memberships(df).assign(Files=-1))
+                self.files.discard(file_name)
+        for file_name, df in new_frames.items():
+            if set(LOCATION_COLS).issubset(df.columns):
+                pieces.append(location_memberships(df).assign(Files=1))
+                self.files.add(file_name)
+        pieces = [p for p in pieces if not p.empty]
+        if not pieces:
+            self.table = pd.DataFrame(columns=LOCATION_INDEX_COLS)
+            return
+        combined = pd.concat(pieces, ignore_index=True)
+        combined['Employee Code'] = compact_employee_codes(combined['Employee Code'])
+        table = combined.groupby(LOCATION_INDEX_COLS[:-1], dropna=False, sort=False)['Files'].sum().reset_index()
+        self.table = table[table['Files'] > 0].astype({'Files': 'int64'}).reset_index(drop=True)
+
+    # --- Queries ---
+    def covers(self, csv_files: list) -> bool:
+        """
+        True when the index was built from exactly these files (those having all location columns).
+        """
+        return set(csv_files) == self.files
+
+    def options(self, blocks: list = None, floors: list = None) -> tuple:
+        """
+        Returns the (Blocks, Floors, Rooms) sidebar options; Floors narrowed to the selected Blocks
+        and Rooms to the selected Blocks and Floors.
+        """
+        return location_options(self.table, blocks, floors)
+
+    def codes(self, blocks: list = None, floors: list = None, rooms: list = None) -> pd.Index:
+        """
+        Returns the Employee Codes ever seen in the selected locations (a superset of the students
+        whose latest location matches, since students can move).
+        """
+        selected = select_locations(self.table, blocks, floors, rooms)
+        return pd.Index(selected['Employee Code'].dropna().unique())
+
+    # --- Persistence ---
+    def _save(self):
+        self._write_frame('.parquet', self.table)
+        with open(self._path('_files.json') + '.tmp', 'w', encoding='utf-8') as fh:
+            json.dump(sorted(self.files), fh)
+        os.replace(self._path('_files.json') + '.tmp', self._path('_files.json'))
+
+    def _load(self):
+        table = pd.read_parquet(self._path('.parquet'))
+        table['Employee Code'] = compact_employee_codes(table['Employee Code'])
+        self.table = table.astype({col: 'string' for col in LOCATION_COLS})
+        with open(self._path('_files.json'), 'r', encoding='utf-8') as fh:
+            self.files = set(json.load(fh))
+
+
+# --- Per-Student Absence Bitmaps (date-range Reduction Days) ---
+BITMAP_REQUIRED_COLS = ['Employee Code', 'Status']
+# One immutable snapshot of the bitmaps. Ingests build a new one and swap it in with a single
+# assignment, so a query never pairs the codes of one version with the bit matrices of another.
+BitmapState = collections.namedtuple(
+    'BitmapState', ['codes', 'first_day', 'n_days', 'absent', 'recorded', 'extra', 'file_days'])
+# Number of set bits of every byte value
+_POPCOUNT = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint8)
+
+
+def pack_days(matrix: np.ndarray) -> np.ndarray:
+    """
+    Packs a students x days boolean matrix into bytes (day i of a row is bit i % 8 of byte i // 8).
+    """
+    return np.packbits(matrix, axis=1, bitorder='little')
+
+
+def unpack_days(bits: np.ndarray, n_days: int) -> np.ndarray:
+    """
+    Inverse of pack_days: returns the students x n_days boolean matrix.
+    """
+    if bits.shape[1] == 0:
+        return np.zeros((bits.shape[0], n_days), dtype=bool)
+    return np.unpackbits(bits, axis=1, count=n_days, bitorder='little').astype(bool)
+
+
+def count_days(bits: np.ndarray, first: int, last: int) -> np.ndarray:
+    """
+    Returns the number of set bits per row between day columns first and last (inclusive):
+    the bytes of the slice are masked at both ends and popcounted.
+    """
+    window = bits[:, first // 8:last // 8 + 1].copy()
+    window[:, 0] &= np.uint8((0xFF << (first % 8)) & 0xFF)
+    window[:, -1] &= np.uint8(0xFF >> (7 - last % 8))
+    return _POPCOUNT[window].sum(axis=1, dtype=np.int64)
+
+
+# --- Absence Streaks and Weekday Profile (run lengths over the students x days matrix) ---
+WEEKDAY_NAMES = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+
+def absence_streaks(absent: np.ndarray, recorded: np.ndarray) -> tuple:
+    """
+    Returns (current, longest) consecutive-absence streak per row of a students x days matrix.
+    A day the student was recorded 'Present' (or with another Status) ends a streak; a day without
+    a record (no file, or the student not listed) neither ends nor extends it. `current` is the
+    streak still running on the last day. Vectorized over all rows: the running count of absences
+    minus its value at the last streak break is the streak length on every day.
+    """
+    if not absent.shape[1]:
+        zeros = np.zeros(absent.shape[0], dtype=np.int64)
+        return zeros, zeros.copy()
+    absences = np.cumsum(absent, axis=1, dtype=np.int32)
+    breaks = recorded & ~absent
+    at_break = np.maximum.accumulate(np.where(breaks, absences, 0), axis=1)
+    streaks = absences - at_break
+    return streaks[:, -1].astype(np.int64), streaks.max(axis=1).astype(np.int64)
+
+
+def weekday_profile(absent: np.ndarray, recorded: np.ndarray, first_day: int) -> tuple:
+    """
+    Returns (absences, recorded days) per row and weekday (Mon..Sun columns) of a students x days
+    matrix whose column 0 is the date ordinal first_day; one matrix product per count.
+    """
+    weekdays = (np.arange(absent.shape[1]) + first_day - 1) % 7   # date.fromordinal(1) is a Monday
+    one_hot = (weekdays[:, None] == np.arange(7)).astype(np.int32)
+    return absent.astype(np.int32) @ one_hot, recorded.astype(np.int32) @ one_hot
+
+
+def day_transitions(absent: np.ndarray, recorded: np.ndarray) -> dict:
+    """
+    Returns the day-over-day changes of a students x days matrix as boolean students x (days - 1)
+    matrices, column j comparing day j + 1 with day j: 'Newly Absent' (recorded without being
+    absent, then 'Not Present'), 'Returned' (the reverse), 'Joined' (listed after not being
+    listed) and 'Left' (the reverse).
+    """
+    present = recorded & ~absent
+    return {
+        'Newly Absent': present[:, :-1] & absent[:, 1:],
+        'Returned': absent[:, :-1] & present[:, 1:],
+        'Joined': ~recorded[:, :-1] & recorded[:, 1:],
+        'Left': recorded[:, :-1] & ~recorded[:, 1:],
+    }
+
+
+def group_day_sums(matrix: np.ndarray, groups: np.ndarray, n_groups: int) -> np.ndarray:
+    """
+    Returns the column sums of a students x days matrix per row group (groups[i] in 0..n_groups-1)
+    as an n_groups x days matrix: the rows are sorted by group once and summed with one reduceat.
+    """
+    sums = np.zeros((n_groups, matrix.shape[1]), dtype=np.int64)
+    if not len(groups) or not matrix.shape[1]:
+        return sums
+    order = np.argsort(groups, kind='stable')
+    sorted_groups = groups[order]
+    starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+    sums[sorted_groups[starts]] = np.add.reduceat(matrix[order].astype(np.int64), starts, axis=0)
+    return sums
+
+
+class AbsenceBitmap(StoreView):
+    """
+    Per-student day bitsets over the dated files (held in `state`, a BitmapState): row i belongs
+    to codes[i], day column j is the date first_day + j (ordinals). `absent` has a bit for every day a student was 'Not Present',
+    `recorded` for every day the student was listed with a Status. Both are packed with NumPy
+    (pack_days), so the absences between two dates are a popcount over a slice of each row.
+
+    Undated files are not included. When a code is 'Not Present' more than once on one day (shared
+    codes, or two files with the same date) the additional absences are kept in the small `extra`
+    table, so the counts match the all-files tally.
+    """
+    name = 'absence_bitmap'
+
+    def reset(self):
+        self.state = BitmapState(
+            codes=pd.Index([], dtype='int64'),
+            first_day=None,     # date ordinal of day column 0
+            n_days=0,
+            absent=np.zeros((0, 0), dtype=np.uint8),
+            recorded=np.zeros((0, 0), dtype=np.uint8),
+            extra=pd.DataFrame({'Employee Code': pd.Series(dtype='int64'), 'Day': pd.Series(dtype='int64'),
+                                'Absences': pd.Series(dtype='int64')}),
+            file_days={})       # file name -> date ordinal
+
+    def apply_delta(self, old_frames: dict, new_frames: dict):
+        state = self.state
+        file_days = dict(state.file_days)
+        affected = {file_days.pop(file_name) for file_name in old_frames if file_name in file_days}
+        for file_name, df in new_frames.items():
+            iso_date = (self.store.manifest['files'].get(file_name) or {}).get('date')
+            if iso_date and set(BITMAP_REQUIRED_COLS).issubset(df.columns):
+                file_days[file_name] = date.fromisoformat(iso_date).toordinal()
+                affected.add(file_days[file_name])
+        if not affected:
+            return
+        if not file_days:
+            self.reset()
+            return
+
+        # Affected days are rebuilt from every current file of that date
+        day_frames = {}
+        for file_name, ordinal in file_days.items():
+            if ordinal in affected:
+                df = new_frames[file_name] if file_name in new_frames else self.store.file_frame(file_name)
+                day_frames.setdefault(ordinal, []).append(df[BITMAP_REQUIRED_COLS])
+
+        new_codes = [pd.Index(df['Employee Code'].dropna().unique()) for frames in day_frames.values() for df in frames]
+        codes = state.codes.append(new_codes).unique() if new_codes else state.codes
+        first_day, last_day = min(file_days.values()), max(file_days.values())
+        absent = self._resized(state, state.absent, len(codes), first_day, last_day)
+        recorded = self._resized(state, state.recorded, len(codes), first_day, last_day)
+        codes = pd.Index(codes)
+
+        extra = [state.extra[~state.extra['Day'].isin(affected)]]
+        for ordinal in affected:
+            if not first_day <= ordinal <= last_day:
+                continue
+            column = ordinal - first_day
+            absent[:, column] = False
+            recorded[:, column] = False
+            frames = day_frames.get(ordinal, [])
+            if not frames:
+                continue
+            listed = pd.concat(frames, ignore_index=True)
+            listed = listed[listed['Status'].notna() & listed['Employee Code'].notna()]
+            recorded[codes.get_indexer(listed['Employee Code'].unique()), column] = True
+            absences = listed.loc[listed['Status'] == 'Not Present', 'Employee Code'].value_counts(sort=False)
+            absent[codes.get_indexer(absences.index), column] = True
+            repeated = absences[absences > 1] - 1
+            if not repeated.empty:
+                extra.append(pd.DataFrame({'Employee Code': repeated.index, 'Day': ordinal,
+                                           'Absences': repeated.to_numpy(dtype='int64')}))
+
+        self.state = BitmapState(
+            codes=codes, first_day=first_day, n_days=last_day - first_day + 1,
+            absent=pack_days(absent), recorded=pack_days(recorded),
+            extra=pd.concat(extra, ignore_index=True) if len(extra) > 1 else extra[0], file_days=file_days)
+
+    @classmethod
+    def from_files(cls, store, csv_files: list) -> 'AbsenceBitmap':
+        """
+        Returns bitmaps built from only the given stored files (not registered or persisted),
+        for reports over a subset of the files.
+        """
+        bitmap = cls.__new__(cls)
+        bitmap.store, bitmap.generation = store, None
+        bitmap.reset()
+        bitmap.apply_delta({}, dict(store.iter_frames(csv_files)))
+        return bitmap
+
+    @staticmethod
+    def _resized(state: BitmapState, bits: np.ndarray, n_students: int, first_day: int, last_day: int) -> np.ndarray:
+        """
+        Returns the unpacked matrix of `bits` (of `state`) grown to n_students rows and the
+        first_day..last_day span.
+        """
+        matrix = np.zeros((n_students, last_day - first_day + 1), dtype=bool)
+        if state.n_days:
+            old = unpack_days(bits, state.n_days)
+            lo, hi = max(first_day, state.first_day), min(last_day, state.first_day + state.n_days - 1)
+            if lo <= hi:
+                matrix[:old.shape[0], lo - first_day:hi - first_day + 1] = \
+                    old[:, lo - state.first_day:hi - state.first_day + 1]
+        return matrix
+
+    # --- Queries ---
+    def covers(self, csv_files: list) -> bool:
+        """
+        True when the bitmaps were built from exactly the dated files among these.
+        """
+        dated = {file_name for file_name in csv_files if not self.store.sort_key(file_name)[0]}
+        return dated == set(self.state.file_days)
+
+    @staticmethod
+    def _columns(state: BitmapState, start: date = None, end: date = None) -> tuple:
+        first = 0 if start is None else max(start.toordinal() - state.first_day, 0)
+        last = state.n_days - 1 if end is None else min(end.toordinal() - state.first_day, state.n_days - 1)
+        return first, last
+
+    def absence_days(self, start: date = None, end: date = None, codes=None) -> pd.Series:
+        """
+        Returns the number of days each student was absent between start and end (inclusive;
+        None = unbounded), for the given Employee Codes (all when None). Students without an
+        absence in the range are omitted.
+        """
+        state = self.state
+        if not state.n_days:
+            return pd.Series(dtype='int64')
+        rows = np.arange(len(state.codes)) if codes is None else state.codes.get_indexer(pd.Index(codes))
+        rows = rows[rows >= 0]
+        first, last = self._columns(state, start, end)
+        if last < first or not len(rows):
+            return pd.Series(dtype='int64')
+        counts = pd.Series(count_days(state.absent[rows], first, last), index=state.codes[rows])
+        in_range = state.extra['Day'].between(state.first_day + first, state.first_day + last)
+        if in_range.any():
+            extra = state.extra[in_range].groupby('Employee Code')['Absences'].sum()
+            counts = counts.add(extra.reindex(counts.index, fill_value=0), fill_value=0).astype('int64')
+        return counts[counts > 0]
+
+    def status_matrix(self, start: date = None, end: date = None, codes=None) -> tuple:
+        """
+        Returns (codes, absent, recorded, first_day): the unpacked students x days boolean matrices
+        between start and end (inclusive; None = unbounded) for the given Employee Codes (all when
+        None), and the date ordinal of their first column.
+        """
+        state = self.state
+        rows = np.arange(len(state.codes)) if codes is None else state.codes.get_indexer(pd.Index(codes))
+        rows = rows[rows >= 0]
+        first, last = self._columns(state, start, end) if state.n_days else (0, -1)
+        n_days = max(last - first + 1, 0)
+        if not n_days or not len(rows):
+            empty = np.zeros((len(rows), n_days), dtype=bool)
+            return state.codes[rows], empty, empty.copy(), (state.first_day or 0) + first
+        # Only the bytes spanning the range are unpacked, then trimmed to the exact days
+        byte_first = first // 8
+        absent = unpack_days(state.absent[rows, byte_first:last // 8 + 1], last - byte_first * 8 + 1)
+        recorded = unpack_days(state.recorded[rows, byte_first:last // 8 + 1], last - byte_first * 8 + 1)
+        skip = first - byte_first * 8
+        return state.codes[rows], absent[:, skip:], recorded[:, skip:], state.first_day + first
+
+    def days(self) -> pd.DatetimeIndex:
+        """
+        Returns the dates of the day columns.
+        """
+        state = self.state
+        if not state.n_days:
+            return pd.DatetimeIndex([])
+        return pd.date_range(date.fromordinal(state.first_day), periods=state.n_days, freq='D')
+
+    # --- Persistence ---
+    def _save(self):
+        state = self.state
+        tmp_path = self._path('.npz.tmp')
+        with open(tmp_path, 'wb') as fh:
+            np.savez(fh, absent=state.absent, recorded=state.recorded,
+                     span=np.array([state.first_day or 0, state.n_days], dtype=np.int64))
+        os.replace(tmp_path, self._path('.npz'))
+        self._write_frame('_codes.parquet', pd.DataFrame({'Employee Code': state.codes.to_numpy()}))
+        self._write_frame('_extra.parquet', state.extra)
+        with open(self._path('_files.json') + '.tmp', 'w', encoding='utf-8') as fh:
+            json.dump(state.file_days, fh)
+        os.replace(self._path('_files.json') + '.tmp', self._path('_files.json'))
+
+    def _load(self):
+        with np.load(self._path('.npz')) as arrays:
+            absent, recorded = arrays['absent'], arrays['recorded']
+            first_day, n_days = (int(value) for value in arrays['span'])
+        codes = pd.read_parquet(self._path('_codes.parquet'))['Employee Code']
+        extra = pd.read_parquet(self._path('_extra.parquet'))
+        extra['Employee Code'] = compact_employee_codes(extra['Employee Code'])
+        with open(self._path('_files.json'), 'r', encoding='utf-8') as fh:
+            file_days = json.load(fh)
+        self.state = BitmapState(
+            codes=pd.Index(compact_employee_codes(codes)), first_day=first_day if n_days else None, n_days=n_days,
+            absent=absent, recorded=recorded, extra=extra, file_days=file_days)
@@ -0,0 +1,199 @@
+import logging
+import os
+import threading
+import time
+
+from attendance_store import AttendanceStore
+
+# --- Constants for the Directory Watcher ---
+# Set to 0 to disable the dashboard's background watcher (the directory is then scanned on every rerun)
+WATCH_ENV = 'ATTENDANCE_WATCH'
+# Rescan interval without file system events (watchdog not installed)
+WATCH_POLL_SECONDS = 2.0
+# Safety rescan interval when file system events are delivered
+WATCH_RESCAN_SECONDS = 60.0
+# A changed file is ingested once its size and mtime have not changed for this long (export finished)
+WATCH_SETTLE_SECONDS = 1.0
+
+logger = logging.getLogger(__name__)
+
+
+def watch_enabled() -> bool:
+    return os.environ.get(WATCH_ENV, '1') not in ('', '0')
+
+
+def scan_csv_files(data_dir: str) -> dict:
+    """
+    Returns {file name: (mtime_ns, size)} for the CSV files in data_dir, in one scandir pass.
+    """
+    snapshot = {}
+    with os.scandir(data_dir) as entries:
+        for entry in entries:
+            if not entry.name.endswith('.csv'):
+                continue
+            try:
+                if not entry.is_file():
+                    continue
+                stat_result = entry.stat()
+            except OSError:
+                continue
+            snapshot[entry.name] = (stat_result.st_mtime_ns, stat_result.st_size)
+    return snapshot
+
+
+# --- Background Ingest of New / Changed Daily Files ---
+class DirectoryWatcher:
+    """
+    Keeps an AttendanceStore (and its registered views) current from a background thread, so
+    dashboard reruns read warm data and never list or stat the directory themselves.
+
+    Uses file system events (inotify etc.) through the optional `watchdog` package when it is
+    installed, with a slow safety rescan; otherwise the directory is polled every poll_interval.
+    After every ingest `warm(csv_files, changed)` is called (e.g. to pre-build report caches).
+    """
+
+    def __init__(self, store: AttendanceStore, poll_interval: float = WATCH_POLL_SECONDS,
+                 settle: float = WATCH_SETTLE_SECONDS, warm=None, use_events: bool = True):
+        self.store = store
+        self.poll_interval = poll_interval
+        self.settle = settle
+        self.warm = warm
+        self.use_events = use_events
+        self.snapshot = {}
+        self.refreshes = 0
+        self.last_refresh = None   # time.time() of the last ingest that changed the store
+        self.last_error = None
+        self._files = []
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._observer = None
+
+    def csv_files(self) -> list:
+        """
+        Returns the sorted CSV file names as of the last scan.
+        """
+        return self._files
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> 'DirectoryWatcher':
+        """
+        Ingests the directory once in the calling thread (so the first request is served warm),
+        then keeps watching it in the background.
+        """
+        if self.is_running():
+            return self
+        self._stop.clear()
+        self.check(initial=True)
+        self._observer = self._start_observer() if self.use_events else None
+        self._thread = threading.Thread(target=self._run, name='attendance-watcher', daemon=True)
+        self._thread.start()
+        self.store.watcher = self
+        return self
+
+    def stop(self):
+        if self.store.watcher is self:
+            self.store.watcher = None
+        self._stop.set()
+        self._wake.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _start_observer(self):
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            return None
+
+        wake = self._wake
+
+        class CsvEventHandler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                paths = (getattr(event, 'src_path', ''), getattr(event, 'dest_path', ''))
+                if any(str(path).endswith('.csv') for path in paths):
+                    wake.set()
+
+        try:
+            observer = Observer()
+            observer.schedule(CsvEventHandler(), self.store.data_dir, recursive=False)
+            observer.start()
+        except Exception as e:
+            logger.warning("File system events unavailable for %s (%s); polling instead.", self.store.data_dir, e)
+            return None
+        return observer
+
+    def _run(self):
+        interval = WATCH_RESCAN_SECONDS if self._observer is not None else self.poll_interval
+        while not self._stop.is_set():
+            self._wake.wait(interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.check()
+            except Exception as e:
+                # Keep watching; the next scan retries
+                self.last_error = str(e) or type(e).__name__
+                logger.exception("Attendance directory refresh failed")
+
+    def _settled_snapshot(self, snapshot: dict) -> dict:
+        """
+        Rescans until no file changed during `settle` seconds (an export may still be writing).
+        """
+        while self.settle and not self._stop.is_set():
+            self._stop.wait(self.settle)
+            again = scan_csv_files(self.store.data_dir)
+            if again == snapshot:
+                break
+            snapshot = again
+        return snapshot
+
+    def check(self, initial: bool = False) -> list:
+        """
+        Scans the directory and ingests the files added, modified or removed since the last scan,
+        then warms the caches. Returns the names of the files whose stored rows changed.
+        """
+        snapshot = scan_csv_files(self.store.data_dir)
+        if snapshot == self.snapshot and not initial:
+            return []
+        if not initial:
+            snapshot = self._settled_snapshot(snapshot)
+
+        modified = [name for name, fingerprint in snapshot.items() if self.snapshot.get(name) != fingerprint]
+        removed = set(self.snapshot).difference(snapshot)
+        # A full scan is only needed to drop deleted files from the store
+        changed = self.store.refresh(None if (initial or removed) else modified, force=True)
+        self.snapshot = snapshot
+        self._files = sorted(snapshot)
+        if changed:
+            self.refreshes += 1
+            self.last_refresh = time.time()
+        if self.warm is not None and (changed or initial):
+            self.warm(self._files, changed)
+        self.last_error = None
+        return changed
+
+
+# --- Watcher Registry (one watcher per store per process) ---
+_WATCHERS = {}
+_WATCHERS_LOCK = threading.Lock()
+
+
+def watch_directory(store: AttendanceStore, warm=None, **kwargs) -> DirectoryWatcher:
+    """
+    Returns the running process-wide DirectoryWatcher for a store, starting it on first use.
+    """
+    with _WATCHERS_LOCK:
+        watcher = _WATCHERS.get(id(store))
+        if watcher is None or not watcher.is_running():
+            watcher = DirectoryWatcher(store, warm=warm, **kwargs).start()
+            _WATCHERS[id(store)] = watcher
+        return watcher
@@ -0,0 +1,145 @@
+"""
+Benchmark: import time of the entry modules (python -X importtime), checked against a budget.
+
+Usage (from the repository root):
+    python benchmarks/bench_imports.py --repeat 5 --output imports.json
+    python benchmarks/bench_imports.py --compare imports.json
+
+Every module is imported --repeat times in a fresh interpreter and the fastest run is reported,
+together with the heavy packages it pulled in. The exit status is 1 when a module exceeds its
+budget (scaled by --budget-scale on slower machines) or imports a package it must not load.
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Third-party packages whose import cost is reported separately
+HEAVY_PACKAGES = ('pandas', 'numpy', 'pyarrow', 'streamlit', 'matplotlib', 'xlsxwriter', 'watchdog')
+
+# module -> (budget in ms, packages it must not import)
+IMPORT_BUDGETS = {
+    # Imported by every other module, so it stays dependency free
+    'attendance_perf': (30, HEAVY_PACKAGES),
+    # --help and argument errors must not wait for pandas
+    'attendance_batch': (60, HEAVY_PACKAGES),
+    # http.server (and the email package it uses) costs a few tens of ms on its own
+    'attendance_api': (120, HEAVY_PACKAGES),
+    # Only _students_per_room uses pyarrow directly (imported there); pandas imports it anyway when installed
+    'attendance_reports': (700, ('streamlit', 'matplotlib', 'xlsxwriter')),
+    'attendance_watch': (700, ('streamlit', 'matplotlib', 'xlsxwriter')),
+    'attendance_shards': (700, ('streamlit', 'matplotlib', 'xlsxwriter')),
+    # Charts and workbooks import matplotlib / xlsxwriter when they are built
+    'reduction': (1000, ('matplotlib', 'xlsxwriter')),
+}
+
+_IMPORTTIME_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)')
+
+
+def import_profile(module: str) -> dict:
+    """
+    Imports `module` in a fresh interpreter with -X importtime.
+    Returns the total ms, the cumulative ms of each heavy package it loaded and all module names.
+    """
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                               capture_output=True, text=True, cwd=REPO_ROOT)
+    if completed.returncode != 0:
+        raise RuntimeError(f'importing {module} failed:\n{completed.stderr.strip()}')
+
+    total_us, packages, modules = None, {}, set()
+    for line in completed.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match is None:
+            continue
+        cumulative_us, name = int(match.group(2)), match.group(4)
+        modules.add(name)
+        if name in HEAVY_PACKAGES:
+            packages[name] = max(packages.get(name, 0), cumulative_us / 1000)
+        if name == module and not match.group(3):
+            total_us = cumulative_us
+    return {'ms': total_us / 1000, 'packages': packages, 'modules': modules}
+
+
+def bench_module(module: str, repeat: int, budget_scale: float) -> dict:
+    runs = [import_profile(module) for _ in range(repeat)]
+    fastest = min(runs, key=lambda run: run['ms'])
+    budget_ms, forbidden = IMPORT_BUDGETS[module]
+    unexpected = sorted(package for package in forbidden if package in fastest['modules'])
+    return {
+        'module': module,
+        'ms': round(fastest['ms'], 1),
+        'budget_ms': budget_ms * budget_scale,
+        'packages_ms': {name: round(ms, 1) for name, ms in sorted(fastest['packages'].items())},
+        'unexpected_imports': unexpected,
+        'within_budget': fastest['ms'] <= budget_ms * budget_scale and not unexpected,
+    }
+
+
+def environment() -> dict:
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                  cwd=REPO_ROOT).stdout.strip() or None
+    except OSError:
+        revision = None
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'git_revision': revision,
+        'python': platform.python_version(),
+        # Without cached bytecode every run also compiles the repository's modules
+        'bytecode_cache': not sys.flags.dont_write_bytecode,
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def report(results: dict, baseline: dict = None):
+    """
+    Prints every module's import time against its budget (and against a baseline run, if given).
+    """
+    previous = {r['module']: r for r in baseline['results']} if baseline else {}
+    for result in results['results']:
+        before = previous.get(result['module'], {}).get('ms')
+        ratio = f'{result["ms"] / before:6.2f}x' if before else '     -'
+        status = 'ok' if result['within_budget'] else 'OVER BUDGET'
+        if result['unexpected_imports']:
+            status += ' (imports ' + ', '.join(result['unexpected_imports']) + ')'
+        print(f'  {result["module"]:20s} {result["ms"]:8.1f} ms  budget {result["budget_ms"]:7.1f} ms  '
+              f'{ratio}  {status}', file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--modules', default=','.join(IMPORT_BUDGETS),
+                        help=f'Comma-separated modules to import (default: {",".join(IMPORT_BUDGETS)})')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--budget-scale', type=float, default=1.0, help='Multiply every budget (slower machines)')
+    parser.add_argument('--output', help='Write the JSON results to this file instead of stdout')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare against')
+    args = parser.parse_args()
+
+    results = {
+        'environment': environment(),
+        'results': [bench_module(module, args.repeat, args.budget_scale) for module in args.modules.split(',')],
+    }
+
+    text = json.dumps(results, indent=1)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fh:
+            fh.write(text + '\n')
+    else:
+        print(text)
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as fh:
+            baseline = json.load(fh)
+    report(results, baseline)
+    return 0 if all(r['within_budget'] for r in results['results']) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
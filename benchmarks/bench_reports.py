@@ -0,0 +1,193 @@
+"""
+Benchmark: the dashboard's report functions on synthetic archives of several sizes, emitted as JSON.
+
+Usage (from the repository root):
+    python benchmarks/bench_reports.py --scales 100x30,5000x365,50000x1000 --output results.json
+    python benchmarks/bench_reports.py --compare results.json
+
+Each scale is <students>x<days>. Archives are generated with benchmarks/synthetic_archive.py
+into --archive-dir (reused when already there) or a temporary directory. Every stage is run
+--repeat times on a fresh store and the fastest run is reported.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+os.environ.setdefault('MPLBACKEND', 'Agg')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+import attendance_reports  # noqa: E402
+import attendance_store  # noqa: E402
+import reduction  # noqa: E402
+from attendance_config import FLOOR_ORDER  # noqa: E402
+from attendance_io import read_attendance_csv  # noqa: E402
+from synthetic_archive import generate_archive  # noqa: E402
+
+DEFAULT_SCALES = '100x30,5000x30,5000x365'
+
+
+def parse_scales(text: str) -> list:
+    """
+    Parses '100x30,5000x365' into [(100, 30), (5000, 365)].
+    """
+    scales = []
+    for part in text.split(','):
+        students, days = part.lower().split('x')
+        scales.append((int(students), int(days)))
+    return scales
+
+
+def timed(fn, *args, **kwargs) -> tuple:
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def reset_caches(data_dir: str):
+    """
+    Forgets everything cached between runs: the date caches, the in-process store and its files.
+    """
+    attendance_reports.parse_file_date.cache_clear()
+    attendance_reports.build_file_date_index.cache_clear()
+    attendance_store._STORES.pop(os.path.abspath(data_dir), None)
+    shutil.rmtree(os.path.join(data_dir, attendance_store.STORE_DIR_NAME), ignore_errors=True)
+
+
+def run_stages(data_dir: str, csv_files: list) -> dict:
+    """
+    Runs every benchmarked stage once on a fresh store; returns {stage: seconds} plus row counts.
+    """
+    reset_caches(data_dir)
+    timings = {}
+    timings['group_files_by_month'], months = timed(attendance_reports.group_files_by_month, csv_files)
+
+    store = attendance_reports.get_attendance_store(data_dir)
+    timings['store_refresh_cold'], _ = timed(store.refresh)
+    timings['store_refresh_noop'], _ = timed(store.refresh)
+
+    latest_day = csv_files[-1]
+    timings['analyze_attendance'], daily_results = timed(
+        lambda: attendance_reports.analyze_attendance(read_attendance_csv(os.path.join(data_dir, latest_day))))
+
+    month_key, month_files = next(iter(months.items()))
+    timings['create_monthly_graph'], fig = timed(reduction.create_monthly_graph, month_key, month_files, store)
+    if fig is not None:
+        fig.clf()
+
+    timings['collect_unique_location_details'], _ = timed(
+        attendance_reports.collect_unique_location_details, csv_files, store)
+    timings['calculate_reduction_days'], report = timed(
+        attendance_reports.calculate_reduction_days, csv_files, FLOOR_ORDER, None, None, None, store)
+    timings['recompute_reduction_days'], recomputed = timed(
+        attendance_reports.recompute_reduction_days, csv_files, store)
+    timings['generate_excel_file_daily'], _ = timed(attendance_reports.generate_excel_file, daily_results)
+    timings['generate_excel_file_reduction'], _ = timed(
+        attendance_reports.generate_excel_file, {'Reduction Days': report})
+
+    # The incremental tally must agree with the full recompute
+    expected = attendance_reports.sort_by_room_details(
+        recomputed[['Student Name', 'Block', 'Floor', 'Room No.', 'Reduction Days']], FLOOR_ORDER)
+    matches = report.astype(str).reset_index(drop=True).equals(expected.astype(str).reset_index(drop=True))
+    return {'timings': timings, 'report_rows': len(report), 'tally_matches_recompute': matches}
+
+
+def bench_scale(n_students: int, n_days: int, archive_root: str, repeat: int, seed: int) -> dict:
+    data_dir = os.path.join(archive_root, f'{n_students}x{n_days}-seed{seed}')
+    generate_s = None
+    if not os.path.isdir(data_dir):
+        generate_s, _ = timed(generate_archive, data_dir, n_students, n_days, seed=seed)
+    csv_files = sorted((f for f in os.listdir(data_dir) if f.endswith('.csv')), key=attendance_reports.parse_file_date)
+
+    runs = [run_stages(data_dir, csv_files) for _ in range(repeat)]
+    reset_caches(data_dir)
+    return {
+        'students': n_students,
+        'days': n_days,
+        'rows': n_students * n_days,
+        'csv_bytes': sum(os.path.getsize(os.path.join(data_dir, f)) for f in csv_files),
+        'generate_seconds': generate_s,
+        'report_rows': runs[0]['report_rows'],
+        'tally_matches_recompute': all(run['tally_matches_recompute'] for run in runs),
+        'seconds': {stage: min(run['timings'][stage] for run in runs) for stage in runs[0]['timings']},
+    }
+
+
+def environment() -> dict:
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                  cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        revision = None
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'git_revision': revision,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def compare(results: dict, baseline: dict):
+    """
+    Prints the per-stage time ratio (current / baseline) for the scales both runs have.
+    """
+    previous = {(r['students'], r['days']): r for r in baseline['results']}
+    for result in results['results']:
+        base = previous.get((result['students'], result['days']))
+        if base is None:
+            continue
+        print(f"{result['students']} students x {result['days']} days "
+              f"(vs {baseline['environment'].get('git_revision')}):", file=sys.stderr)
+        for stage, seconds in result['seconds'].items():
+            before = base['seconds'].get(stage)
+            ratio = f'{seconds / before:6.2f}x' if before else '     -'
+            print(f'  {stage:32s} {seconds:9.3f}s  {ratio}', file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scales', default=DEFAULT_SCALES, help=f'<students>x<days>,... (default: {DEFAULT_SCALES})')
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--archive-dir', help='Where to keep the generated archives (default: a temporary directory)')
+    parser.add_argument('--output', help='Write the JSON results to this file instead of stdout')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare against')
+    args = parser.parse_args()
+
+    archive_root = args.archive_dir or tempfile.mkdtemp(prefix='attendance-bench-')
+    try:
+        results = {
+            'environment': environment(),
+            'results': [bench_scale(n_students, n_days, archive_root, args.repeat, args.seed)
+                        for n_students, n_days in parse_scales(args.scales)],
+        }
+    finally:
+        if not args.archive_dir:
+            shutil.rmtree(archive_root, ignore_errors=True)
+
+    text = json.dumps(results, indent=1)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fh:
+            fh.write(text + '\n')
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as fh:
+            compare(results, json.load(fh))
+    return 0 if all(r['tally_matches_recompute'] for r in results['results']) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""
+Benchmark: iterrows-based student_details builder vs. the vectorized latest_student_details.
+
+Usage (from the repository root):
+    python benchmarks/bench_student_details.py --students 5000 --days 365
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from attendance_views import REDUCTION_REQUIRED_COLS, latest_student_details  # noqa: E402
+
+
+def make_frames(n_students: int, n_days: int, move_rate: float = 0.01, seed: int = 0) -> dict:
+    """
+    Builds {file name: DataFrame} for n_days synthetic days in chronological order.
+    A small fraction of students change room each day so "last seen location wins" is exercised.
+    """
+    rng = np.random.default_rng(seed)
+    codes = pd.array((np.arange(n_students) + 100).astype(str), dtype='string')
+    names = pd.array([f'STUDENT{i}' for i in range(n_students)], dtype='string')
+    rooms = rng.integers(100, 900, n_students)
+    frames = {}
+    for day in range(n_days):
+        movers = rng.random(n_students) < move_rate
+        rooms = np.where(movers, rng.integers(100, 900, n_students), rooms)
+        room_str = rooms.astype(str)
+        frames[f'day-{day:04d}.csv'] = pd.DataFrame({
+            'Employee Code': codes,
+            'Student Name': names,
+            'Block': pd.array(np.char.add('H', (rooms % 4).astype(str)), dtype='string'),
+            'Floor': pd.array(np.char.add('F', (rooms // 100).astype(str)), dtype='string'),
+            'Room No.': pd.array(room_str, dtype='string'),
+            'Status': pd.array(np.where(rng.random(n_students) < 0.1, 'Not Present', 'Present'), dtype='string'),
+        })
+    return frames
+
+
+def legacy_student_details(frames: dict) -> pd.DataFrame:
+    """
+    The original per-row builder from calculate_reduction_days, kept here as the reference.
+    """
+    student_details = {}
+    for df in frames.values():
+        for _, row in df[REDUCTION_REQUIRED_COLS].drop_duplicates().iterrows():
+            student_details[row['Employee Code']] = {
+                'Student Name': row['Student Name'],
+                'Block': row['Block'],
+                'Floor': row['Floor'],
+                'Room No.': str(row['Room No.'])
+            }
+    return pd.DataFrame.from_dict(student_details, orient='index')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--students', type=int, default=5000)
+    parser.add_argument('--days', type=int, default=365)
+    args = parser.parse_args()
+
+    frames = make_frames(args.students, args.days)
+    print(f'{args.students} students x {args.days} days = {args.students * args.days:,} rows')
+
+    start = time.perf_counter()
+    vectorized = latest_student_details(frames).drop(columns='Source File')
+    vectorized_s = time.perf_counter() - start
+    print(f'vectorized: {vectorized_s:.3f}s')
+
+    start = time.perf_counter()
+    legacy = legacy_student_details(frames)
+    legacy_s = time.perf_counter() - start
+    print(f'iterrows:   {legacy_s:.3f}s')
+
+    same = vectorized.sort_index().astype(str).equals(legacy.sort_index().astype(str))
+    print(f'identical results: {same}')
+    print(f'speedup: {legacy_s / vectorized_s:.1f}x')
+    return 0 if same else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""
+Generator for synthetic attendance archives: one DD-Mon-YYYY.csv per day in the same schema as the
+real biometric exports (Employee Code, Student Name, Block, Floor, Room No., Last Punch,
+Punch Records, Status).
+
+Usage (from the repository root):
+    python benchmarks/synthetic_archive.py /tmp/archive --students 5000 --days 365
+"""
+import argparse
+import os
+import sys
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from attendance_config import FLOOR_ORDER  # noqa: E402
+
+CSV_COLUMNS = ['Employee Code', 'Student Name', 'Block', 'Floor', 'Room No.', 'Last Punch', 'Punch Records', 'Status']
+# Present students punch 1..MAX_PUNCHES times between these times (seconds since midnight)
+MAX_PUNCHES = 3
+FIRST_PUNCH_SECONDS = 18 * 3600
+LAST_PUNCH_SECONDS = 22 * 3600 + 30 * 60
+# 'HH:MM:SS' text of every second of the day, indexed by seconds since midnight
+_CLOCK = pd.to_datetime(np.arange(86400), unit='s').strftime('%H:%M:%S').to_numpy(dtype='U8')
+
+
+def archive_file_name(day: date) -> str:
+    """
+    Returns the daily file name for a date, e.g. '07-Jul-2025.csv'.
+    """
+    return day.strftime('%d-%b-%Y') + '.csv'
+
+
+def make_roster(n_students: int, n_blocks: int = 4, n_floors: int = 5, rooms_per_floor: int = 20,
+                rng: np.random.Generator = None) -> pd.DataFrame:
+    """
+    Returns the students with a random room each: Block 'HA', 'HB', ..., Floor from FLOOR_ORDER
+    (or 'Floor<N>' beyond it) and Room No. <floor number><room> (e.g. 305).
+    """
+    rng = rng or np.random.default_rng(0)
+    blocks = np.array([f'H{chr(ord("A") + i)}' if i < 26 else f'H{i}' for i in range(n_blocks)])
+    floors = np.array([FLOOR_ORDER[i] if i < len(FLOOR_ORDER) else f'Floor{i + 1}' for i in range(n_floors)])
+    roster = pd.DataFrame({
+        'Employee Code': np.arange(n_students) + 100,
+        'Student Name': np.char.add('STUDENT', np.arange(n_students).astype(str)),
+        'Block Index': rng.integers(0, n_blocks, n_students),
+        'Floor Index': rng.integers(0, n_floors, n_students),
+        'Room Index': rng.integers(1, rooms_per_floor + 1, n_students),
+    })
+    roster.attrs.update(blocks=blocks, floors=floors, rooms_per_floor=rooms_per_floor)
+    return roster
+
+
+def move_students(roster: pd.DataFrame, move_rate: float, rng: np.random.Generator) -> pd.DataFrame:
+    """
+    Returns the roster with a fraction of the students moved to a random other room.
+    """
+    movers = rng.random(len(roster)) < move_rate
+    if not movers.any():
+        return roster
+    roster = roster.copy()
+    n_movers = int(movers.sum())
+    roster.loc[movers, 'Block Index'] = rng.integers(0, len(roster.attrs['blocks']), n_movers)
+    roster.loc[movers, 'Floor Index'] = rng.integers(0, len(roster.attrs['floors']), n_movers)
+    roster.loc[movers, 'Room Index'] = rng.integers(1, roster.attrs['rooms_per_floor'] + 1, n_movers)
+    return roster
+
+
+def make_day(roster: pd.DataFrame, absence_rate: float, rng: np.random.Generator) -> pd.DataFrame:
+    """
+    Returns one day's export for the roster: absent students have no punches, present students
+    1..MAX_PUNCHES punches listed latest first with a trailing comma, as in the real files.
+    """
+    n_students = len(roster)
+    absent = rng.random(n_students) < absence_rate
+    n_punches = np.where(absent, 0, rng.integers(1, MAX_PUNCHES + 1, n_students))
+    punches = np.sort(rng.integers(FIRST_PUNCH_SECONDS, LAST_PUNCH_SECONDS, (n_students, MAX_PUNCHES)), axis=1)[:, ::-1]
+
+    punch_text = np.full(n_students, '', dtype=object)
+    for slot in range(MAX_PUNCHES):
+        has_slot = n_punches > slot
+        punch_text[has_slot] = punch_text[has_slot] + np.char.add(_CLOCK[punches[has_slot, slot]], ',').astype(object)
+
+    floors = roster['Floor Index'].to_numpy()
+    return pd.DataFrame({
+        'Employee Code': roster['Employee Code'].to_numpy(),
+        'Student Name': roster['Student Name'].to_numpy(),
+        'Block': roster.attrs['blocks'][roster['Block Index'].to_numpy()],
+        'Floor': roster.attrs['floors'][floors],
+        'Room No.': (floors + 1) * 100 + roster['Room Index'].to_numpy(),
+        'Last Punch': np.where(absent, '', _CLOCK[punches[:, 0]]),
+        'Punch Records': punch_text,
+        'Status': np.where(absent, 'Not Present', 'Present'),
+    }, columns=CSV_COLUMNS)
+
+
+def generate_archive(out_dir: str, n_students: int, n_days: int, n_blocks: int = 4, n_floors: int = 5,
+                     absence_rate: float = 0.1, move_rate: float = 0.001, start: date = date(2024, 1, 1),
+                     seed: int = 0) -> list:
+    """
+    Writes n_days consecutive daily CSVs starting at `start` into out_dir and returns their file names.
+    The same arguments always produce the same files.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    roster = make_roster(n_students, n_blocks, n_floors, rng=rng)
+    file_names = []
+    for offset in range(n_days):
+        roster = move_students(roster, move_rate, rng)
+        file_name = archive_file_name(start + timedelta(days=offset))
+        make_day(roster, absence_rate, rng).to_csv(os.path.join(out_dir, file_name), index=False)
+        file_names.append(file_name)
+    return file_names
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('out_dir')
+    parser.add_argument('--students', type=int, default=5000)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--blocks', type=int, default=4)
+    parser.add_argument('--floors', type=int, default=5)
+    parser.add_argument('--absence-rate', type=float, default=0.1)
+    parser.add_argument('--move-rate', type=float, default=0.001)
+    parser.add_argument('--start', type=date.fromisoformat, default=date(2024, 1, 1), help='First date (YYYY-MM-DD)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    file_names = generate_archive(args.out_dir, args.students, args.days, args.blocks, args.floors,
+                                  args.absence_rate, args.move_rate, args.start, args.seed)
+    print(f'wrote {len(file_names)} files ({args.students} students each) to {args.out_dir}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,207 +1,53 @@
-import pandas as pd
-import xlsxwriter
-from datetime import datetime
-import os
-import matplotlib.pyplot as plt
-import numpy as np
-import streamlit as st
 import io
-
-# --- Constants for Configuration ---
-LATE_PUNCH_TIME_STR = '20:45:00'
-FLOOR_ORDER = [
-    'FirstFloor', 'SecondFloor', 'ThirdFloor', 'FourthFloor',
-    'FifthFloor', 'SixthFloor', 'SeventhFloor', 'EighthFloor'
-]
-# Added multiple formats to handle various file name date styles
-DATE_FORMATS = ['%d-%B-%Y', '%d-%b-%Y', '%d-%B%Y', '%d-%b%Y'] 
-
-# --- Helper Function for Sorting ---
-def sort_by_room_details(data_df: pd.DataFrame, floor_order: list) -> pd.DataFrame:
-    """
-    Helper function to sort DataFrame by Block, Floor (custom order), and Room No.
-    """
-    if not data_df.empty and all(col in data_df.columns for col in ['Block', 'Floor', 'Room No.']):
-        data_df['Floor'] = pd.Categorical(data_df['Floor'], categories=floor_order, ordered=True)
-        # Ensure Room No is string for consistent sorting if needed, though pandas handles mixed types well usually
-        data_df.sort_values(by=['Block', 'Floor', 'Room No.'], inplace=True)
-    return data_df
-
-# --- Helper Function for Grouping Files by Month (Used for Monthly Graph) ---
-def group_files_by_month(csv_files: list) -> dict:
-    """
-    Groups a list of CSV file names into a dictionary where the key is 'Month-Year' (e.g., 'Jul-2025')
-    and the value is a list of file names belonging to that month, sorted by date.
-    """
-    monthly_groups = {}
-    
-    for file_name in csv_files:
-        date_part = file_name.replace('.csv', '')
-        date_obj = None
-        
-        # Try multiple formats
-        for fmt in DATE_FORMATS:
-            try:
-                date_obj = datetime.strptime(date_part, fmt)
-                break
-            except ValueError:
-                continue
-        
-        if date_obj:
-            month_year_key = date_obj.strftime('%b-%Y')
-            
-            if month_year_key not in monthly_groups:
-                monthly_groups[month_year_key] = []
-            monthly_groups[month_year_key].append(file_name)
-    
-    # Sort files within each month by date
-    final_monthly_groups = {}
-    for month, files in monthly_groups.items():
-        sortable_list = []
-        for file_name in files:
-            date_part = file_name.replace('.csv', '')
-            date_obj_sort = None
-            
-            for fmt in DATE_FORMATS:
-                try:
-                    date_obj_sort = datetime.strptime(date_part, fmt)
-                    break
-                except ValueError:
-                    continue
-            
-            if date_obj_sort:
-                sortable_list.append((date_obj_sort, file_name))
-        
-        sortable_list.sort(key=lambda x: x[0])
-        final_monthly_groups[month] = [file[1] for file in sortable_list]
-        
-    return final_monthly_groups
-
-# --- Core Function for Daily Analysis (Restored) ---
-def analyze_attendance(df: pd.DataFrame) -> dict:
-    """
-    Performs a detailed analysis of the attendance DataFrame for a single day.
-    """
-    required_cols = {'Status', 'Student Name', 'Room No.'}
-    if not required_cols.issubset(df.columns):
-        st.error("Missing required columns for daily analysis: 'Status', 'Student Name', 'Room No.'.")
-        return {} 
-
-    output_dfs = {}
-    status_counts = df['Status'].value_counts()
-    daily_summary_data = {
-        'Metric': ['Total Students', 'Present', 'Absent'],
-        'Count': [len(df), status_counts.get('Present', 0), status_counts.get('Not Present', 0)]
-    }
-    output_dfs['Daily Summary'] = pd.DataFrame(daily_summary_data)
-
-    late_punch_time = datetime.strptime(LATE_PUNCH_TIME_STR, '%H:%M:%S').time()
-    
-    if 'Last Punch' in df.columns:
-        present_students = df[df['Status'] == 'Present'].copy()
-        
-        present_students['Punch Time'] = pd.to_datetime(
-            present_students['Last Punch'],
-            format='%H:%M:%S',
-            errors='coerce'
-        ).dt.time
-        
-        late_punches_df = present_students[present_students['Punch Time'].astype(str) > str(late_punch_time)].copy()
-        
-        output_dfs['Late Biometric Punches'] = late_punches_df[['Student Name', 'Room No.', 'Last Punch']]
-    else:
-        output_dfs['Late Biometric Punches'] = pd.DataFrame(columns=['Student Name', 'Room No.', 'Last Punch'])
-
-    absent_students_df = df[df['Status'] == 'Not Present'].copy()
-    output_dfs['Students to Notify'] = absent_students_df[['Student Name', 'Room No.']].sort_values(by='Student Name')
-
-    if {'Block', 'Floor', 'Room No.'}.issubset(df.columns):
-        
-        present_per_room_df = df[df['Status'] == 'Present'].groupby(
-            ['Block', 'Floor', 'Room No.']
-        ).agg(
-            Present_Count=('Status', 'size'),
-            Present_Names=('Student Name', lambda x: ', '.join(sorted(x)))
-        ).reset_index()
-        output_dfs['Present Students per Room'] = sort_by_room_details(present_per_room_df, FLOOR_ORDER)
-
-        absent_per_room_df = df[df['Status'] == 'Not Present'].groupby(
-            ['Block', 'Floor', 'Room No.']
-        ).agg(
-            Absent_Count=('Status', 'size'),
-            Absent_Names=('Student Name', lambda x: ', '.join(sorted(x)))
-        ).reset_index()
-        output_dfs['Absent Students per Room'] = sort_by_room_details(absent_per_room_df, FLOOR_ORDER)
-
-    return output_dfs
-
-# --- Helper Function for Excel Export ---
-def generate_excel_file(output_dfs: dict) -> io.BytesIO:
-    """
-    Exports all analysis DataFrames to a single Excel file in-memory.
-    """
-    output = io.BytesIO()
-    try:
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            for sheet_name, df in output_dfs.items():
-                if not df.empty:
-                    df.to_excel(writer, sheet_name=sheet_name, index=False)
-                else:
-                    df_empty = pd.DataFrame([['No data to display.']], columns=['Info'])
-                    df_empty.to_excel(writer, sheet_name=sheet_name, index=False)
-        output.seek(0)
-        return output
-    except ImportError:
-        st.error("Please ensure the 'xlsxwriter' library is installed for Excel export.")
-        return None
+import streamlit as st
+import attendance_perf
+from attendance_perf import profiled
+# The report logic lives in attendance_reports.py (no Streamlit / matplotlib) so the batch CLI can reuse it;
+# matplotlib and xlsxwriter are only imported when a chart or workbook is actually built
+from attendance_reports import (
+    CHRONIC_STREAK_DAYS, CHRONIC_WEEKDAY_MIN_ABSENCES, CHRONIC_WEEKDAY_RATE, LARGE_EXPORT_ROWS, AttendanceStore,
+    active_filter, cached_daily_analysis, cached_daily_excel, calculate_absence_streaks, compare_attendance_days,
+    generate_csv_file, generate_excel_file, generate_parquet_file, get_daily_cache, monthly_attendance_counts
+)
+from attendance_shards import ALL_HOSTELS, get_shard_set
+from attendance_watch import watch_enabled
+
+# --- Constants for Configuration (defined in attendance_config.py) ---
+from attendance_config import FLOOR_ORDER, LATE_PUNCH_TIME_STR
+
+# Report types that can merge several hostels (the others cover one hostel at a time)
+MERGED_REPORT_TYPES = ('Monthly Attendance Graph', 'Reduction Days Report')
 
 # --- Core Function for Monthly Graph ---
-def create_monthly_graph(month_key: str, csv_files_in_month: list):
+# Rendered monthly graphs kept per month / content / filters (PNG bytes; the figures are released)
+MONTHLY_GRAPH_CACHE_ENTRIES = 24
+MONTHLY_GRAPH_COLORS = {'Present': '#4CAF50', 'Not Present': '#F44336'}
+
+@profiled()
+def create_monthly_graph(month_key: str, csv_files_in_month: list, store: AttendanceStore = None,
+                         selected_blocks: list = None, selected_floors: list = None, attendance_df=None):
     """
-    Analyzes CSV files for a SINGLE month to create an attendance graph.
+    Creates the attendance graph for a SINGLE month from the store's daily rollup table
+    (no raw rows are read), optionally restricted to the selected Block(s) and Floor(s).
+    attendance_df can pass counts computed elsewhere (e.g. merged over several hostels).
+    The figure is not registered with pyplot, so it is freed once no longer referenced;
+    matplotlib is only imported here.
     """
     try:
-        attendance_data = []
-
-        for file_name in csv_files_in_month:
-            df = pd.read_csv(file_name)
-            if 'Status' in df.columns:
-                status_counts = df['Status'].value_counts().to_dict()
-                
-                day_label = file_name.replace('.csv', '')
-                date_part = file_name.replace('.csv', '')
-                
-                # Get the day part for the x-axis label
-                date_obj = None
-                for fmt in DATE_FORMATS:
-                    try:
-                        date_obj = datetime.strptime(date_part, fmt)
-                        day_label = date_obj.strftime('%d')
-                        break
-                    except ValueError:
-                        continue
-                
-                if date_obj is None:
-                    st.warning(f"Could not parse date from filename: {file_name}. Skipping.")
-                    continue
-
-                attendance_data.append({
-                    'Day': day_label,
-                    'Present': status_counts.get('Present', 0),
-                    'Not Present': status_counts.get('Not Present', 0),
-                    'Date_Sort': date_obj # Use this for internal sorting
-                })
-
-        attendance_df = pd.DataFrame(attendance_data).sort_values(by='Date_Sort').reset_index(drop=True)
+        if attendance_df is None:
+            attendance_df = monthly_attendance_counts(csv_files_in_month, store, selected_blocks, selected_floors)
 
         if not attendance_df.empty:
-            
-            fig, ax = plt.subplots(figsize=(12, 7))
+            import numpy as np
+            from matplotlib.figure import Figure
+
+            fig = Figure(figsize=(12, 7))
+            ax = fig.subplots()
             bar_width = 0.35
             x = np.arange(len(attendance_df['Day']))
             
             # Colors for better visibility
-            colors = {'Present': '#4CAF50', 'Not Present': '#F44336'}
+            colors = MONTHLY_GRAPH_COLORS
             
             ax.bar(x - bar_width/2, attendance_df['Present'], bar_width, label='Present', color=colors['Present'])
             ax.bar(x + bar_width/2, attendance_df['Not Present'], bar_width, label='Not Present', color=colors['Not Present'])
@@ -214,7 +60,7 @@ def create_monthly_graph(month_key: str, csv_files_in_month: list):
             ax.set_xticklabels(attendance_df['Day'], rotation=0)
             ax.legend()
             ax.grid(axis='y', linestyle='--', alpha=0.6)
-            plt.tight_layout()
+            fig.tight_layout()
             
             return fig
         else:
@@ -223,167 +69,75 @@ def create_monthly_graph(month_key: str, csv_files_in_month: list):
         st.error(f"An error occurred while creating the graph: {e}")
         return None
 
-# --- NEW: Function to collect all unique location details across all files ---
-@st.cache_data
-def collect_unique_location_details(csv_files: list) -> tuple:
+
+@st.cache_data(max_entries=MONTHLY_GRAPH_CACHE_ENTRIES, show_spinner=False)
+def monthly_graph_png(month_key: str, hostel: str, content_key: str,
+                      selected_blocks: tuple = None, selected_floors: tuple = None):
     """
-    Scans all CSV files to get unique Block, Floor, and Room No.
+    Returns the monthly graph as PNG bytes (None when there is no data), cached per month, hostel
+    (None or ALL_HOSTELS: merged over all of them), filter selection and content_key (digest of the
+    month's files, so a changed day re-renders it).
+    The figure is rasterized once and explicitly cleared afterwards.
     """
-    unique_blocks = set()
-    unique_floors = set()
-    unique_rooms = set()
-    
-    required_cols = {'Block', 'Floor', 'Room No.'}
-    
-    for file_name in csv_files:
-        try:
-            df = pd.read_csv(file_name)
-            if all(col in df.columns for col in required_cols):
-                unique_blocks.update(df['Block'].dropna().unique())
-                unique_floors.update(df['Floor'].dropna().unique())
-                
-                # Convert Room No. to string before collecting to handle mixed types consistently
-                room_nos = df['Room No.'].dropna().astype(str).unique()
-                unique_rooms.update(room_nos)
-        except Exception:
-            continue
-            
-    # Sort floors according to the defined FLOOR_ORDER
-    sorted_floors = [f for f in FLOOR_ORDER if f in unique_floors]
-    for f in sorted(list(unique_floors)): # Add any non-standard floors alphabetically
-        if f not in sorted_floors:
-            sorted_floors.append(f)
-            
-    # Sort blocks and rooms alphabetically
-    sorted_blocks = sorted(list(unique_blocks))
-    sorted_rooms = sorted(list(unique_rooms)) # Keeps them as strings for filtering
-
-    return sorted_blocks, sorted_floors, sorted_rooms
+    attendance_df = get_shard_set().select(hostel).monthly_counts(
+        month_key, list(selected_blocks or []), list(selected_floors or []))
+    fig = create_monthly_graph(month_key, None, attendance_df=attendance_df)
+    if fig is None:
+        return None
+    buffer = io.BytesIO()
+    with attendance_perf.stage('render_monthly_graph'):
+        fig.savefig(buffer, format='png', dpi=200, bbox_inches='tight')
+    fig.clf()
+    return buffer.getvalue()
 
 
-# --- Core Function for Reduction Days Report (formerly Cumulative Absence) ---
-def calculate_reduction_days(csv_files: list, floor_order: list, 
-                                 selected_blocks: list, selected_floors: list, 
-                                 selected_rooms: list) -> pd.DataFrame:
+# --- Sidebar Performance Panel ---
+def render_performance_panel(panel, stores: list = None):
     """
-    Analyzes multiple CSV files to calculate the total number of days a student was absent (Reduction Days) 
-    and applies location filters.
+    Fills the sidebar "Performance" expander with the stages recorded during this rerun
+    (wall time, rows, bytes), the daily cache counters of the given stores (summed) and a
+    download of the stages as a Chrome trace file.
     """
-    all_absences = []
-    student_details = {}  
-
-    for file_name in csv_files:
-        try:
-            df = pd.read_csv(file_name)
-        except Exception:
-            continue
-
-        required_cols = ['Employee Code', 'Status', 'Student Name', 'Block', 'Floor', 'Room No.']
-        if all(col in df.columns for col in required_cols):
-            
-            # Collect student details (including Block/Floor/Room for filtering later)
-            for _, row in df[required_cols].drop_duplicates().iterrows():
-                student_details[row['Employee Code']] = {
-                    'Student Name': row['Student Name'],
-                    'Block': row['Block'],
-                    'Floor': row['Floor'],
-                    'Room No.': str(row['Room No.']) # Ensure Room No. is string for consistent merge/filter
-                }
-
-            absent_df = df[df['Status'] == 'Not Present'].copy()
-            if not absent_df.empty:
-                absent_df['Absence_Count'] = 1
-                all_absences.append(absent_df[['Employee Code', 'Absence_Count']])
-
-    if not all_absences:
-        # Renamed column header
-        return pd.DataFrame(columns=['Student Name', 'Block', 'Floor', 'Room No.', 'Reduction Days'])
-
-    cumulative_absence_df = pd.concat(all_absences)
-    total_absences = cumulative_absence_df.groupby('Employee Code')['Absence_Count'].sum().reset_index()
-    
-    # --- RENAME: Column header changed to "Reduction Days" ---
-    total_absences.rename(columns={'Absence_Count': 'Reduction Days'}, inplace=True)
-
-    details_df = pd.DataFrame.from_dict(student_details, orient='index').reset_index().rename(columns={'index': 'Employee Code'})
-    
-    final_df = pd.merge(details_df, total_absences, on='Employee Code', how='left').fillna(0)
-    
-    final_df['Reduction Days'] = final_df['Reduction Days'].astype(int)
-    
-    # Filter only students who have absences recorded
-    final_df = final_df[final_df['Reduction Days'] > 0].copy()
-
-
-    # --- NEW: Apply Multi-Select Filtering ---
-    # Convert Room No. in the DataFrame to string for consistent filtering
-    final_df['Room No.'] = final_df['Room No.'].astype(str)
-
-    # 1. Block Filter
-    if selected_blocks and selected_blocks != ['All']:
-        final_df = final_df[final_df['Block'].isin(selected_blocks)]
-        
-    # 2. Floor Filter
-    if selected_floors and selected_floors != ['All']:
-        final_df = final_df[final_df['Floor'].isin(selected_floors)]
-        
-    # 3. Room No. Filter (Filter list is already strings)
-    if selected_rooms and selected_rooms != ['All']:
-        final_df = final_df[final_df['Room No.'].isin(selected_rooms)]
-        
-    # --- END NEW FILTERING ---
-
-    # Final column selection and sorting
-    final_df = final_df[['Student Name', 'Block', 'Floor', 'Room No.', 'Reduction Days']]
-
-    final_df = sort_by_room_details(final_df, floor_order)
-    
-    return final_df.reset_index(drop=True)
-
+    with panel:
+        st.checkbox("Record stage timings", key="perf_enabled",
+                    help="Times file reads, analysis, graphs and Excel exports on every rerun.")
+        all_stats = [get_daily_cache(store).stats() for store in (stores or [None])]
+        cache_stats = {name: sum(stats[name] for stats in all_stats)
+                       for name in ('hits', 'disk_hits', 'misses', 'entries', 'bytes')}
+        st.caption(f"Daily report cache: {cache_stats['hits']} hits ({cache_stats['disk_hits']} from disk), "
+                   f"{cache_stats['misses']} misses, {cache_stats['entries']} entries, "
+                   f"{cache_stats['bytes'] / 2**20:.1f} MB.")
+        if not attendance_perf.is_enabled():
+            return
+        stage_summary = attendance_perf.summary()
+        if stage_summary.empty:
+            st.caption("No stages recorded in this rerun.")
+            return
+        st.dataframe(stage_summary, hide_index=True)
+        st.download_button(
+            label="Download Trace (JSON)",
+            data=attendance_perf.trace_json(),
+            file_name="attendance_trace.json",
+            mime="application/json",
+            help="Chrome trace format; open in chrome://tracing or https://ui.perfetto.dev."
+        )
 
 # --- Streamlit App Entry Point (Refactored) ---
 def app():
+    # Stage timings are recorded per rerun, into a recorder of this session's run only, while the
+    # Performance checkbox (defaulting to ATTENDANCE_PROFILE) is on
+    st.session_state.setdefault("perf_enabled", attendance_perf.default_enabled())
+    recorder = attendance_perf.Recorder() if st.session_state["perf_enabled"] else None
+    with attendance_perf.recording(recorder):
+        render_dashboard()
+
+
+def render_dashboard():
     st.set_page_config(layout="wide")
     st.title("Attendance Analysis Dashboard")
 
-    all_csv_files = sorted([f for f in os.listdir() if f.endswith('.csv')])
-    monthly_file_groups = group_files_by_month(all_csv_files)
-    
-    month_options = sorted(monthly_file_groups.keys(), key=lambda x: datetime.strptime(x, '%b-%Y'), reverse=True)
-    
-    # Prepare hierarchical data for Daily Analysis selector
-    daily_selection_data = {} 
-    for file_name in all_csv_files:
-        date_part = file_name.replace('.csv', '')
-        date_obj = None
-        for fmt in DATE_FORMATS:
-            try:
-                date_obj = datetime.strptime(date_part, fmt)
-                break
-            except ValueError:
-                continue
-        
-        if date_obj:
-            year = date_obj.strftime('%Y')
-            month_key = date_obj.strftime('%b') 
-            display_day = date_obj.strftime('%d (%a)')
-            
-            if year not in daily_selection_data:
-                daily_selection_data[year] = {}
-            if month_key not in daily_selection_data[year]:
-                daily_selection_data[year][month_key] = []
-            
-            daily_selection_data[year][month_key].append((date_obj, display_day, file_name))
-            
-    for year in daily_selection_data:
-        for month in daily_selection_data[year]:
-            daily_selection_data[year][month].sort(key=lambda x: x[0], reverse=True)
-            
-    selected_file = None 
-    
-    # Get unique location details for filtering the Reduction Days report
-    unique_blocks, unique_floors, unique_rooms = collect_unique_location_details(all_csv_files)
-
+    # One shard per configured data root (ATTENDANCE_DATA_ROOTS; the current directory by default)
+    shard_set = get_shard_set()
 
     # ------------------------------------------------
     # SIDEBAR: Controls
@@ -394,16 +148,54 @@ def app():
         # --- RENAME: Analysis Type Radio Button Updated ---
         analysis_type = st.radio(
             "Select Analysis Type",
-            ('Daily Attendance Report', 'Monthly Attendance Graph', 'Reduction Days Report')
+            ('Daily Attendance Report', 'Monthly Attendance Graph', 'Reduction Days Report', 'Absence Streaks Report',
+             'Day Comparison Report')
         )
+
+        # Hostel selector (several data roots only); the reports below only touch the selected hostel's shard
+        hostel = None
+        if shard_set.merged:
+            hostel_options = ([ALL_HOSTELS] if analysis_type in MERGED_REPORT_TYPES else []) + shard_set.names
+            hostel = st.selectbox(
+                "Hostel",
+                options=hostel_options,
+                index=0,
+                key="hostel_select",
+                help=f"{ALL_HOSTELS} merges the hostels' data (Reduction Days, Monthly Graph). "
+                     "The other reports cover one hostel at a time."
+            )
         st.markdown("---")
 
+    shards = shard_set.select(hostel)
+    # Per-hostel reports (Daily, Absence Streaks, Day Comparison) read the selected shard's store directly
+    store = shards.shards[0].store
+    if watch_enabled():
+        # Background watchers ingest new/changed daily files as they arrive and pre-warm the
+        # views, so reruns neither list the directories nor wait for ingest
+        shards.watch()
+    else:
+        # Ingest new/changed daily files once (all shards in parallel); the reports below read from the stores
+        shards.refresh()
+    all_csv_files = shards.shards[0].csv_files() if not shards.merged else \
+        [file_name for shard in shards for file_name in shard.csv_files()]
+    # Every file name is parsed once; all selectors below read from this index
+    date_index = shards.date_index()
+    month_options = date_index.month_options
+
+    selected_file = None 
+    
+    # Block options for the location filters (Floors and Rooms cascade from the selection in the sidebar)
+    unique_blocks, _, _ = shards.location_details()
+
+    with st.sidebar:
         selected_blocks, selected_floors, selected_rooms = None, None, None
+        start_date, end_date = None, None
+        streak_options = {}
 
         if analysis_type == 'Daily Attendance Report':
             st.subheader("Daily Report Date")
             
-            all_years = sorted(daily_selection_data.keys(), reverse=True)
+            all_years = date_index.years()
             
             if all_years:
                 # 1. Year Selector
@@ -415,7 +207,7 @@ def app():
                 )
 
                 # 2. Month Selector
-                months_in_year = sorted(daily_selection_data.get(selected_year, {}).keys(), key=lambda x: datetime.strptime(x, '%b'))
+                months_in_year = date_index.months_in_year(selected_year)
                 
                 if months_in_year:
                     selected_month = st.selectbox(
@@ -426,7 +218,7 @@ def app():
                     )
 
                     # 3. Day/Date Selector (File Name)
-                    files_in_month_data = daily_selection_data.get(selected_year, {}).get(selected_month, [])
+                    files_in_month_data = date_index.days_in_month(selected_year, selected_month)
                     
                     display_dates = [f[1] for f in files_in_month_data]
                     file_map = {f[1]: f[2] for f in files_in_month_data}
@@ -456,16 +248,39 @@ def app():
                 index=0 if month_options else None,
                 help="Generates a bar chart showing Present vs. Absent trends across all days in the selected month."
             )
+
+            # Location filters are served by the precomputed rollup table (no extra file reads)
+            selected_blocks = st.multiselect(
+                "Select Block(s)",
+                options=['All'] + unique_blocks,
+                default=['All'],
+                key="monthly_block_select",
+                help="Restrict the daily counts to one or more blocks."
+            )
+            # Floor options cascade from the selected blocks (served by the location index)
+            _, block_floors, _ = shards.location_details(selected_blocks)
+            selected_floors = st.multiselect(
+                "Select Floor(s)",
+                options=['All'] + block_floors,
+                default=['All'],
+                key="monthly_floor_select",
+                help="Restrict the daily counts to one or more floors."
+            )
+            chart_style = st.radio(
+                "Chart style",
+                ('Image', 'Interactive'),
+                horizontal=True,
+                help="Image: the classic matplotlib chart (cached per month). Interactive: a native chart built "
+                     "directly from the daily counts."
+            )
             st.markdown("---")
 
-        # --- NEW: Multi-select Filters for Reduction Days Report ---
-        elif analysis_type == 'Reduction Days Report':
+        # --- NEW: Multi-select Filters for Reduction Days Report (shared by the Absence Streaks and Day Comparison Reports) ---
+        elif analysis_type in ('Reduction Days Report', 'Absence Streaks Report', 'Day Comparison Report'):
             st.subheader("Filter Location Details")
             
-            # Add 'All' option to defaults
+            # Add 'All' option to defaults; Floor and Room options cascade from the selections above them
             block_options = ['All'] + unique_blocks
-            floor_options = ['All'] + unique_floors
-            room_options = ['All'] + unique_rooms
 
             selected_blocks = st.multiselect(
                 "Select Block(s)", 
@@ -474,6 +289,8 @@ def app():
                 help="Select one or more blocks to include in the report."
             )
             
+            _, block_floors, _ = shards.location_details(selected_blocks)
+            floor_options = ['All'] + block_floors
             selected_floors = st.multiselect(
                 "Select Floor(s)", 
                 options=floor_options, 
@@ -481,21 +298,80 @@ def app():
                 help="Select one or more floors to include in the report."
             )
 
+            _, _, location_rooms = shards.location_details(selected_blocks, selected_floors)
+            room_options = ['All'] + location_rooms
             selected_rooms = st.multiselect(
                 "Select Room No(s)", 
                 options=room_options, 
                 default=['All'],
                 help="Select one or more room numbers to include in the report."
             )
+
+            # Date range (e.g. a billing period), answered from the per-student absence bitmaps
+            if date_index.files:
+                first_date = date_index.dates[date_index.files[0]].date()
+                last_date = date_index.dates[date_index.files[-1]].date()
+                date_range = st.date_input(
+                    "Date Range",
+                    value=(first_date, last_date),
+                    min_value=first_date,
+                    max_value=last_date,
+                    # One range per hostel selection, as their first and last days differ
+                    key=f"reduction_date_range_{hostel}" if hostel else "reduction_date_range",
+                    help="Only count absences between these dates (inclusive). Files without a date in their name are only counted for the full range."
+                )
+                if len(date_range) == 2 and (date_range[0] > first_date or date_range[1] < last_date):
+                    start_date, end_date = date_range
+
+            if analysis_type == 'Absence Streaks Report':
+                st.subheader("Thresholds")
+                streak_options['min_current_streak'] = st.number_input(
+                    "Minimum Current Streak (days)", min_value=0, value=0, step=1,
+                    help="Only list students whose absence streak still running at the end of the range is at least this long."
+                )
+                streak_options['min_longest_streak'] = st.number_input(
+                    "Minimum Longest Streak (days)", min_value=0, value=CHRONIC_STREAK_DAYS, step=1,
+                    help="Only list students absent at least this many consecutive recorded days at some point."
+                )
+                streak_options['weekday_rate'] = st.slider(
+                    "Recurring Weekday Rate", min_value=0.1, max_value=1.0, value=CHRONIC_WEEKDAY_RATE, step=0.05,
+                    help=f"A weekday is recurring for a student absent on at least this share of its recorded occurrences (and at least {CHRONIC_WEEKDAY_MIN_ABSENCES} times)."
+                )
+                streak_options['recurring_only'] = st.checkbox(
+                    "Only students with a recurring weekday", value=False
+                )
             st.markdown("---")
 
 
+        # Flag files whose names do not carry a recognisable date
+        if date_index.unparsed:
+            with st.expander(f"{len(date_index.unparsed)} file(s) with unrecognised dates"):
+                st.caption("These files are not listed in the daily or monthly selectors. Expected names like 20-Jul-2025.csv.")
+                st.write(date_index.unparsed)
+
+        # Files that failed validation at ingest are left out of every report until they change
+        quarantine_report = shards.quarantine_report()
+        if not quarantine_report.empty:
+            with st.expander(f"{len(quarantine_report)} file(s) quarantined"):
+                st.caption("These files failed validation and are excluded from all reports until they are replaced. "
+                           "The full list is kept in .attendance_store/quarantine.csv of each data directory.")
+                st.dataframe(quarantine_report, hide_index=True)
+
+        for shard in shards:
+            if shard.watcher is not None and shard.watcher.last_error:
+                st.warning(f"The latest attendance files of {shard.name} could not be ingested: {shard.watcher.last_error}")
+
+        # Filled at the end of the rerun, once every stage has been recorded
+        performance_panel = st.expander("Performance")
+
+
     # ------------------------------------------------
     # MAIN CONTENT: Reports
     # ------------------------------------------------
 
     if not all_csv_files:
         st.error("No CSV files found in the directory. Please upload attendance files to run the analysis.")
+        render_performance_panel(performance_panel, [shard.store for shard in shards])
         return
 
     # --- 1. Daily Attendance Report ---
@@ -504,10 +380,18 @@ def app():
         st.header(f"Detailed Daily Attendance Report: {selected_file.replace('.csv', '')}")
 
         try:
-            df = pd.read_csv(selected_file)
-            analysis_results = analyze_attendance(df)
-
-            if analysis_results:
+            # Served from the daily cache while the file is unchanged (very large files are streamed)
+            analysis_results = cached_daily_analysis(selected_file, store)
+
+            quarantine_reason = store.quarantined([selected_file]).get(selected_file)
+            if quarantine_reason:
+                st.error(f"{selected_file} is quarantined and cannot be analyzed: {quarantine_reason}")
+            elif analysis_results:
+
+                # --- Validation Warnings (recorded when the file was ingested) ---
+                file_warnings = store.validation_report([selected_file])['Problem'].tolist()
+                if file_warnings:
+                    st.warning("Data quality warnings for this file:\n\n" + "\n".join(f"- {w}" for w in file_warnings))
                 
                 # --- Daily Summary ---
                 st.subheader("Daily Summary")
@@ -540,16 +424,21 @@ def app():
                     st.subheader("Absent Students per Room")
                     st.dataframe(analysis_results['Absent Students per Room'], hide_index=True)
 
+                # --- Punch Summary (parsed Punch Records) ---
+                if 'Punch Summary' in analysis_results:
+                    st.subheader("Punch Summary")
+                    st.caption(f"First/last punch, number of punches and punches after {LATE_PUNCH_TIME_STR} per student.")
+                    st.dataframe(analysis_results['Punch Summary'], hide_index=True)
+
                 # --- Daily Download Button ---
-                excel_buffer = generate_excel_file(analysis_results)
-                if excel_buffer:
-                    st.download_button(
-                        label="Download Full Daily Report (Excel)",
-                        data=excel_buffer,
-                        file_name=f"Daily_Analysis_{selected_file.replace('.csv', '')}.xlsx",
-                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                        help="Downloads all tables above into a single Excel file with multiple sheets."
-                    )
+                # The workbook is built on the first click and then cached with the analysis
+                st.download_button(
+                    label="Download Full Daily Report (Excel)",
+                    data=lambda: cached_daily_excel(selected_file, store),
+                    file_name=f"Daily_Analysis_{selected_file.replace('.csv', '')}.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                    help="Downloads all tables above into a single Excel file with multiple sheets."
+                )
             else:
                 st.error("Could not run analysis. Check if the file has data and correct column headers.")
 
@@ -565,12 +454,44 @@ def app():
         # ... (Monthly graph display logic remains the same) ...
         st.header(f"Monthly Attendance Trend: {selected_month_key}")
         
-        files_for_month = monthly_file_groups.get(selected_month_key, [])
+        # Daily files of the month in each selected hostel (merged below)
+        files_for_month = [file_name for _, month_files in shards.month_files(selected_month_key)
+                           for file_name in month_files]
         if files_for_month:
             with st.spinner(f"Generating graph for {selected_month_key} from {len(files_for_month)} daily reports..."):
-                fig = create_monthly_graph(selected_month_key, files_for_month)
-                if fig:
-                    st.pyplot(fig)
+                blocks_key = tuple(active_filter(selected_blocks) or ())
+                floors_key = tuple(active_filter(selected_floors) or ())
+                if chart_style == 'Interactive':
+                    # Native chart fed straight from the precomputed daily counts (no figure is rendered)
+                    monthly_counts = shards.monthly_counts(selected_month_key, list(blocks_key), list(floors_key))
+                    has_data = not monthly_counts.empty
+                    if has_data:
+                        st.bar_chart(monthly_counts.set_index('Day')[['Present', 'Not Present']], stack=False,
+                                     color=list(MONTHLY_GRAPH_COLORS.values()),
+                                     x_label='Day of Month', y_label='Number of Students')
+                else:
+                    # Rendered once per month / file contents / filters; reruns reuse the PNG
+                    graph_png = monthly_graph_png(selected_month_key, hostel, shards.files_digest(selected_month_key),
+                                                  blocks_key, floors_key)
+                    has_data = graph_png is not None
+                    if has_data:
+                        st.image(graph_png, width='stretch')
+
+                if has_data:
+                    # --- Month Totals (from the same rollup table) ---
+                    monthly_totals = shards.monthly_totals(selected_month_key, selected_blocks, selected_floors)
+                    st.subheader("Month Totals")
+                    st.dataframe(monthly_totals, hide_index=True)
+
+                    # --- After-Curfew Punches (parsed Punch Records of the whole month) ---
+                    curfew_results = shards.curfew_punches(selected_month_key, selected_blocks, selected_floors)
+                    st.subheader(f"Punches After {LATE_PUNCH_TIME_STR}")
+                    histogram = curfew_results['After-Curfew Punch Histogram']
+                    if not histogram.empty:
+                        st.bar_chart(histogram, x='Time Bin', y='Punches')
+                        st.dataframe(curfew_results['After-Curfew Punches per Student'], hide_index=True)
+                    else:
+                        st.info("No punches after curfew recorded in this month.")
                 else:
                     st.warning(f"No valid attendance data found for {selected_month_key} to generate the graph.")
         else:
@@ -581,15 +502,19 @@ def app():
     elif analysis_type == 'Reduction Days Report':
         # --- RENAME: Header changed to "Reduction Days Report" ---
         st.header("Reduction Days Report")
+        if start_date is not None:
+            st.caption(f"Absences from {start_date:%d-%b-%Y} to {end_date:%d-%b-%Y}.")
         
         with st.spinner('Calculating total reduction days across all files and applying filters...'):
             # --- UPDATED: Passing filter selections to the calculation function ---
-            cumulative_df = calculate_reduction_days(
-                all_csv_files, 
+            # Computed per hostel in parallel and merged (with a Hostel column) for All Hostels
+            cumulative_df = shards.reduction_days(
                 FLOOR_ORDER,
                 selected_blocks,
                 selected_floors,
-                selected_rooms
+                selected_rooms,
+                start_date=start_date,
+                end_date=end_date
             )
         
         if not cumulative_df.empty:
@@ -600,14 +525,28 @@ def app():
             # --- Cumulative Download Button ---
             # --- RENAME: Excel sheet name updated ---
             cumulative_dfs = {'Reduction Days': cumulative_df}
-            excel_file_cumulative = generate_excel_file(cumulative_dfs)
             
-            if excel_file_cumulative:
+            # The workbook is only built when the button is clicked (deferred download)
+            st.download_button(
+                label="Download Reduction Days Report (Excel)",
+                data=lambda: generate_excel_file(cumulative_dfs).getvalue(),
+                file_name="Reduction_Days_Report.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )
+
+            # Very large reports are also offered as CSV / Parquet, which are much faster to produce
+            if len(cumulative_df) >= LARGE_EXPORT_ROWS:
                 st.download_button(
-                    label="Download Reduction Days Report (Excel)",
-                    data=excel_file_cumulative,
-                    file_name="Reduction_Days_Report.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    label="Download Reduction Days Report (CSV)",
+                    data=lambda: generate_csv_file(cumulative_df).read(),
+                    file_name="Reduction_Days_Report.csv",
+                    mime="text/csv"
+                )
+                st.download_button(
+                    label="Download Reduction Days Report (Parquet)",
+                    data=lambda: generate_parquet_file(cumulative_df).read(),
+                    file_name="Reduction_Days_Report.parquet",
+                    mime="application/vnd.apache.parquet"
                 )
         else:
             # Check if filtering resulted in zero results, or if there were no initial absences
@@ -618,10 +557,113 @@ def app():
             else:
                 st.info("No students were marked as 'Not Present' across all files, resulting in zero Reduction Days.")
 
+    # --- 4. Absence Streaks Report ---
+    elif analysis_type == 'Absence Streaks Report':
+        st.header("Absence Streaks Report")
+        if start_date is not None:
+            st.caption(f"Absences from {start_date:%d-%b-%Y} to {end_date:%d-%b-%Y}.")
+
+        # Under the store lock, so a watcher ingest never changes the views mid-report
+        with st.spinner('Calculating absence streaks across all files...'), store.lock:
+            streaks_df = calculate_absence_streaks(
+                all_csv_files,
+                FLOOR_ORDER,
+                selected_blocks,
+                selected_floors,
+                selected_rooms,
+                store=store,
+                start_date=start_date,
+                end_date=end_date,
+                **streak_options
+            )
+
+        if not streaks_df.empty:
+            st.caption("Streaks count consecutive recorded days; days without a file (or without the student) do not break them.")
+            st.dataframe(streaks_df, hide_index=True)
+            st.download_button(
+                label="Download Absence Streaks Report (Excel)",
+                data=lambda: generate_excel_file({'Absence Streaks': streaks_df}).getvalue(),
+                file_name="Absence_Streaks_Report.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )
+        else:
+            st.info("No students match the current thresholds and location filters.")
+
+    # --- 5. Day Comparison Report ---
+    elif analysis_type == 'Day Comparison Report':
+        st.header("Day Comparison Report")
+        if start_date is not None:
+            st.caption(f"Days from {start_date:%d-%b-%Y} to {end_date:%d-%b-%Y}.")
+
+        # Under the store lock, so a watcher ingest never changes the views mid-report
+        with st.spinner('Comparing the days across all files...'), store.lock:
+            comparison = compare_attendance_days(
+                all_csv_files,
+                FLOOR_ORDER,
+                selected_blocks,
+                selected_floors,
+                selected_rooms,
+                store=store,
+                start_date=start_date,
+                end_date=end_date
+            )
+
+        daily_changes = comparison['Daily Changes']
+        if not daily_changes.empty:
+            # --- Day-over-Day Changes ---
+            st.subheader("Day-over-Day Changes")
+            st.caption("Each day is compared with the previous day that has a file.")
+            st.line_chart(daily_changes, x='Date', y='Attendance Rate (%)')
+            st.dataframe(daily_changes, hide_index=True)
+
+            # --- Present -> Not Present on one day ---
+            st.subheader("Present → Not Present")
+            compared_days = list(daily_changes['Date'].iloc[:-1])
+            if compared_days:
+                selected_day = st.selectbox(
+                    "Day", options=compared_days, format_func=lambda day: f"{day:%d-%b-%Y}", key="comparison_day",
+                    help="Students who were Present on the previous day with a file and Not Present on this day."
+                )
+                newly_absent = comparison['Newly Absent Students']
+                day_flips = newly_absent[newly_absent['Date'] == selected_day]
+                if not day_flips.empty:
+                    st.dataframe(day_flips.drop(columns='Date'), hide_index=True)
+                else:
+                    st.success("Nobody went from Present to Not Present on this day.")
+            else:
+                st.info("Select a range of at least two days to compare.")
+
+            # --- Room Trends ---
+            st.subheader("Room Attendance Trends")
+            st.caption("Rooms of the students' latest location, steepest decline first. Trend is the daily change "
+                       "of the attendance rate (least squares over the range).")
+            st.dataframe(comparison['Room Trends'], hide_index=True)
+            with st.expander("Attendance rate per room and day"):
+                st.dataframe(comparison['Room Daily Rates'], hide_index=True)
+
+            # --- Roster Changes ---
+            st.subheader("New and Departed Students")
+            st.caption("Listed on the last day but not on the first (New), or the reverse (Departed).")
+            if not comparison['Roster Changes'].empty:
+                st.dataframe(comparison['Roster Changes'], hide_index=True)
+            else:
+                st.info("The same students are listed on the first and the last day.")
+
+            st.download_button(
+                label="Download Day Comparison Report (Excel)",
+                data=lambda: generate_excel_file(comparison).getvalue(),
+                file_name="Day_Comparison_Report.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )
+        else:
+            st.info("No attendance recorded for the selected dates and location filters.")
+
     # Display status if no file options are available
-    if not all_csv_files and analysis_type != 'Reduction Days Report':
+    if not all_csv_files and analysis_type not in ('Reduction Days Report', 'Absence Streaks Report', 'Day Comparison Report'):
         st.warning("No CSV files found to perform the analysis. Please ensure your attendance files are available.")
 
+    render_performance_panel(performance_panel, [shard.store for shard in shards])
+
 
 if __name__ == "__main__":
     app()
@@ -0,0 +1,69 @@
+"""
+Streaming a daily file through analyze_attendance_stream must give exactly the tables of
+analyze_attendance on the whole file, whatever the chunk size, including for files without rows.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import attendance_reports
+from attendance_io import read_attendance_csv
+from attendance_reports import analyze_attendance, analyze_attendance_stream
+
+STUDENTS = 50
+
+
+def write_daily_csv(path, rows: int = STUDENTS, seed: int = 11):
+    rng = np.random.default_rng(seed)
+    status = rng.choice(['Present', 'Not Present', 'On Leave', None], rows, p=[0.6, 0.3, 0.05, 0.05])
+    punches = [','.join(f'{hour:02d}:{minute:02d}:00' for hour, minute in
+                        zip(rng.integers(7, 23, count), rng.integers(0, 60, count)))
+               for count in rng.integers(0, 4, rows)]
+    pd.DataFrame({
+        'Employee Code': np.arange(1000, 1000 + rows),
+        'Student Name': [f'STUDENT{index % 37}' for index in range(rows)],
+        'Block': rng.choice(['HA', 'HB'], rows),
+        'Floor': rng.choice(['Ground Floor', 'First Floor'], rows),
+        'Room No.': rng.integers(101, 106, rows),
+        'Last Punch': [records.split(',')[-1] for records in punches],
+        'Punch Records': punches,
+        'Status': status,
+    }).to_csv(path, index=False)
+
+
+def assert_same_tables(streamed: dict, whole: dict):
+    assert list(streamed) == list(whole)
+    for name, table in whole.items():
+        pd.testing.assert_frame_equal(streamed[name].reset_index(drop=True), table.reset_index(drop=True),
+                                      obj=name)
+
+
+@pytest.mark.parametrize('chunk_rows', [1, 7, STUDENTS, 10 * STUDENTS])
+@pytest.mark.parametrize('long_form', [False, True])
+def test_stream_matches_whole_file(tmp_path, chunk_rows, long_form):
+    path = tmp_path / '01-Jul-2025.csv'
+    write_daily_csv(path)
+    whole = analyze_attendance(read_attendance_csv(str(path)), long_form)
+    assert_same_tables(analyze_attendance_stream(str(path), chunk_rows, long_form), whole)
+
+
+def test_stream_of_header_only_file(tmp_path):
+    path = tmp_path / '01-Jul-2025.csv'
+    write_daily_csv(path, rows=0)
+    whole = analyze_attendance(read_attendance_csv(str(path)))
+    assert_same_tables(analyze_attendance_stream(str(path), 10), whole)
+
+
+def test_stream_without_any_chunk(tmp_path, monkeypatch):
+    # Readers that yield no chunk at all for a file without data rows
+    path = tmp_path / '01-Jul-2025.csv'
+    write_daily_csv(path, rows=0)
+    monkeypatch.setattr(attendance_reports, 'iter_attendance_csv', lambda path, chunk_rows: iter(()))
+    whole = analyze_attendance(read_attendance_csv(str(path)))
+    assert_same_tables(analyze_attendance_stream(str(path), 10), whole)
+
+
+def test_stream_with_missing_columns(tmp_path):
+    path = tmp_path / '01-Jul-2025.csv'
+    pd.DataFrame({'Employee Code': [1], 'Student Name': ['A']}).to_csv(path, index=False)
+    assert analyze_attendance_stream(str(path), 10) == {}
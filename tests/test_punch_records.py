@@ -0,0 +1,66 @@
+"""
+parse_punch_records (vectorized, over one byte buffer) must find exactly the punches a
+straightforward per-row regular expression finds.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from attendance_io import parse_punch_records
+
+# Every 'H:MM:SS' / 'HH:MM:SS' token not fused to other digits (overlapping tokens included)
+PUNCH_TOKEN = re.compile(r'(?=(?<!\d)(\d{1,2}):(\d{2}):(\d{2})(?!\d))')
+
+
+def reference_punches(text) -> list:
+    if not isinstance(text, str):
+        return []
+    punches = []
+    for match in PUNCH_TOKEN.finditer(text):
+        hours, minutes, seconds = (int(part) for part in match.groups())
+        if hours < 24 and minutes < 60 and seconds < 60:
+            punches.append(hours * 3600 + minutes * 60 + seconds)
+    return punches
+
+
+def assert_matches_reference(rows: list):
+    parsed = parse_punch_records(pd.Series(rows, dtype=object))
+    assert len(parsed) == len(rows)
+    for row, text in enumerate(rows):
+        found = parsed.values[parsed.offsets[row]:parsed.offsets[row + 1]].tolist()
+        assert found == reference_punches(text), repr(text)
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('19:54:33,19:42:54,', [71673, 70974]),
+    ('7:05:09', [25509]),
+    ('', []),
+    (None, []),
+    ('24:00:00,23:60:00,23:59:60', []),
+    # Digits fused to a token are not part of a punch
+    ('123:45:56', []),
+    ('12:34:567', []),
+    ('1:23:45:06:07', [5025, 85506]),
+    ('x9:00:00y', [32400]),
+    ('20:15:00,,08:01:02 ,é21:00:00', [72900, 28862, 75600]),
+])
+def test_known_rows(text, expected):
+    assert reference_punches(text) == expected
+    assert_matches_reference([text])
+
+
+def test_random_rows_match_reference():
+    rng = np.random.default_rng(5)
+    alphabet = np.array(list('0123456789::,, '))
+    rows = []
+    for _ in range(2000):
+        pieces = []
+        for _ in range(rng.integers(0, 5)):
+            if rng.random() < 0.6:
+                pieces.append(f'{rng.integers(0, 30)}:{rng.integers(0, 70):02d}:{rng.integers(0, 70):02d}')
+            else:
+                pieces.append(''.join(rng.choice(alphabet, rng.integers(1, 8))))
+        rows.append(''.join(piece + rng.choice(['', ',', ' ', '1']) for piece in pieces))
+    assert_matches_reference(rows)
@@ -0,0 +1,115 @@
+"""
+The incremental Reduction Days tally must match a full recompute after every kind of change
+to the data directory: new, edited and deleted days, a store reloaded from disk and a
+back-dated day arriving late.
+"""
+import os
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from attendance_config import FLOOR_ORDER
+from attendance_reports import (
+    calculate_reduction_days, parse_file_date, recompute_reduction_days, sort_by_room_details
+)
+from attendance_store import STORE_COLUMNS, AttendanceStore
+from attendance_views import REDUCTION_REQUIRED_COLS, ReductionTally
+
+REPORT_COLS = ['Student Name', 'Block', 'Floor', 'Room No.', 'Reduction Days']
+STUDENTS = 60
+BLOCKS = ['HA', 'HB', 'HC']
+
+
+def daily_frame(rng: np.random.Generator) -> pd.DataFrame:
+    """
+    One day's export: every student with a random room (students move between days) and Status.
+    """
+    codes = np.arange(100, 100 + STUDENTS)
+    present = rng.random(STUDENTS) < 0.7
+    return pd.DataFrame({
+        'Employee Code': codes,
+        'Student Name': [f'STUDENT{code}' for code in codes],
+        'Block': rng.choice(BLOCKS, STUDENTS),
+        'Floor': rng.choice(FLOOR_ORDER[:3], STUDENTS),
+        'Room No.': rng.integers(101, 110, STUDENTS),
+        'Last Punch': np.where(present, '20:15:00', ''),
+        'Punch Records': np.where(present, '20:15:00,', ''),
+        'Status': np.where(present, 'Present', 'Not Present'),
+    }, columns=STORE_COLUMNS)
+
+
+def write_day(data_dir, day: date, rng: np.random.Generator) -> str:
+    file_name = day.strftime('%d-%b-%Y.csv')
+    path = os.path.join(data_dir, file_name)
+    existed = os.path.exists(path)
+    previous = os.stat(path) if existed else None
+    daily_frame(rng).to_csv(path, index=False)
+    if existed:
+        # Edits may keep the size; make sure the store sees a new fingerprint
+        os.utime(path, ns=(previous.st_atime_ns, previous.st_mtime_ns + 1_000_000_000))
+    return file_name
+
+
+def open_store(data_dir) -> AttendanceStore:
+    """
+    A new store instance for data_dir (loading any persisted manifest and tally) with the tally registered.
+    """
+    store = AttendanceStore(str(data_dir), date_parser=parse_file_date)
+    store.view(ReductionTally)
+    return store
+
+
+def csv_files(data_dir) -> list:
+    return sorted(f for f in os.listdir(data_dir) if f.endswith('.csv'))
+
+
+def assert_tally_matches_recompute(store: AttendanceStore, data_dir, blocks: list = None):
+    store.refresh()
+    files = csv_files(data_dir)
+    # calculate_reduction_days must be answered by the tally, not by its recompute fallback
+    assert store.view(ReductionTally).covers(store.files(files, REDUCTION_REQUIRED_COLS))
+
+    tally_report = calculate_reduction_days(files, FLOOR_ORDER, blocks, None, None, store=store)
+
+    expected = recompute_reduction_days(files, store)
+    expected['Room No.'] = expected['Room No.'].astype(str)
+    if blocks:
+        expected = expected[expected['Block'].isin(blocks)]
+    expected = sort_by_room_details(expected[REPORT_COLS].copy(), FLOOR_ORDER).reset_index(drop=True)
+
+    assert not expected.empty
+    pd.testing.assert_frame_equal(tally_report.astype(str), expected.astype(str))
+
+
+@pytest.mark.parametrize('blocks', [None, ['HB']])
+def test_tally_matches_recompute_through_changes(tmp_path, blocks):
+    rng = np.random.default_rng(7)
+    first_day = date(2025, 7, 1)
+    for offset in range(5):
+        write_day(tmp_path, first_day + timedelta(days=offset), rng)
+    store = open_store(tmp_path)
+    assert_tally_matches_recompute(store, tmp_path, blocks)
+
+    # New day
+    write_day(tmp_path, first_day + timedelta(days=5), rng)
+    assert_tally_matches_recompute(store, tmp_path, blocks)
+
+    # Edited day (new statuses and rooms)
+    write_day(tmp_path, first_day + timedelta(days=2), rng)
+    assert_tally_matches_recompute(store, tmp_path, blocks)
+
+    # Deleted day, including the latest one (whose rooms were every student's latest location)
+    os.remove(os.path.join(tmp_path, (first_day + timedelta(days=1)).strftime('%d-%b-%Y.csv')))
+    os.remove(os.path.join(tmp_path, (first_day + timedelta(days=5)).strftime('%d-%b-%Y.csv')))
+    assert_tally_matches_recompute(store, tmp_path, blocks)
+
+    # Store reloaded from disk: the persisted tally is used as it is
+    store = open_store(tmp_path)
+    assert store.view(ReductionTally).generation == store.generation
+    assert_tally_matches_recompute(store, tmp_path, blocks)
+
+    # Back-dated day arriving after later days (must not become anyone's latest location)
+    write_day(tmp_path, first_day - timedelta(days=10), rng)
+    assert_tally_matches_recompute(store, tmp_path, blocks)